@@ -0,0 +1,385 @@
+# === ANALYSE DES RELEVÉS, SANS STREAMLIT (utilisée par les applis et par batch_cli.py) ===
+import json
+import os
+import threading
+from functools import partial
+
+from cache_ocr import CacheOCR, ocr_avec_cache
+from colonnes import MiseEnPage
+from lignes import group_words_by_lines
+from moteurs_ocr import MoteurVision
+from mots_cles import MoteurMotsCles
+from normalisation import TexteNormalise, motif_recherche, plier
+from ocr_parallele import MAX_WORKERS, decrire_lecture, ocr_pages
+from reprises import REPRISES
+from magasin import empreinte
+from metriques import METRIQUES
+from montants import montant_suivant, montants_de_texte, montants_par_ligne, total
+from mots_page import LignesPage
+from rendu_pdf import iter_pages, nb_pages
+from texte_natif import extraire_couche_texte, fusionner, pages_a_ocr
+from vision_batch import MODE_OCR, OCRVisionLot, ocr_pages_fichier, ocr_pages_par_lots
+
+
+# === CLIENT GOOGLE VISION : UN PAR PROCESSUS, CRÉÉ AU PREMIER APPEL À L'API ===
+#
+# google-cloud-vision met plusieurs centaines de millisecondes à s'importer : la bibliothèque n'est chargée
+# qu'à la création du client, et le client qu'au premier appel à l'API. Un PDF à couche texte native, ou
+# dont toutes les pages sont déjà dans le cache OCR, ne charge jamais la bibliothèque.
+def creer_client(service_account_json=None):
+    """Client Google Vision depuis le JSON d'un compte de service, sinon identifiants par défaut
+
+    Sans JSON, la bibliothèque Google utilise GOOGLE_APPLICATION_CREDENTIALS.
+    """
+    from google.cloud import vision
+    from google.oauth2 import service_account
+
+    if service_account_json is None:
+        return vision.ImageAnnotatorClient()
+    service_account_info = json.loads(service_account_json)
+    credentials = service_account.Credentials.from_service_account_info(service_account_info)
+    return vision.ImageAnnotatorClient(credentials=credentials)
+
+
+class ClientDiffere:
+    """Client Google Vision créé (identifiants lus, bibliothèque importée) au premier appel d'une de ses méthodes"""
+
+    def __init__(self, service_account_json=None):
+        self.service_account_json = service_account_json
+        self._client = None
+        self._verrou = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._verrou:  # Plusieurs threads OCR peuvent faire le premier appel en même temps
+                if self._client is None:
+                    self._client = creer_client(self.service_account_json)
+        return self._client
+
+    def __getattr__(self, nom):  # text_detection, batch_annotate_images, batch_annotate_files...
+        if nom.startswith("_"):
+            raise AttributeError(nom)
+        return getattr(self.client, nom)
+
+
+_clients = {}  # (processus, identifiants) → ClientDiffere
+_verrou_clients = threading.Lock()
+
+
+def client_partage(service_account_json=None):
+    """Client Google Vision unique du processus pour ces identifiants, créé au premier appel à l'API
+
+    Threads OCR, relances et sessions Streamlit réutilisent la même connexion gRPC. Un processus enfant
+    (fork de batch_cli) a le sien : un canal gRPC ne se partage pas entre processus.
+    """
+    cle = (os.getpid(), service_account_json)
+    with _verrou_clients:
+        if cle not in _clients:
+            _clients[cle] = ClientDiffere(service_account_json)
+        return _clients[cle]
+
+
+# === LECTURE DU TEXTE DE CHAQUE PAGE (COUCHE NATIVE OU OCR) ===
+class LecteurPDF:
+    """Mots de chaque page d'un PDF : couche texte native si possible, sinon OCR
+
+    moteur : moteur OCR de moteurs_ocr (Google Vision avec client par défaut). Les modes "lot"
+    et "fichier" sont propres à l'API Google Vision : avec un autre moteur, l'OCR se fait page par page.
+    """
+
+    def __init__(self, client, dpi, cache=None, mode=MODE_OCR, max_workers=MAX_WORKERS, moteur=None,
+                 reprises=REPRISES):
+        self.client = client
+        self.dpi = dpi
+        self.cache = cache if cache is not None else CacheOCR()
+        self.moteur = moteur if moteur is not None else MoteurVision(client, reprises=reprises)
+        self.mode = mode if self.moteur.nom == "vision" else "page"
+        self.max_workers = max_workers
+        self.ocr_lot = OCRVisionLot(client, max_workers=max_workers, reprises=reprises)  # Modes "lot" et "fichier"
+
+    def ocr_page(self, image_pil, infos=None):
+        return ocr_avec_cache(self.cache, image_pil, self.moteur, dpi=self.dpi,
+                              feature=self.moteur.feature, infos=infos)
+
+    def lire(self, pdf_bytes, natifs=None):
+        """Résultat de chaque page, dans l'ordre et au fil de l'eau (générateur)
+
+        natifs : résultat de extraire_couche_texte, s'il a déjà été calculé par l'appelant.
+        Les pages passées à l'OCR en mode page ou lot gardent leur image dans "image".
+        """
+        if natifs is None:
+            natifs = extraire_couche_texte(pdf_bytes, self.dpi)
+        numeros = [i + 1 for i in pages_a_ocr(natifs)]  # Pages scannées uniquement
+
+        if self.mode == "fichier":
+            # Le PDF part tel quel à l'API fichiers : aucune page n'est rastérisée ici
+            resultats_ocr = ocr_pages_fichier(pdf_bytes, numeros, self.ocr_lot, self.cache, self.dpi)
+        else:
+            pages = iter_pages(pdf_bytes, self.dpi, numeros)  # Rendu à la demande, au rythme de l'OCR
+            if self.mode == "lot":
+                resultats_ocr = ocr_pages_par_lots(pages, self.ocr_lot, self.cache, self.dpi)
+            else:
+                resultats_ocr = ocr_pages(pages, self.ocr_page, max_workers=self.max_workers)
+        for resultat in fusionner(natifs, resultats_ocr):
+            mesurer_lecture(resultat)
+            yield resultat
+
+
+def mesurer_lecture(resultat):
+    """Enregistre dans METRIQUES les mesures d'une page lue (texte natif ou OCR)"""
+    page, mots = resultat["page"], len(resultat["words"])
+    if resultat.get("source") == "natif":
+        METRIQUES.enregistrer("texte_natif", resultat["duree"], page, mots=mots)
+        return
+    METRIQUES.enregistrer("ocr", resultat["duree"], page, mots=mots, cache=int(bool(resultat.get("cache"))),
+                          erreur=int(bool(resultat.get("erreur"))), tentatives=resultat.get("tentatives", 0))
+    if "duree_encodage" in resultat:
+        METRIQUES.enregistrer("encodage", resultat["duree_encodage"], page, octets=resultat["octets"])
+    if "duree_appel" in resultat:  # Google Vision : appel à l'API seul, hors attente du quota
+        METRIQUES.enregistrer("appel_vision", resultat["duree_appel"], page, attente_quota=resultat["attente_quota"])
+
+
+def lignes_de_page(words, y_tolerance=10, page=None):
+    """Lignes d'une page (LignesPage), avec leur texte et leur forme pliée calculés une seule fois"""
+    with METRIQUES.mesurer("regroupement", page=page, mots=len(words)) as mesures:
+        lines = group_words_by_lines(words, y_tolerance=y_tolerance)
+        lines.normes = [TexteNormalise(texte) for texte in lines.textes]  # Sans accents, minuscules
+        mesures["lignes"] = len(lines)
+    return lines
+
+
+def analyser_pages(lecteur, pdf_bytes):
+    """OCR et regroupement en lignes de chaque page, une seule fois par page
+
+    Une page dont l'OCR a échoué est gardée, sans lignes, avec son message dans "erreur" :
+    les autres pages du document restent exploitables.
+    """
+    pages = []
+    for resultat in lecteur.lire(pdf_bytes):
+        words = resultat["words"]
+        if resultat.get("erreur"):
+            pages.append({"numero": resultat["page"], "lines": LignesPage.vide(), "lecture": decrire_lecture(resultat),
+                          "cache": resultat.get("cache"), "erreur": resultat["erreur"]})
+            continue
+        if not words:
+            continue
+        pages.append({
+            "numero": resultat["page"],
+            "lines": lignes_de_page(words, page=resultat["page"]),
+            "lecture": decrire_lecture(resultat),
+            "cache": resultat.get("cache"),  # None pour une page en texte natif
+        })
+    return pages
+
+
+def pages_en_erreur(pages):
+    """Numéros des pages dont l'OCR a échoué (résultat partiel)"""
+    return [page["numero"] for page in pages if page.get("erreur")]
+
+
+def pages_memorisees(lecteur, pdf_bytes, magasin, nom=None):
+    """Pages du document depuis le magasin SQLite, sinon analysées puis enregistrées
+
+    Renvoie (sha256, pages, True si le document était déjà dans le magasin).
+    """
+    sha256 = empreinte(pdf_bytes)
+    pages = magasin.charger_pages(sha256, lecteur.dpi)
+    if pages is not None:
+        return sha256, pages, True
+    pages = analyser_pages(lecteur, pdf_bytes)
+    if not pages_en_erreur(pages):  # Document incomplet : pas enregistré, il sera réanalysé
+        magasin.enregistrer(sha256, lecteur.dpi, pages, nom=nom, nb_pages=nb_pages(pdf_bytes))
+    return sha256, pages, False
+
+# === MOTS-CLÉS DES FAMILLES DÉBIT / CRÉDIT ===
+def creer_dictionnaire_mots(mots_base):
+    """Associe à chaque mot ses formes pliées (sans accents, minuscules), sans doublons
+
+    Plus besoin de générer toutes les combinaisons d'accents : les lignes OCR sont pliées
+    de la même façon avant la recherche.
+    """
+    nouveau_dict = {}
+    for mot, anciennes_variantes in mots_base.items():
+        formes = [plier(mot)] + [plier(v) for v in anciennes_variantes or []]
+        nouveau_dict[mot] = list(dict.fromkeys(formes))  # Élimine les doublons en gardant l'ordre
+    return nouveau_dict
+
+# Dictionnaires de base
+MOTS_CREDIT_BASE = {
+    "prélevé sur votre compte bancaire": ["preleve sur votre compte bancaire"],
+    "votre prélèvement": ["votre prelevement"],
+    "votre règlement par cb": ["votre reglement par cb"],
+    "votre règlement par ccp": ["votre reglement par ccp"]
+}
+
+MOTS_DEBIT_BASE = {
+    "cotis cb prélevée banque FOMO": ["cotis cb prelevee banque FOMO"],
+    "solde FMRB précédent": ["solde FMRB precedent"],
+    "retour de prélèvement impayé": ["retour de prelevement impaye"],
+    "indemnité de retard": ["indemnite de retard"],
+    "remise à jour de vos impayés": ["remise a jour de vos impayes"],
+    "transfert sur votre carte AURORE": [],
+    "transfert différé/crédit": ["transfert differe/credit"],
+    "régul d'agios": ["regul d'agios"],
+    "remise à jour de vos intérêts": ["remise a jour de vos interets"],
+    "votre utilisation": [],
+    "arrêté de compte": ["%"],
+    "trans. différé precedent/credit": [
+        "trans. differe precedent/credit",
+        "trans . differe precedent/credit"
+    ]
+}
+
+MOTS_CREDIT_CLASSIQUE_BASE = {
+    "prélèvement banque": ["prelevement banque"],
+    "prélèvement mso": ["prelevement mso"],
+    "annulation de retard": [],
+    "versement cb": [],
+    "annulation ird": [],
+    "cheque": [],
+    "annulation indemnités retard": ["annulation indemnites retard"]
+}
+
+MOTS_DEBIT_CLASSIQUE_BASE = {
+    "échéance": ["echeance"],
+    "indemnités de retard": ["indemnites de retard"],
+    "prélèvement impayé": ["prelevement impaye"],
+    "indemnité report": ["indemnite report"],
+    "déchéance du terme": ["decheance du terme"],
+    "indemnité de transmission": ["indemnite de transmission"]
+}
+
+# Création des dictionnaires de formes pliées
+MOTS_CREDIT_RENOUVELABLE = creer_dictionnaire_mots(MOTS_CREDIT_BASE)
+MOTS_DEBIT_RENOUVELABLE = creer_dictionnaire_mots(MOTS_DEBIT_BASE)
+MOTS_CREDIT_CLASSIQUE = creer_dictionnaire_mots(MOTS_CREDIT_CLASSIQUE_BASE)
+MOTS_DEBIT_CLASSIQUE = creer_dictionnaire_mots(MOTS_DEBIT_CLASSIQUE_BASE)
+
+
+def detecter_type_document(pages):
+    """Détecte si c'est un prêt classique ou crédit renouvelable"""
+    for page in pages:
+        for norme in page["lines"].normes:
+            if "affaire" in norme.plie:
+                return "Crédit renouvelable"
+    return "Prêt classique"
+
+
+def mots_du_type(type_doc):
+    """Dictionnaires (débit, crédit) correspondant au type de document"""
+    if type_doc == "Crédit renouvelable":
+        return MOTS_DEBIT_RENOUVELABLE, MOTS_CREDIT_RENOUVELABLE
+    return MOTS_DEBIT_CLASSIQUE, MOTS_CREDIT_CLASSIQUE
+
+
+def extraire_montants(pages, moteur):
+    """Applique le moteur de mots-clés à chaque ligne, avec une numérotation globale des lignes
+
+    Les colonnes de montants de chaque page (colonnes.MiseEnPage) sont repérées une fois : une ligne
+    sans montant est sautée, et un mot-clé sans montant accolé prend celui de la colonne nommée pour
+    sa famille (ou, sur une page sans en-tête Débit / Crédit, le premier montant qui le suit).
+    Renvoie la liste des lignes (une entrée par ligne, avec "trouve" à None si rien n'est détecté)
+    et les totaux exacts {"DÉBIT": Decimal, "CRÉDIT": Decimal}.
+    """
+    lignes = []
+    line_counter = 0
+    for page in pages:
+        lines = page["lines"]
+        with METRIQUES.mesurer("mots_cles", page=page["numero"], lignes=len(lines)) as mesures:
+            trouves = 0
+            mise_en_page = MiseEnPage(lines)
+            for idx, (texte, norme) in enumerate(zip(lines.textes, lines.normes)):
+                trouve = None
+                if mise_en_page.candidates[idx]:
+                    trouve = moteur.chercher(norme, partial(mise_en_page.montant_colonne, idx),
+                                             mise_en_page.montants_texte[idx])
+                if trouve:
+                    trouves += 1
+                lignes.append({
+                    "page": page["numero"],
+                    "ligne": line_counter + idx + 1,
+                    "texte": texte,
+                    "trouve": trouve,
+                })
+            mesures["trouves"] = trouves
+        line_counter += len(lines)
+    totaux = {famille: total(l["trouve"][0] for l in lignes if l["trouve"] and l["trouve"][4] == famille)
+              for famille in ("DÉBIT", "CRÉDIT")}
+    return lignes, totaux
+
+
+def analyser_famille(pages, debits_selectionnes=None, credits_selectionnes=None):
+    """Analyse DÉBIT / CRÉDIT complète d'un document (par défaut : tous les mots-clés de son type)"""
+    type_doc = detecter_type_document(pages)
+    mots_debit, mots_credit = mots_du_type(type_doc)
+    if debits_selectionnes is None:
+        debits_selectionnes = list(mots_debit)
+    if credits_selectionnes is None:
+        credits_selectionnes = list(mots_credit)
+    moteur = MoteurMotsCles(debits_selectionnes, mots_debit, credits_selectionnes, mots_credit)
+    lignes, totaux = extraire_montants(pages, moteur)
+    return type_doc, lignes, totaux
+
+
+# === RECHERCHE D'UN MOT ET DU MONTANT QUI LE SUIT ===
+def extract_amount_after_keyword(normalized_text, normalized_keyword, montants=None):
+    """Premier montant (Decimal, signé) après le mot-clé, ou None
+
+    Texte et mot-clé déjà pliés (sans accents, minuscules) par normalisation.plier ;
+    montants : ceux du texte s'ils ont déjà été repérés (montants.montants_par_ligne).
+    """
+    trouve = motif_recherche(normalized_keyword).search(normalized_text)  # Même règle que la recherche des lignes
+    if trouve is None:
+        return None
+    if montants is None:
+        montants = montants_de_texte(normalized_text)
+    montant = montant_suivant(montants, trouve.end())
+    return montant[0] if montant else None
+
+
+def rechercher_mot(pages, search_word):
+    """Lignes contenant le mot (sans tenir compte des accents) et montant qui le suit
+
+    Même règle que le magasin (normalisation.motif_recherche) : le mot commence en début de mot.
+    Renvoie la liste (page, texte de la ligne, montant ou None) et la somme exacte (Decimal) des montants.
+    """
+    normalized_keyword = plier(search_word)  # Mot recherché plié une seule fois
+    motif = motif_recherche(normalized_keyword)
+    matching_lines = []
+    with METRIQUES.mesurer("recherche", pages=len(pages)) as mesures:
+        for page in pages:
+            lines = page["lines"]
+            trouvees = [(texte, norme.plie) for texte, norme in zip(lines.textes, lines.normes)
+                        if motif.search(norme.plie)]
+            plies = [plie for _, plie in trouvees]
+            for (texte, plie), montants in zip(trouvees, montants_par_ligne(plies)):  # Un passage par page
+                amount = extract_amount_after_keyword(plie, normalized_keyword, montants)
+                matching_lines.append((page["numero"], texte, amount))
+        mesures["trouves"] = len(matching_lines)
+    return matching_lines, total(amount for *_, amount in matching_lines if amount is not None)
+
+
+def rechercher_dans_magasin(magasin, search_word, sha256=None, dpi=None, montant_min=None, montant_max=None):
+    """Comme rechercher_mot, mais par requête sur le magasin : un document (sha256) ou tous
+
+    montant_min / montant_max : ne garder que les lignes dont le montant est dans l'intervalle.
+    Renvoie la liste (nom du document, page, ligne, texte, montant ou None) et la somme exacte des montants.
+    """
+    normalized_keyword = plier(search_word)
+    filtre_montant = montant_min is not None or montant_max is not None
+    matching_lines = []
+    with METRIQUES.mesurer("recherche_magasin") as mesures:
+        trouvees = list(magasin.rechercher(search_word, sha256=sha256, dpi=dpi))
+        montants = montants_par_ligne([plie for *_, plie in trouvees])  # Toutes les lignes en un passage
+        for (nom, _, page, ligne, texte, plie), montants_ligne in zip(trouvees, montants):
+            amount = extract_amount_after_keyword(plie, normalized_keyword, montants_ligne)
+            if filtre_montant and (
+                amount is None
+                or (montant_min is not None and amount < montant_min)
+                or (montant_max is not None and amount > montant_max)
+            ):
+                continue
+            matching_lines.append((nom, page, ligne, texte, amount))
+        mesures["trouves"] = len(matching_lines)
+    return matching_lines, total(amount for *_, amount in matching_lines if amount is not None)
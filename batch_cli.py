@@ -0,0 +1,200 @@
+# === TRAITEMENT PAR LOTS D'UN DOSSIER DE PDF, SANS INTERFACE ===
+#
+# Usage :
+#   python batch_cli.py famille releves/ -o famille.jsonl --csv famille.csv
+#   python batch_cli.py recherche releves/ --mot "échéance" -o echeances.jsonl
+#
+# Chaque PDF est traité dans un processus séparé (--workers) ; chaque résultat est écrit
+# dans le JSONL dès qu'il est prêt. Relancer la même commande reprend là où elle s'est
+# arrêtée : les fichiers déjà traités avec succès sont sautés, ceux en erreur ou partiels sont retentés.
+# --magasin enregistre aussi les lignes dans le magasin SQLite utilisé par trouve.py.
+# --metriques mesures.json (ou mesures.prom) exporte les durées par étape, cumulées sur tous les PDF traités.
+# Identifiants Google : --credentials (JSON du compte de service), sinon GOOGLE_APPLICATION_CREDENTIALS.
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import analyse
+from cache_ocr import CacheOCR
+from magasin import MagasinDocuments
+from metriques import METRIQUES, exporter_json, exporter_prometheus, fusionner_resumes
+from moteurs_ocr import MOTEUR_OCR, MOTEURS, creer_moteur
+from reprises import DEBIT_MAX, Reprises, SeauJetons
+
+DPI = 200  # Même résolution que famille.py et trouve.py : le cache OCR est partagé
+THREADS_OCR = 2  # Appels OCR simultanés dans chaque processus
+
+_lecteur = None  # Un client Google Vision et un lecteur par processus
+_magasin = None  # Magasin SQLite des lignes (--magasin), partagé par tous les processus
+
+
+def _initialiser(service_account_json, dpi, threads, chemin_magasin=None, nom_moteur=MOTEUR_OCR, nb_processus=1):
+    global _lecteur, _magasin
+    client = None
+    if nom_moteur == "vision":
+        client = analyse.client_partage(service_account_json)  # Un par processus, créé au premier appel à l'API
+    reprises = Reprises(SeauJetons(DEBIT_MAX / nb_processus))  # Le quota est partagé entre les processus
+    _lecteur = analyse.LecteurPDF(client, dpi, CacheOCR(), max_workers=threads,
+                                  moteur=creer_moteur(nom_moteur, client, reprises), reprises=reprises)
+    if chemin_magasin:
+        _magasin = MagasinDocuments(chemin_magasin)
+
+
+def traiter_fichier(chemin, commande, mot=None):
+    """Analyse un PDF et renvoie son enregistrement JSON (statut "erreur" si l'analyse échoue)"""
+    debut = time.perf_counter()
+    repere = METRIQUES.repere()  # Un PDF à la fois par processus : les mesures suivantes sont les siennes
+    enregistrement = {"fichier": chemin, "commande": commande}
+    if mot is not None:
+        enregistrement["mot"] = mot
+    try:
+        with open(chemin, "rb") as f:
+            pdf_bytes = f.read()
+        if _magasin is not None:
+            # Documents déjà dans le magasin : lignes relues sans OCR ; les nouveaux y sont ajoutés
+            enregistrement["sha256"], pages, _ = analyse.pages_memorisees(
+                _lecteur, pdf_bytes, _magasin, nom=os.path.basename(chemin)
+            )
+        else:
+            enregistrement["sha256"] = hashlib.sha256(pdf_bytes).hexdigest()
+            pages = analyse.analyser_pages(_lecteur, pdf_bytes)
+        enregistrement["pages"] = len(pages)
+        enregistrement["pages_en_erreur"] = analyse.pages_en_erreur(pages)
+
+        if commande == "famille":
+            type_doc, lignes, totaux = analyse.analyser_famille(pages)
+            enregistrement.update({
+                "type": type_doc,
+                "total_debit": float(totaux["DÉBIT"]),  # Totaux exacts (Decimal), écrits en nombres JSON
+                "total_credit": float(totaux["CRÉDIT"]),
+                "solde": float(totaux["CRÉDIT"] - totaux["DÉBIT"]),
+                "lignes": [
+                    {"page": l["page"], "ligne": l["ligne"], "famille": l["trouve"][4],
+                     "mot": l["trouve"][1], "montant": float(l["trouve"][0]), "texte": l["texte"]}
+                    for l in lignes if l["trouve"]
+                ],
+            })
+        else:
+            matching_lines, total_amount = analyse.rechercher_mot(pages, mot)
+            enregistrement.update({
+                "total": float(total_amount),
+                "lignes": [{"page": page, "texte": texte, "montant": None if montant is None else float(montant)}
+                           for page, texte, montant in matching_lines],
+            })
+        # Résultat partiel : enregistré, mais le fichier sera retraité à la prochaine reprise
+        enregistrement["statut"] = "partiel" if enregistrement["pages_en_erreur"] else "ok"
+    except Exception as e:
+        enregistrement.update({"statut": "erreur", "erreur": f"{type(e).__name__}: {e}"})
+    enregistrement["duree"] = round(time.perf_counter() - debut, 3)
+    enregistrement["metriques"] = METRIQUES.resume(depuis=repere)
+    return enregistrement
+
+
+def lister_pdfs(dossier):
+    """Chemins des PDF du dossier et de ses sous-dossiers, triés pour un ordre reproductible"""
+    chemins = []
+    for racine, _, fichiers in os.walk(dossier):
+        chemins.extend(os.path.join(racine, f) for f in fichiers if f.lower().endswith(".pdf"))
+    return sorted(chemins)
+
+
+def deja_traites(sortie, commande, mot=None):
+    """Fichiers enregistrés avec succès dans un JSONL existant, pour la même commande"""
+    faits = set()
+    if not os.path.exists(sortie):
+        return faits
+    with open(sortie, encoding="utf-8") as f:
+        for ligne in f:
+            try:
+                enregistrement = json.loads(ligne)
+            except json.JSONDecodeError:
+                continue  # Dernière ligne tronquée par une interruption
+            if (enregistrement.get("statut") == "ok" and enregistrement.get("commande") == commande
+                    and enregistrement.get("mot") == mot):
+                faits.add(enregistrement["fichier"])
+    return faits
+
+
+def ecrire_csv(sortie, chemin_csv):
+    """Résumé CSV (une ligne par PDF) reconstruit depuis le JSONL : le dernier résultat de chaque fichier gagne"""
+    derniers = {}
+    with open(sortie, encoding="utf-8") as f:
+        for ligne in f:
+            try:
+                enregistrement = json.loads(ligne)
+            except json.JSONDecodeError:
+                continue
+            derniers[enregistrement["fichier"]] = enregistrement
+
+    colonnes = ["fichier", "commande", "mot", "statut", "pages", "type", "total_debit", "total_credit",
+                "solde", "total", "nb_lignes", "duree", "erreur", "sha256"]
+    with open(chemin_csv, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=colonnes, extrasaction="ignore")
+        writer.writeheader()
+        for fichier in sorted(derniers):
+            enregistrement = dict(derniers[fichier])
+            enregistrement["nb_lignes"] = len(enregistrement.get("lignes", []))
+            writer.writerow(enregistrement)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse de relevés PDF en lot, sans interface Streamlit")
+    parser.add_argument("commande", choices=["famille", "recherche"],
+                        help="famille : totaux DÉBIT / CRÉDIT ; recherche : montants après un mot")
+    parser.add_argument("dossier", help="Dossier contenant les PDF (sous-dossiers compris)")
+    parser.add_argument("--mot", help="Mot à rechercher (commande recherche)")
+    parser.add_argument("-o", "--sortie", default="resultats.jsonl", help="Fichier JSONL des résultats (complété)")
+    parser.add_argument("--csv", help="Résumé CSV, régénéré à la fin depuis le JSONL")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Nombre de processus")
+    parser.add_argument("--dpi", type=int, default=DPI)
+    parser.add_argument("--magasin", help="Magasin SQLite où enregistrer les lignes (recherches ultérieures dans trouve.py)")
+    parser.add_argument("--moteur", choices=MOTEURS, default=MOTEUR_OCR, help="Moteur OCR des pages scannées")
+    parser.add_argument("--credentials", help="JSON du compte de service Google (sinon identifiants par défaut)")
+    parser.add_argument("--metriques", help="Durées par étape de cette exécution : JSON, ou texte Prometheus si .prom")
+    args = parser.parse_args(argv)
+
+    if args.commande == "recherche" and not args.mot:
+        parser.error("--mot est obligatoire pour la commande recherche")
+    mot = args.mot if args.commande == "recherche" else None
+    service_account_json = None
+    if args.credentials:
+        with open(args.credentials, encoding="utf-8") as f:
+            service_account_json = f.read()
+
+    faits = deja_traites(args.sortie, args.commande, mot)
+    a_traiter = [c for c in lister_pdfs(args.dossier) if c not in faits]
+    print(f"{len(a_traiter)} PDF à traiter ({len(faits)} déjà traités)", file=sys.stderr)
+
+    erreurs = 0
+    resumes = []  # Mesures de chaque PDF, additionnées à la fin
+    with open(args.sortie, "a", encoding="utf-8") as sortie, ProcessPoolExecutor(
+        max_workers=args.workers, initializer=_initialiser,
+        initargs=(service_account_json, args.dpi, THREADS_OCR, args.magasin, args.moteur, args.workers),
+    ) as executor:
+        futures = [executor.submit(traiter_fichier, chemin, args.commande, mot) for chemin in a_traiter]
+        for n, future in enumerate(as_completed(futures), 1):
+            enregistrement = future.result()
+            resumes.append(enregistrement["metriques"])
+            sortie.write(json.dumps(enregistrement, ensure_ascii=False) + "\n")
+            sortie.flush()  # Chaque résultat est acquis : une interruption ne perd que les PDF en cours
+            if enregistrement["statut"] != "ok":
+                erreurs += 1
+            print(f"[{n}/{len(a_traiter)}] {enregistrement['fichier']} : {enregistrement['statut']} "
+                  f"({enregistrement['duree']} s)", file=sys.stderr)
+
+    if args.csv:
+        ecrire_csv(args.sortie, args.csv)
+    if args.metriques:
+        resume = fusionner_resumes(resumes)
+        with open(args.metriques, "w", encoding="utf-8") as f:
+            f.write(exporter_prometheus(resume) if args.metriques.endswith(".prom") else exporter_json(resume))
+    return 1 if erreurs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# === BENCHMARK DU DÉMARRAGE (imports à froid et relances Streamlit) ===
+#
+# Usage :
+#   python benchmarks/bench_demarrage.py                 # 5 processus neufs par mesure
+#   python benchmarks/bench_demarrage.py --processus 10
+#
+# Chaque mesure part d'un processus Python neuf (rien en mémoire, fichiers .pyc déjà compilés) :
+# - import des modules d'entrée (analyse, batch_cli, chercher, cache_streamlit) ;
+# - première exécution puis relances des trois applis, sans document déposé (streamlit.testing).
+# Les bibliothèques lourdes chargées au passage sont listées : google-cloud-vision, PyMuPDF et fpdf
+# ne doivent l'être qu'au premier document, au premier appel OCR ou au premier rapport PDF.
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["analyse", "batch_cli", "chercher", "cache_streamlit"]
+APPLIS = ["tab.py", "trouve.py", "famille.py"]
+LOURDS = {"google.cloud.vision": "vision", "google.api_core.exceptions": "api_core", "fitz": "fitz", "fpdf": "fpdf"}
+RELANCES = 4
+
+CODE_IMPORT = """
+import sys, time
+debut = time.perf_counter()
+import {module}
+print((time.perf_counter() - debut) * 1000, ",".join(m for m in {lourds!r} if m in sys.modules) or "-")
+"""
+
+# Le script de l'appli est exécuté dans une enveloppe qui mesure sa durée de l'intérieur : le temps
+# d'attente de streamlit.testing entre deux exécutions n'est pas compté
+ENVELOPPE = """
+import sys, time
+sys.path.insert(0, {racine!r})
+debut = time.perf_counter()
+exec(compile(open({script!r}, encoding="utf-8").read(), {script!r}, "exec"))
+import streamlit
+streamlit.session_state.setdefault("_durees_bench", []).append((time.perf_counter() - debut) * 1000)
+"""
+
+CODE_APPLI = """
+import sys
+from streamlit.testing.v1 import AppTest
+appli = AppTest.from_file({enveloppe!r}, default_timeout=120)
+appli.secrets["GOOGLE_SERVICE_ACCOUNT_JSON"] = "{{}}"  # Jamais lu : aucun appel OCR sans document
+for _ in range({relances} + 1):
+    appli.run()
+durees = appli.session_state["_durees_bench"]
+print(durees[0], min(durees[1:]), len(appli.exception), ",".join(m for m in {lourds!r} if m in sys.modules) or "-")
+"""
+
+
+def _lancer(code):
+    """Dernière ligne de sortie d'un processus Python neuf, découpée en champs"""
+    sortie = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=RACINE, check=True)
+    return sortie.stdout.strip().splitlines()[-1].split()
+
+
+def _charges(champ):
+    return "-" if champ == "-" else " ".join(LOURDS[m] for m in champ.split(","))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Durée des imports à froid et des relances des applis Streamlit")
+    parser.add_argument("--processus", type=int, default=5, help="Processus neufs par mesure (la médiane compte)")
+    args = parser.parse_args()
+
+    print(f"{'module':<16} | {'import (ms)':>11} | chargés")
+    for module in MODULES:
+        mesures = [_lancer(CODE_IMPORT.format(module=module, lourds=list(LOURDS))) for _ in range(args.processus)]
+        print(f"{module:<16} | {statistics.median(float(m[0]) for m in mesures):>11.1f} | {_charges(mesures[-1][1])}")
+
+    print(f"\n{'appli':<16} | {'1re exéc. (ms)':>14} {'relance (ms)':>12} | chargés")
+    with tempfile.TemporaryDirectory() as dossier:
+        for appli in APPLIS:
+            enveloppe = os.path.join(dossier, appli)
+            with open(enveloppe, "w", encoding="utf-8") as f:
+                f.write(ENVELOPPE.format(racine=RACINE, script=os.path.join(RACINE, appli)))
+            code = CODE_APPLI.format(enveloppe=enveloppe, relances=RELANCES, lourds=list(LOURDS))
+            mesures = [_lancer(code) for _ in range(args.processus)]
+            if int(mesures[-1][2]):
+                print(f"{appli:<16} | exception pendant l'exécution")
+                continue
+            print(f"{appli:<16} | {statistics.median(float(m[0]) for m in mesures):>14.1f} "
+                  f"{statistics.median(float(m[1]) for m in mesures):>12.2f} | {_charges(mesures[-1][3])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# === MICRO-BENCHMARK DU REGROUPEMENT EN LIGNES ===
+#
+# Usage :
+#   python benchmarks/bench_lignes.py              # pages synthétiques de 1 000 à 20 000 mots
+#   python benchmarks/bench_lignes.py 50000        # tailles choisies
+#
+# Compare group_words_by_lines (lignes.py) à l'ancien algorithme quadratique
+# et vérifie que les deux produisent exactement les mêmes lignes.
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lignes import group_words_by_lines  # noqa: E402
+
+
+def group_words_by_lines_ancien(words, y_tolerance=10):
+    """Algorithme d'origine, gardé comme référence"""
+    lines = []
+    words_sorted = sorted(words, key=lambda w: w['bbox'][1])
+
+    for w in words_sorted:
+        x_min, y_min, x_max, y_max = w['bbox']
+        mid_y = (y_min + y_max) / 2
+        placed = False
+        for line in lines:
+            line_y = line['y_mean']
+            if abs(mid_y - line_y) <= y_tolerance:
+                line['words'].append(w)
+                ys = [(ww['bbox'][1] + ww['bbox'][3]) / 2 for ww in line['words']]
+                line['y_mean'] = sum(ys) / len(ys)
+                placed = True
+                break
+        if not placed:
+            lines.append({'y_mean': mid_y, 'words': [w]})
+
+    for line in lines:
+        line['words'] = sorted(line['words'], key=lambda w: w['bbox'][0])
+
+    return lines
+
+
+def page_synthetique(nb_mots, graine=0):
+    """Relevé dense : lignes de 12 mots environ, avec un léger bruit vertical comme en OCR"""
+    rng = random.Random(graine)
+    words = []
+    mots_par_ligne = 12
+    for i in range(nb_mots):
+        ligne, colonne = divmod(i, mots_par_ligne)
+        x = 40 + colonne * 180 + rng.randint(-5, 5)
+        y = 60 + ligne * 28 + rng.randint(-4, 4)
+        h = rng.randint(18, 26)
+        words.append({"text": f"m{i}", "bbox": (x, y, x + rng.randint(40, 160), y + h)})
+    rng.shuffle(words)  # L'OCR ne renvoie pas forcément les mots dans l'ordre de lecture
+    return words
+
+
+def _signature(lines):
+    return [(line['y_mean'], [w['text'] for w in line['words']]) for line in lines]
+
+
+def chronometrer(fonction, words, repetitions):
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction(words)
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur, resultat
+
+
+def main():
+    tailles = [int(t) for t in sys.argv[1:]] or [1_000, 5_000, 10_000, 20_000]
+    print(f"{'mots':>7} {'lignes':>7} | {'ancien (ms)':>11} {'nouveau (ms)':>12} {'gain':>6} | identique")
+    for nb_mots in tailles:
+        words = page_synthetique(nb_mots)
+        repetitions = 3 if nb_mots <= 10_000 else 1
+        t_ancien, ancien = chronometrer(group_words_by_lines_ancien, words, repetitions)
+        t_nouveau, nouveau = chronometrer(group_words_by_lines, words, repetitions)
+        identique = _signature(ancien) == _signature(nouveau)
+        print(f"{nb_mots:>7} {len(nouveau):>7} | {1000 * t_ancien:>11.1f} {1000 * t_nouveau:>12.1f} "
+              f"{t_ancien / t_nouveau:>5.1f}x | {'oui' if identique else 'NON'}")
+        if not identique:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
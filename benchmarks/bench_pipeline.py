@@ -0,0 +1,255 @@
+# === BENCHMARK DE BOUT EN BOUT SUR DES RELEVÉS SYNTHÉTIQUES (OCR REJOUÉ, SANS RÉSEAU) ===
+#
+# Usage :
+#   python benchmarks/bench_pipeline.py                    # 1, 10 et 50 pages, comparé à la référence
+#   python benchmarks/bench_pipeline.py 5 100 --type classique
+#   python benchmarks/bench_pipeline.py --enregistrer      # remplace la référence (reference_pipeline.json)
+#
+# Chaque relevé est écrit avec DejaVuSans.ttf : lignes de mots-clés DÉBIT / CRÉDIT de analyse.MOTS_*_BASE
+# suivies d'un montant, mêlées à des opérations sans mot-clé. Le PDF est ensuite « scanné » (pages
+# remplacées par leur image) et les mots de la couche texte d'origine sont enregistrés comme résultat OCR
+# de chaque image : le pipeline complet (rendu, encodage, OCR rejoué, regroupement, mots-clés) tourne
+# sans Google Vision et ses totaux sont vérifiés au centime près.
+#
+# Chaque taille est mesurée dans un processus neuf (pic de mémoire RSS comparable), meilleure de
+# --repetitions exécutions. Les durées par étape sont additionnées page par page (les threads OCR se
+# chevauchent) ; pages/s est le débit réel. Une étape plus lente que la référence au-delà de la tolérance
+# (ou un pic de mémoire plus haut) est signalée et le code de sortie vaut 1.
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # noqa: E402  PyMuPDF
+
+import analyse  # noqa: E402
+from cache_ocr import CacheOCR  # noqa: E402
+from encodage import encoder_image  # noqa: E402
+from metriques import METRIQUES  # noqa: E402
+from moteurs_ocr import MoteurEnregistre  # noqa: E402
+from rendu_pdf import iter_pages  # noqa: E402
+from texte_natif import mots_natifs  # noqa: E402
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POLICE = os.path.join(RACINE, "DejaVuSans.ttf")
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference_pipeline.json")
+
+DPI = 200  # Celui de famille.py et de batch_cli.py
+DPI_SCAN = 150  # Résolution des images du PDF « scanné »
+LIGNES_PAR_PAGE = 40
+PART_MOTS_CLES = 0.4  # Part des lignes avec un mot-clé et un montant
+TOLERANCE = 0.25  # Ralentissement toléré par rapport à la référence (25 %)
+ECART_MIN_MS = 1.0  # En dessous, un écart par page est du bruit de mesure
+REPETITIONS = 3
+ETAPES = ("rendu", "encodage", "ocr", "regroupement", "mots_cles")
+
+LIBELLES_NEUTRES = [
+    "Opération diverse réf. {n}",
+    "Frais de dossier (voir conditions générales)",
+    "Report à nouveau",
+    "Virement reçu n° {n}",
+    "Information : taux annuel effectif global",
+    "Carte n° {n} — opérations du mois",
+]
+
+
+# === GÉNÉRATION D'UN RELEVÉ ===
+def generer_releve(nb_pages, type_doc="Crédit renouvelable", graine=0):
+    """PDF texte d'un relevé synthétique et ses totaux attendus {"DÉBIT": ..., "CRÉDIT": ...}"""
+    rng = random.Random(graine)
+    if type_doc == "Crédit renouvelable":
+        debits, credits = list(analyse.MOTS_DEBIT_BASE), list(analyse.MOTS_CREDIT_BASE)
+        entete = f"Relevé de compte — N° d'affaire {rng.randint(10**9, 10**10)}"  # "affaire" : crédit renouvelable
+    else:
+        debits, credits = list(analyse.MOTS_DEBIT_CLASSIQUE_BASE), list(analyse.MOTS_CREDIT_CLASSIQUE_BASE)
+        entete = f"Tableau des opérations — prêt n° {rng.randint(10**9, 10**10)}"
+    totaux = {"DÉBIT": 0, "CRÉDIT": 0}  # En centimes : la somme attendue est exacte
+
+    doc = fitz.open()
+    for numero in range(1, nb_pages + 1):
+        page = doc.new_page(width=595, height=842)  # A4
+        page.insert_font(fontname="dejavu", fontfile=POLICE)
+        lignes = [entete, f"Page {numero}/{nb_pages}", ""]
+        for _ in range(LIGNES_PAR_PAGE):
+            date = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024"
+            if rng.random() < PART_MOTS_CLES:
+                famille = "DÉBIT" if rng.random() < 0.5 else "CRÉDIT"
+                mot = rng.choice(debits if famille == "DÉBIT" else credits)
+                centimes = rng.randint(100, 99_999)
+                totaux[famille] += centimes
+                lignes.append(f"{date} {mot} {centimes // 100},{centimes % 100:02d}")
+            else:
+                lignes.append(f"{date} {rng.choice(LIBELLES_NEUTRES).format(n=rng.randint(1000, 99999))}")
+        for i, texte in enumerate(lignes):
+            page.insert_text((50, 60 + i * 18), texte, fontname="dejavu", fontsize=10)
+    pdf_bytes = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    return pdf_bytes, {famille: Decimal(centimes).scaleb(-2) for famille, centimes in totaux.items()}
+
+
+def scanner(pdf_bytes, dpi=DPI_SCAN):
+    """Même document, chaque page remplacée par son image en niveaux de gris (plus de couche texte)"""
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as source, fitz.open() as scan:
+        for page in source:
+            pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+            nouvelle = scan.new_page(width=page.rect.width, height=page.rect.height)
+            nouvelle.insert_image(nouvelle.rect, pixmap=pix)
+        return scan.tobytes(garbage=3, deflate=True)
+
+
+def enregistrer_ocr(pdf_texte, pdf_scan, dpi, dossier):
+    """Enregistre, pour l'image de chaque page scannée, les mots de la page texte d'origine"""
+    moteur = MoteurEnregistre(dossier)
+    with fitz.open(stream=pdf_texte, filetype="pdf") as doc:
+        for numero, image in iter_pages(pdf_scan, dpi):  # Mêmes réglages de rendu que le pipeline
+            moteur.enregistrer(image, mots_natifs(doc[numero - 1], dpi))
+
+
+class MoteurRejoue(MoteurEnregistre):
+    """Résultats enregistrés, après l'encodage qu'aurait demandé l'envoi à Google Vision"""
+
+    def __call__(self, image_pil, infos=None):
+        encoder_image(image_pil, infos=infos)
+        return super().__call__(image_pil, infos=infos)
+
+
+# === MESURE D'UN SCÉNARIO (DANS UN PROCESSUS NEUF) ===
+def _pic_memoire_mo():
+    import resource
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pic / 1024 ** 2 if sys.platform == "darwin" else pic / 1024  # Octets sous macOS, Ko ailleurs
+
+
+def executer_scenario(chemin_scan, dossier_ocr, dpi, type_doc, totaux_attendus, repetitions=REPETITIONS):
+    """Meilleur débit et meilleure durée de chaque étape sur plusieurs exécutions"""
+    with open(chemin_scan, "rb") as f:
+        pdf_bytes = f.read()
+    meilleur = None
+    for _ in range(repetitions):
+        with tempfile.TemporaryDirectory() as dossier_cache:  # Cache OCR vide : chaque page est « lue »
+            lecteur = analyse.LecteurPDF(None, dpi, CacheOCR(dossier_cache), moteur=MoteurRejoue(dossier_ocr))
+            repere = METRIQUES.repere()
+            debut = time.perf_counter()
+            pages = analyse.analyser_pages(lecteur, pdf_bytes)
+            type_trouve, _, totaux = analyse.analyser_famille(pages)
+            duree = time.perf_counter() - debut
+        resume = METRIQUES.resume(depuis=repere)
+        nb = len(pages)
+        resultat = {
+            "pages": nb,
+            "pages_par_s": round(nb / duree, 2),
+            "ms_par_page": {etape: round(1000 * resume[etape]["duree_totale"] / nb, 2)
+                            for etape in ETAPES if etape in resume},
+            "ko_envoyes_par_page": round(resume["encodage"]["valeurs"]["octets"] / nb / 1024, 1),
+            "exact": type_trouve == type_doc and all(
+                totaux[f] == totaux_attendus[f] for f in totaux_attendus  # Decimal : égalité exacte au centime
+            ),
+        }
+        if meilleur is None:
+            meilleur = resultat
+        else:
+            meilleur["pages_par_s"] = max(meilleur["pages_par_s"], resultat["pages_par_s"])
+            for etape, ms in resultat["ms_par_page"].items():
+                meilleur["ms_par_page"][etape] = min(meilleur["ms_par_page"].get(etape, ms), ms)
+            meilleur["exact"] = meilleur["exact"] and resultat["exact"]
+    meilleur["pic_memoire_mo"] = round(_pic_memoire_mo(), 1)
+    return meilleur
+
+
+def comparer(resultat, reference, tolerance):
+    """Étapes (débit global, pic de mémoire) moins bonnes que la référence au-delà de la tolérance"""
+    lentes = []
+    for etape, ms in resultat["ms_par_page"].items():
+        ms_ref = reference["ms_par_page"].get(etape)
+        if ms_ref and ms > ms_ref * (1 + tolerance) and ms - ms_ref > ECART_MIN_MS:
+            lentes.append(f"{etape} {ms_ref:.1f} → {ms:.1f} ms/page")
+    if resultat["pages_par_s"] < reference["pages_par_s"] / (1 + tolerance):
+        lentes.append(f"débit {reference['pages_par_s']:.1f} → {resultat['pages_par_s']:.1f} pages/s")
+    if resultat["pic_memoire_mo"] > reference["pic_memoire_mo"] * (1 + tolerance):
+        lentes.append(f"mémoire {reference['pic_memoire_mo']:.0f} → {resultat['pic_memoire_mo']:.0f} Mo")
+    return lentes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit du pipeline complet sur des relevés synthétiques, OCR rejoué")
+    parser.add_argument("tailles", nargs="*", type=int, help="Nombres de pages (défaut : 1 10 50)")
+    parser.add_argument("--type", choices=["renouvelable", "classique"], default="renouvelable")
+    parser.add_argument("--dpi", type=int, default=DPI)
+    parser.add_argument("--repetitions", type=int, default=REPETITIONS, help="Exécutions par taille (la meilleure compte)")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Ralentissement toléré (0.25 = 25 %%)")
+    parser.add_argument("--enregistrer", action="store_true", help="Enregistre ces résultats comme référence")
+    args = parser.parse_args()
+
+    tailles = args.tailles or [1, 10, 50]
+    type_doc = "Crédit renouvelable" if args.type == "renouvelable" else "Prêt classique"
+    reference = {}
+    if os.path.exists(REFERENCE) and not args.enregistrer:
+        with open(REFERENCE, encoding="utf-8") as f:
+            reference = json.load(f)
+    references = reference.get("resultats", {}) if reference.get("dpi") == args.dpi else {}
+
+    resultats = {}
+    probleme = False
+    print(f"{'pages':>5} | {'pages/s':>7} " + " ".join(f"{e:>12}" for e in ETAPES)
+          + f" | {'Ko/page':>7} {'pic Mo':>7} | exact")
+    with tempfile.TemporaryDirectory() as dossier:
+        for nb_pages in tailles:
+            pdf_texte, totaux_attendus = generer_releve(nb_pages, type_doc, graine=nb_pages)
+            pdf_scan = scanner(pdf_texte)
+            chemin_scan = os.path.join(dossier, f"releve_{nb_pages}.pdf")
+            with open(chemin_scan, "wb") as f:
+                f.write(pdf_scan)
+            dossier_ocr = os.path.join(dossier, f"ocr_{nb_pages}")
+            enregistrer_ocr(pdf_texte, pdf_scan, args.dpi, dossier_ocr)
+
+            # "spawn" : processus vierge, le pic de mémoire ne dépend que de ce scénario
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                resultat = executor.submit(executer_scenario, chemin_scan, dossier_ocr, args.dpi,
+                                           type_doc, totaux_attendus, args.repetitions).result()
+            resultats[f"{args.type}_{nb_pages}"] = resultat
+
+            print(f"{nb_pages:>5} | {resultat['pages_par_s']:>7.1f} "
+                  + " ".join(f"{resultat['ms_par_page'].get(e, 0):>9.1f} ms" for e in ETAPES)
+                  + f" | {resultat['ko_envoyes_par_page']:>7.0f} {resultat['pic_memoire_mo']:>7.0f}"
+                  + f" | {'oui' if resultat['exact'] else 'NON'}")
+            if not resultat["exact"]:
+                probleme = True
+            ref = references.get(f"{args.type}_{nb_pages}")
+            if ref:
+                lentes = comparer(resultat, ref, args.tolerance)
+                if lentes:
+                    probleme = True
+                    print("        moins bon que la référence : " + ", ".join(lentes))
+
+    if args.enregistrer:
+        if os.path.exists(REFERENCE):
+            with open(REFERENCE, encoding="utf-8") as f:
+                reference = json.load(f)
+        if reference.get("dpi") != args.dpi:
+            reference = {"resultats": {}}
+        reference.update({
+            "dpi": args.dpi,
+            "machine": f"{platform.machine()} {platform.system()}, {os.cpu_count()} CPU, Python {platform.python_version()}",
+            "fitz": fitz.VersionBind,
+        })
+        reference["resultats"].update(resultats)
+        with open(REFERENCE, "w", encoding="utf-8") as f:
+            json.dump(reference, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Référence enregistrée : {REFERENCE}")
+    elif not references:
+        print("Pas de référence pour ce DPI : --enregistrer pour en créer une.")
+    return 1 if probleme else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
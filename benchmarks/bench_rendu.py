@@ -0,0 +1,115 @@
+# === BENCHMARK DU RENDU PDF → IMAGES (débit et, en option, qualité OCR) ===
+#
+# Usage :
+#   python benchmarks/bench_rendu.py releve.pdf
+#   python benchmarks/bench_rendu.py releve.pdf --ocr     # + précision OCR Google Vision
+#
+# La précision est mesurée par rapport à la couche texte du PDF (PDF numérique requis) :
+# part des mots de la couche texte retrouvés par l'OCR sur l'image rendue.
+# Pour --ocr, le client Vision utilise GOOGLE_APPLICATION_CREDENTIALS.
+import argparse
+import io
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rendu_pdf import iter_pages  # noqa: E402
+from texte_natif import extraire_couche_texte  # noqa: E402
+
+REGLAGES = [
+    # (DPI, mode, côté max)
+    (300, "RGB", None),
+    (200, "RGB", None),
+    (200, "L", None),
+    (200, "1", None),
+    (150, "L", None),
+    (300, "L", 2048),
+]
+
+
+def _octets_png(image):
+    tampon = io.BytesIO()
+    image.save(tampon, format="PNG")
+    return tampon.tell()
+
+
+def mesurer_rendu(pdf_bytes, dpi, mode, cote_max, encoder):
+    debut = time.perf_counter()
+    nb = pixels = octets = 0
+    for _, image in iter_pages(pdf_bytes, dpi, mode=mode, cote_max=cote_max):
+        nb += 1
+        pixels += image.width * image.height
+        if encoder:
+            octets += _octets_png(image)
+    duree = time.perf_counter() - debut
+    return nb, duree, pixels, octets
+
+
+def mesurer_pdf2image(pdf_bytes, dpi):
+    """Ancien chemin (poppler en sous-processus), pour comparaison si pdf2image est installé"""
+    try:
+        from pdf2image import convert_from_bytes
+        debut = time.perf_counter()
+        images = [img.convert("RGB") for img in convert_from_bytes(pdf_bytes, dpi=dpi)]
+    except Exception:  # pdf2image ou poppler absent
+        return None
+    return len(images), time.perf_counter() - debut
+
+
+def precision_ocr(pdf_bytes, dpi, mode, cote_max, client):
+    from google.cloud import vision
+    from vision_batch import mots_depuis_reponse
+
+    reference = extraire_couche_texte(pdf_bytes, dpi, cote_max=cote_max)
+    trouves = attendus = 0
+    for numero, image in iter_pages(pdf_bytes, dpi, mode=mode, cote_max=cote_max):
+        natif = reference[numero - 1]
+        if natif is None:
+            continue
+        tampon = io.BytesIO()
+        image.save(tampon, format="PNG")
+        response = client.text_detection(image=vision.Image(content=tampon.getvalue()))
+        lus = Counter(w["text"] for w in mots_depuis_reponse(response))
+        for mot, n in Counter(w["text"] for w in natif["words"]).items():
+            attendus += n
+            trouves += min(n, lus[mot])
+    return trouves / attendus if attendus else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare les réglages de rendu PDF (débit, taille, précision OCR)")
+    parser.add_argument("pdf", help="Fichier PDF de référence")
+    parser.add_argument("--ocr", action="store_true", help="Mesure aussi la précision Google Vision (appels payants)")
+    parser.add_argument("--sans-png", action="store_true", help="Ne mesure pas la taille PNG (rendu seul)")
+    args = parser.parse_args()
+
+    with open(args.pdf, "rb") as f:
+        pdf_bytes = f.read()
+
+    client = None
+    if args.ocr:
+        from google.cloud import vision
+        client = vision.ImageAnnotatorClient()
+
+    print(f"{'DPI':>4} {'mode':>4} {'côté max':>8} | {'pages/s':>8} {'ms/page':>8} {'Mpx/page':>8} {'Ko PNG/page':>11}"
+          + (" | précision" if client else ""))
+    for dpi, mode, cote_max in REGLAGES:
+        nb, duree, pixels, octets = mesurer_rendu(pdf_bytes, dpi, mode, cote_max, encoder=not args.sans_png)
+        ligne = (f"{dpi:>4} {mode:>4} {str(cote_max or '-'):>8} | {nb / duree:>8.1f} {1000 * duree / nb:>8.1f} "
+                 f"{pixels / nb / 1e6:>8.2f} {octets / nb / 1024:>11.0f}")
+        if client:
+            precision = precision_ocr(pdf_bytes, dpi, mode, cote_max, client)
+            ligne += f" | {precision:.1%}" if precision is not None else " | (pas de couche texte)"
+        print(ligne)
+
+    ancien = mesurer_pdf2image(pdf_bytes, 200)
+    if ancien:
+        nb, duree = ancien
+        print(f"pdf2image 200 DPI RGB (ancien chemin) : {nb / duree:.1f} pages/s, {1000 * duree / nb:.1f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# === CACHE DISQUE DES RÉSULTATS OCR (partagé par tab.py, trouve.py et famille.py) ===
+import hashlib
+import json
+import os
+import threading
+
+from mots_page import MotsPage
+
+DOSSIER_CACHE = os.environ.get("OCR_CACHE_DIR", ".cache_ocr")
+TAILLE_MAX_OCTETS = int(os.environ.get("OCR_CACHE_MAX_BYTES", 500 * 1024 * 1024))  # 500 Mo par défaut
+
+
+class CacheOCR:
+    """Cache persistant des mots OCR, indexé par le contenu de la page rendue"""
+
+    def __init__(self, dossier=DOSSIER_CACHE, taille_max=TAILLE_MAX_OCTETS):
+        self.dossier = dossier
+        self.taille_max = taille_max
+        self._verrou = threading.Lock()
+        self._taille = None  # Taille totale connue du cache (calculée au premier besoin)
+        os.makedirs(self.dossier, exist_ok=True)
+
+    # === CLÉ : HASH DES PIXELS + DPI + TYPE DE DÉTECTION ===
+    def cle(self, image_pil, dpi, feature="TEXT_DETECTION"):
+        h = hashlib.sha256()
+        h.update(f"{image_pil.mode}|{image_pil.size}|{dpi}|{feature}|".encode("utf-8"))
+        h.update(image_pil.tobytes())  # Pixels bruts : pas besoin d'encoder en PNG pour calculer la clé
+        return h.hexdigest()
+
+    def _chemin(self, cle):
+        return os.path.join(self.dossier, cle[:2], cle + ".json")
+
+    def cle_octets(self, data, dpi, feature="TEXT_DETECTION"):
+        """Clé pour un contenu brut (PDF entier envoyé à l'API fichiers)"""
+        h = hashlib.sha256()
+        h.update(f"octets|{dpi}|{feature}|".encode("utf-8"))
+        h.update(data)
+        return h.hexdigest()
+
+    def _lire_json(self, cle):
+        chemin = self._chemin(cle)
+        try:
+            with open(chemin, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(chemin)  # Date d'accès mise à jour → sert d'ordre LRU
+        return data
+
+    def _ecrire_json(self, cle, data):
+        chemin = self._chemin(cle)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        tmp = f"{chemin}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, chemin)  # Écriture atomique : jamais de fichier à moitié écrit
+        with self._verrou:
+            if self._taille is not None:
+                self._taille += os.path.getsize(chemin)
+            depasse = self._taille is None or self._taille > self.taille_max
+        if depasse:
+            self.evincer()
+
+    def lire(self, cle):
+        """Renvoie la liste des mots en cache, ou None si absente"""
+        data = self._lire_json(cle)
+        if data is None:
+            return None
+        return MotsPage.depuis_dicts(data)
+
+    def ecrire(self, cle, words):
+        self._ecrire_json(cle, MotsPage.depuis_dicts(words).en_json())
+
+    def lire_document(self, cle):
+        """Renvoie les mots de chaque page d'un document en cache, ou None"""
+        data = self._lire_json(cle)
+        if data is None:
+            return None
+        return [MotsPage.depuis_dicts(page) for page in data]
+
+    def ecrire_document(self, cle, pages):
+        self._ecrire_json(cle, [MotsPage.depuis_dicts(page).en_json() for page in pages])
+
+    # === ÉVICTION LRU PAR TAILLE TOTALE ===
+    def evincer(self):
+        entrees = []
+        total = 0
+        for racine, _, fichiers in os.walk(self.dossier):
+            for nom in fichiers:
+                if not nom.endswith(".json"):
+                    continue
+                chemin = os.path.join(racine, nom)
+                try:
+                    st_ = os.stat(chemin)
+                except OSError:
+                    continue
+                entrees.append((st_.st_mtime, st_.st_size, chemin))
+                total += st_.st_size
+
+        if total > self.taille_max:
+            for _, taille, chemin in sorted(entrees):  # Les moins récemment utilisées d'abord
+                try:
+                    os.remove(chemin)
+                except OSError:
+                    continue
+                total -= taille
+                if total <= self.taille_max:
+                    break
+
+        with self._verrou:
+            self._taille = total
+
+
+def ocr_avec_cache(cache, image_pil, fonction_ocr, dpi, feature="TEXT_DETECTION", infos=None):
+    """Appelle fonction_ocr uniquement si la page n'a jamais été lue
+
+    Si infos est un dict, il reçoit "cache" (True si la page était en cache) et les mesures de fonction_ocr.
+    """
+    cle = cache.cle(image_pil, dpi, feature)
+    words = cache.lire(cle)
+    if infos is not None:
+        infos["cache"] = words is not None
+    if words is None:
+        words = fonction_ocr(image_pil, infos=infos)
+        cache.ecrire(cle, words)
+    return words
@@ -0,0 +1,75 @@
+# === MÉMOÏSATION STREAMLIT (partagée par tab.py, trouve.py et famille.py) ===
+#
+# Streamlit relance tout le script à chaque interaction (case cochée, bouton...).
+# Les objets coûteux sont créés une fois par processus (st.cache_resource) et l'analyse
+# d'un document est gardée par hash du PDF (st.cache_data) : une relance ne refait que
+# l'étape peu coûteuse (recherche des mots-clés, affichage).
+import io
+import os
+
+import streamlit as st
+from PIL import Image
+
+from analyse import LecteurPDF, analyser_pages, client_partage
+from cache_ocr import CacheOCR
+from magasin import MagasinDocuments, empreinte
+from moteurs_ocr import MOTEUR_OCR, creer_moteur
+
+
+LARGEUR_LOGO = 1460  # Largeur maximale d'une image affichée par Streamlit : au-delà, st.image la réduit à chaque relance
+
+
+def client_vision():
+    """Client Google Vision du processus (analyse.client_partage) : créé au premier appel à l'API, puis
+    réutilisé par toutes les relances et sessions"""
+    return client_partage(st.secrets["GOOGLE_SERVICE_ACCOUNT_JSON"])
+
+
+@st.cache_resource(show_spinner=False)
+def cache_ocr_partage():
+    return CacheOCR()
+
+
+@st.cache_resource(show_spinner=False)
+def lecteur_pdf(dpi):
+    """Lecteur avec le moteur OCR_MOTEUR ; le client Google Vision n'est créé que s'il sert"""
+    client = client_vision() if MOTEUR_OCR == "vision" else None
+    return LecteurPDF(client, dpi, cache_ocr_partage(), moteur=creer_moteur(MOTEUR_OCR, client))
+
+
+@st.cache_resource(show_spinner=False)
+def magasin_documents():
+    return MagasinDocuments()
+
+
+@st.cache_resource(show_spinner=False)
+def logo(chemin="logo.png"):
+    """Logo en PNG, réduit une fois pour toutes à LARGEUR_LOGO (None s'il manque)
+
+    Donné tel quel à st.image, le logo (2720 px) était décodé, réduit et réencodé à chaque relance.
+    """
+    if not os.path.exists(chemin):
+        return None
+    with Image.open(chemin) as image:
+        image.thumbnail((LARGEUR_LOGO, image.height))
+        tampon = io.BytesIO()
+        image.save(tampon, format="PNG")
+    return tampon.getvalue()
+
+
+def document_depose(uploaded_file):
+    """(sha256, octets) du PDF déposé ; le hash n'est calculé qu'une fois par fichier déposé"""
+    pdf_bytes = uploaded_file.getvalue()
+    cle = f"sha256_{uploaded_file.file_id}"
+    if cle not in st.session_state:
+        st.session_state[cle] = empreinte(pdf_bytes)
+    return st.session_state[cle], pdf_bytes
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def pages_analysees(sha256, _pdf_bytes, dpi):
+    """Lignes de chaque page (analyse.analyser_pages), gardées par hash du PDF et DPI
+
+    _pdf_bytes n'entre pas dans la clé du cache : Streamlit n'a pas à hacher tout le PDF à chaque relance.
+    """
+    return analyser_pages(lecteur_pdf(dpi), _pdf_bytes)
@@ -0,0 +1,42 @@
+# === RECHERCHE DANS TOUS LES DOCUMENTS DÉJÀ ANALYSÉS (index plein texte du magasin) ===
+#
+# Usage :
+#   python chercher.py "indemnité de retard"
+#   python chercher.py échéance --min 100 --max 500 --json
+#
+# Interroge le magasin SQLite rempli par trouve.py ou par batch_cli.py --magasin : aucun OCR.
+import argparse
+import json
+import sys
+from decimal import Decimal
+
+from analyse import rechercher_dans_magasin
+from magasin import CHEMIN_MAGASIN, MagasinDocuments
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recherche d'un mot et des montants associés dans le magasin")
+    parser.add_argument("mot", help="Mot ou expression (sans tenir compte des accents ni de la casse)")
+    parser.add_argument("--magasin", default=CHEMIN_MAGASIN)
+    parser.add_argument("--dpi", type=int, help="Limiter aux documents analysés à ce DPI")
+    parser.add_argument("--min", type=Decimal, dest="montant_min", help="Montant minimal")
+    parser.add_argument("--max", type=Decimal, dest="montant_max", help="Montant maximal")
+    parser.add_argument("--json", action="store_true", help="Une ligne JSON par résultat")
+    args = parser.parse_args(argv)
+
+    magasin = MagasinDocuments(args.magasin)
+    matching_lines, total_amount = rechercher_dans_magasin(
+        magasin, args.mot, dpi=args.dpi, montant_min=args.montant_min, montant_max=args.montant_max
+    )
+    for nom, page, ligne, texte, montant in matching_lines:
+        if args.json:
+            print(json.dumps({"document": nom, "page": page, "ligne": ligne, "texte": texte,
+                              "montant": None if montant is None else float(montant)},
+                             ensure_ascii=False))
+        else:
+            print(f"{nom} p.{page} L{ligne} : {texte}" + (f" → {montant:.2f} €" if montant is not None else ""))
+    print(f"{len(matching_lines)} ligne(s), total {total_amount:.2f} €", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# === COLONNES DES RELEVÉS : MONTANTS ALIGNÉS EN COLONNES DÉBIT / CRÉDIT ===
+#
+# Sur les relevés en tableau, le montant n'est pas collé au libellé : il est dans une colonne à
+# droite (souvent « Débit » puis « Crédit »), et l'OCR le coupe parfois en plusieurs mots
+# ("1" "234,56"). Une fois par page, les montants de chaque ligne sont repérés mot à mot, leurs
+# bords droits sont regroupés en colonnes par histogramme (NumPy) et les en-têtes « débit » /
+# « crédit » nomment ces colonnes. Ensuite, le montant d'une ligne dans une colonne se lit directement.
+import math
+import re
+
+import numpy as np
+
+from montants import montant_suivant, montants_de_texte, montants_par_ligne, valeur
+from normalisation import plier
+
+MOTIF_CANDIDAT = re.compile(r"\d ?[.,] ?\d{2}\b")  # Une ligne sans ce motif n'a aucun montant, même coupé
+_NUMERIQUE = re.compile(r"[\d.,-]+").fullmatch  # Mot pouvant faire partie d'un montant
+
+PAS_HISTOGRAMME = 0.015  # Largeur d'une case de l'histogramme, en part de la largeur de la page
+MIN_MONTANTS_COLONNE = 3  # Moins de montants alignés : pas une colonne (montants dans le texte)
+PART_MIN_COLONNE = 0.05  # ... ni moins de 5 % des montants de la page
+ECART_MAX_MOTS = 0.6  # Écart maximal entre deux morceaux d'un même montant, en hauteur de mot
+DISTANCE_MAX_ENTETE = 0.1  # Distance maximale entre un en-tête et sa colonne, en part de la largeur
+
+ENTETES = {"debit": "DÉBIT", "debits": "DÉBIT", "credit": "CRÉDIT", "credits": "CRÉDIT"}
+
+
+def _joindre(morceaux):
+    """Valeur (Decimal) du montant formé par ces morceaux de mots, ou None
+
+    Avec des espaces : groupes de milliers ("1" "234,56"). Sans espace : seulement si la coupure
+    est autour d'un séparateur ou d'un signe ("123" "," "45", "-" "12,50") ; "12" "34,56" reste deux nombres.
+    """
+    montant = valeur(" ".join(morceaux))
+    if montant is None and len(morceaux) > 1 and any(m[:1] in ",.-" or m[-1:] in ",.-" for m in morceaux):
+        montant = valeur("".join(morceaux))
+    return montant
+
+
+def montants_de_ligne(textes, boites):
+    """Montants d'une ligne, mots voisins fusionnés : [(montant, x0, x1, (début, fin))]
+
+    textes et boites : texte et [x0, y0, x1, y1] de chaque mot de la ligne, de gauche à droite.
+    (début, fin) est la position du montant dans le texte de la ligne (mots joints par une espace).
+    """
+    debuts = []  # Position de chaque mot dans le texte de la ligne
+    position = 0
+    for texte in textes:
+        debuts.append(position)
+        position += len(texte) + 1
+
+    montants = []
+    i = 0
+    while i < len(textes):
+        if not _NUMERIQUE(textes[i]):
+            i += 1
+            continue
+        # Suite de morceaux numériques proches ("1" "234,56", "123" "," "45") : essai du plus long d'abord
+        fin = i + 1
+        while (fin < len(textes) and _NUMERIQUE(textes[fin])
+               and boites[fin][0] - boites[fin - 1][2] <= ECART_MAX_MOTS * (boites[fin][3] - boites[fin][1])):
+            fin += 1
+        for j in range(fin, i, -1):
+            montant = _joindre(textes[i:j])
+            if montant is not None:
+                montants.append((montant, boites[i][0], boites[j - 1][2],
+                                 (debuts[i], debuts[j - 1] + len(textes[j - 1]))))
+                i = j
+                break
+        else:
+            i += 1
+    return montants
+
+
+def _sans_milliers_eloignes(norme, montants_texte, fins_mots):
+    """Montants du texte d'une ligne, sans groupe de milliers formé de deux mots éloignés
+
+    Les mots de la ligne sont joints par une espace : "n° 3" puis "150,00" une colonne plus loin se
+    lisent "3 150,00". Un montant coupé par une espace n'est gardé que s'il a aussi été lu mot à mot
+    (fins_mots : montant et fin de ceux de montants_de_ligne, mots voisins seulement) ; sinon il est
+    relu à partir de la coupure ("150,00").
+    """
+    gardes = []
+    for montant, debut, fin in montants_texte:
+        espace = norme.plie.find(" ", debut, fin)
+        if espace < 0 or (abs(montant), norme.vers_original(debut, fin)[1]) in fins_mots:
+            gardes.append((montant, debut, fin))
+            continue
+        reste = [(m, espace + 1 + d, espace + 1 + f) for m, d, f in montants_de_texte(norme.plie[espace + 1:fin])]
+        gardes += _sans_milliers_eloignes(norme, reste, fins_mots)
+    return gardes
+
+
+def detecter_colonnes(bords_droits, largeur):
+    """Intervalles [gauche, droite) des colonnes de montants, d'après l'histogramme des bords droits
+
+    Les montants d'une colonne sont alignés à droite : leurs bords droits tombent dans quelques
+    cases voisines. Une suite de cases occupées réunissant assez de montants est une colonne.
+    """
+    if len(bords_droits) < MIN_MONTANTS_COLONNE:
+        return []
+    pas = max(1.0, largeur * PAS_HISTOGRAMME)
+    effectifs, bornes = np.histogram(bords_droits, bins=np.arange(0.0, largeur + 2 * pas, pas))
+    occupees = np.concatenate(([0], (effectifs > 0).astype(np.int8), [0]))
+    changements = np.diff(occupees)
+    debuts, fins = np.flatnonzero(changements == 1), np.flatnonzero(changements == -1)
+    cumul = np.concatenate(([0], np.cumsum(effectifs)))
+    seuil = max(MIN_MONTANTS_COLONNE, math.ceil(PART_MIN_COLONNE * len(bords_droits)))
+    garder = (cumul[fins] - cumul[debuts]) >= seuil
+    return [(float(bornes[d]), float(bornes[f])) for d, f in zip(debuts[garder], fins[garder])]
+
+
+class MiseEnPage:
+    """Montants et colonnes d'une page (LignesPage de analyse.lignes_de_page), calculés une seule fois"""
+
+    def __init__(self, lines):
+        # Lignes pouvant contenir un montant : un seul passage de regex sur le texte de toute la page
+        plies = [norme.plie for norme in lines.normes]
+        departs = np.cumsum([0] + [len(plie) + 1 for plie in plies[:-1]])
+        positions = [m.start() for m in MOTIF_CANDIDAT.finditer("\n".join(plies))]
+        self.candidates = np.zeros(len(lines), dtype=bool)
+        self.candidates[np.searchsorted(departs, positions, side="right") - 1] = True
+        self.normes = lines.normes
+
+        textes, boites = lines.textes_mots(), lines.boites_mots()  # Mots de chaque ligne, tirés des tableaux de la page
+        self.montants = [montants_de_ligne(textes[k], boites[k]) if candidate else []
+                         for k, candidate in enumerate(self.candidates.tolist())]
+        # Montants du texte plié de chaque ligne, pour les mots-clés
+        self.montants_texte = [
+            _sans_milliers_eloignes(norme, montants_texte, {(abs(m[0]), m[3][1]) for m in montants_mots})
+            for norme, montants_texte, montants_mots in zip(lines.normes, montants_par_ligne(plies), self.montants)
+        ]
+        largeur = int(lines.mots.bboxes[:, 2].max()) if len(lines.mots) else 0
+        tous = [m for montants in self.montants for m in montants]
+        bords_droits = np.array([m[2] for m in tous], dtype=np.float64)
+        self.colonnes = detecter_colonnes(bords_droits, largeur)
+
+        # Colonne de chaque montant, en une seule recherche dichotomique pour toute la page (-1 : hors colonne)
+        indices = [-1] * len(tous)
+        if self.colonnes:
+            gauches, droites = np.array(self.colonnes).T
+            trouvees = np.maximum(np.searchsorted(gauches, bords_droits, side="right") - 1, 0)
+            indices = np.where(bords_droits < droites[trouvees], trouvees, -1).tolist()
+
+        self._par_ligne = []  # Pour chaque ligne : [(colonne, montant, position)], colonnes de gauche à droite
+        k = 0
+        for montants in self.montants:
+            self._par_ligne.append([(indices[k + n], m[0], m[3]) for n, m in enumerate(montants)
+                                    if indices[k + n] >= 0])
+            k += len(montants)
+        self.familles = self._nommer_colonnes(textes, boites, plies, tous, indices, largeur)
+
+    def _nommer_colonnes(self, textes, boites, plies, tous, indices, largeur):
+        """Colonne → "DÉBIT" / "CRÉDIT" d'après les en-têtes (mots « débit », « crédit » d'une ligne sans montant)"""
+        if not self.colonnes:
+            return {}
+        etendues = {}  # Colonne → (gauche, droite) réels de ses montants
+        for m, indice in zip(tous, indices):
+            if indice >= 0:
+                gauche, droite = etendues.get(indice, (m[1], m[2]))
+                etendues[indice] = (min(gauche, m[1]), max(droite, m[2]))
+
+        familles = {}
+        for textes_ligne, boites_ligne, plie, montants in zip(textes, boites, plies, self.montants):
+            if montants or ("debit" not in plie and "credit" not in plie):
+                continue
+            for texte, boite in zip(textes_ligne, boites_ligne):
+                famille = ENTETES.get(plier(texte).strip(".:()"))
+                if famille is None:
+                    continue
+                centre = (boite[0] + boite[2]) / 2
+                distance, colonne = min(
+                    (max(gauche - centre, centre - droite, 0), c) for c, (gauche, droite) in etendues.items()
+                )
+                if distance <= DISTANCE_MAX_ENTETE * largeur:
+                    familles.setdefault(colonne, famille)
+        return familles
+
+    def montant_colonne(self, idx, famille, fin_mot):
+        """(montant, position) de la ligne idx pour un mot-clé de la famille finissant à fin_mot (texte plié)
+
+        Page à en-têtes Débit / Crédit : le montant de la colonne nommée pour la famille, sinon None (une
+        colonne sans nom peut être le solde). Page sans en-tête : le premier montant après le mot-clé.
+        Le montant est rendu sans signe : c'est la colonne (ou le mot-clé) qui dit débit ou crédit.
+        """
+        if self.familles:
+            for colonne, montant, position in self._par_ligne[idx]:
+                if self.familles.get(colonne) == famille:
+                    return abs(montant), position
+            return None
+        montant = montant_suivant(self.montants_texte[idx], fin_mot)
+        if montant is None:
+            return None
+        return abs(montant[0]), self.normes[idx].vers_original(montant[1], montant[2])
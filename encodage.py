@@ -0,0 +1,88 @@
+# === ENCODAGE DES PAGES AVANT ENVOI À L'OCR ===
+import io
+import os
+import time
+
+from mots_page import MotsPage
+
+# Réglages par défaut, modifiables sans toucher au code
+FORMAT_ENCODAGE = os.environ.get("OCR_ENCODAGE", "PNG").upper()  # "PNG", "JPEG" ou "WEBP"
+QUALITE = int(os.environ.get("OCR_QUALITE", 85))  # Qualité JPEG / WebP (1-100)
+NIVEAUX_DE_GRIS = os.environ.get("OCR_ENCODAGE_GRIS", "0") == "1"  # Convertit en gris avant encodage
+TAILLE_MAX_DEFAUT = 8 * 1024 * 1024  # L'API refuse au-delà de ~10 Mo
+TAILLE_MAX_ENVOI = int(os.environ.get("OCR_TAILLE_MAX_ENVOI", TAILLE_MAX_DEFAUT))
+
+FORMATS = ("PNG", "JPEG", "WEBP")
+QUALITE_MIN = 40  # On ne descend pas plus bas avant de réduire la taille de l'image
+FACTEUR_REDUCTION = 0.8
+
+
+def _encoder(image_pil, format_, qualite):
+    tampon = io.BytesIO()
+    if format_ == "PNG":
+        image_pil.save(tampon, format="PNG")
+    else:
+        if image_pil.mode not in ("RGB", "L"):
+            image_pil = image_pil.convert("L" if image_pil.mode == "1" else "RGB")  # JPEG/WebP : pas de mode "1"
+        image_pil.save(tampon, format=format_, quality=qualite)
+    return tampon.getvalue()
+
+
+def signature_encodage(format_=FORMAT_ENCODAGE, qualite=QUALITE, gris=NIVEAUX_DE_GRIS, taille_max=TAILLE_MAX_ENVOI):
+    """Réglages d'encodage à ajouter à la clé du cache OCR : l'image envoyée, donc les mots lus, en dépendent
+
+    Vide avec les réglages par défaut (PNG en couleur, taille maximale d'origine) : clés d'avant ces réglages.
+    """
+    parties = []
+    if format_ != "PNG":
+        parties.append(f"{format_}:{qualite}")  # La qualité ne compte pas en PNG
+    if gris:
+        parties.append("GRIS")
+    if taille_max != TAILLE_MAX_DEFAUT:
+        parties.append(f"MAX:{taille_max}")
+    return "".join(f"|{partie}" for partie in parties)
+
+
+def encoder_image(image_pil, format_=FORMAT_ENCODAGE, qualite=QUALITE, gris=NIVEAUX_DE_GRIS,
+                  taille_max=TAILLE_MAX_ENVOI, infos=None):
+    """Encode une page pour l'envoi ; renvoie (octets, échelle appliquée à l'image)
+
+    Si le résultat dépasse taille_max, la qualité baisse d'abord (JPEG/WebP), puis l'image est
+    réduite : les coordonnées renvoyées par l'OCR doivent alors être divisées par l'échelle.
+    ValueError si même une image de 1 × 1 pixel dépasse taille_max.
+    Si infos est un dict, il reçoit le format, les octets envoyés et la durée d'encodage.
+    """
+    if format_ not in FORMATS:
+        raise ValueError(f"Format d'encodage inconnu : {format_} (attendu : {', '.join(FORMATS)})")
+
+    debut = time.perf_counter()
+    if gris and image_pil.mode not in ("L", "1"):
+        image_pil = image_pil.convert("L")
+
+    origine = image_pil
+    echelle = 1.0
+    content = _encoder(image_pil, format_, qualite)
+    while len(content) > taille_max:
+        if format_ != "PNG" and qualite > QUALITE_MIN:
+            qualite = max(QUALITE_MIN, qualite - 15)
+        elif image_pil.size == (1, 1):
+            raise ValueError(f"Page impossible à encoder en {format_} sous {taille_max} octets")
+        else:
+            echelle *= FACTEUR_REDUCTION
+            taille = (max(1, round(origine.width * echelle)), max(1, round(origine.height * echelle)))
+            image_pil = origine.resize(taille)
+        content = _encoder(image_pil, format_, qualite)
+    echelle = image_pil.width / origine.width  # Échelle exacte après arrondi des dimensions
+
+    if infos is not None:
+        infos["format"] = format_
+        infos["octets"] = len(content)
+        infos["duree_encodage"] = time.perf_counter() - debut
+    return content, echelle
+
+
+def remettre_a_l_echelle(words, echelle):
+    """Ramène les boîtes OCR d'une image réduite dans le repère de la page d'origine"""
+    if echelle == 1.0:
+        return words
+    return MotsPage.depuis_dicts(words).remis_a_l_echelle(echelle)  # Toutes les boîtes d'un bloc
@@ -1,255 +1,41 @@
 # === IMPORTS ===
 import streamlit as st
-from pdf2image import convert_from_bytes
-from google.oauth2 import service_account
-from google.cloud import vision
-import io
-import re
-from PIL import Image, ImageDraw, ImageFont
-import unicodedata
 import os
-import json
-from unidecode import unidecode
-from PIL import ImageFont
+from mots_cles import MoteurMotsCles
+from analyse import detecter_type_document, extraire_montants, mots_du_type, pages_en_erreur  # Logique partagée avec batch_cli.py
+from cache_streamlit import document_depose, lecteur_pdf, logo, pages_analysees  # Rien n'est recalculé d'une relance à l'autre
+from metriques import METRIQUES  # Durées par étape et par page
+from ocr_parallele import resumer_cache  # Légende du cache OCR pour ce document
+from panneau_metriques import afficher_mesures  # Panneau de débogage (OCR_DEBUG=1 ou ?debug=1)
 
-font_path = "fonts/DejaVuSans.ttf"
-font = ImageFont.truetype(font_path, size=20)
-
-# === INITIALISATION DU CLIENT GOOGLE VISION (Streamlit Secrets) ===
-service_account_info = json.loads(st.secrets["GOOGLE_SERVICE_ACCOUNT_JSON"])
-credentials = service_account.Credentials.from_service_account_info(service_account_info)
-client = vision.ImageAnnotatorClient(credentials=credentials)
-
-
-# === FONCTION POUR GÉNÉRER LES VARIANTES D'ACCENTS ===
-def generer_variantes(mot):
-    """Génère toutes les variantes avec/sans accents et combinaisons"""
-    variantes = set()
-    
-    # Version originale
-    variantes.add(mot)
-    
-    # Version sans aucun accent
-    sans_accent = unidecode(mot)
-    variantes.add(sans_accent)
-    
-    # Versions avec combinaisons d'accents partiels
-    if any(c in mot for c in "éèêëàâäîïôöùûüç"):
-        mots_partiels = []
-        for i, c in enumerate(mot):
-            if c in "éèêë":
-                # Variantes pour chaque e accentué
-                mots_partiels.extend([
-                    mot[:i] + 'e' + mot[i+1:],
-                    mot[:i] + 'é' + mot[i+1:],
-                    mot[:i] + 'è' + mot[i+1:],
-                ])
-            elif c in "àâä":
-                # Variantes pour chaque a accentué
-                mots_partiels.extend([
-                    mot[:i] + 'a' + mot[i+1:],
-                    mot[:i] + 'à' + mot[i+1:],
-                ])
-        
-        # Ajoute les combinaisons générées
-        for mp in mots_partiels:
-            variantes.add(mp)
-    
-    return list(variantes)
-
-# === DÉFINITION DES MOTS CLÉS AVEC VARIANTES ===
-def creer_dictionnaire_mots(mots_base):
-    """Crée un dictionnaire avec toutes les variantes de chaque mot"""
-    nouveau_dict = {}
-    for mot, anciennes_variantes in mots_base.items():
-        # Génère toutes les nouvelles variantes
-        toutes_variantes = generer_variantes(mot)
-        # Ajoute les anciennes variantes si existent
-        if anciennes_variantes:
-            for v in anciennes_variantes:
-                toutes_variantes.extend(generer_variantes(v))
-        # Élimine les doublons
-        toutes_variantes = list(set(toutes_variantes))
-        nouveau_dict[mot] = toutes_variantes
-    return nouveau_dict
-
-# Dictionnaires de base
-MOTS_CREDIT_BASE = {
-    "prélevé sur votre compte bancaire": ["preleve sur votre compte bancaire"],
-    "votre prélèvement": ["votre prelevement"],
-    "votre règlement par cb": ["votre reglement par cb"],
-    "votre règlement par ccp": ["votre reglement par ccp"]
-}
-
-MOTS_DEBIT_BASE = {
-    "cotis cb prélevée banque FOMO": ["cotis cb prelevee banque FOMO"],
-    "solde FMRB précédent": ["solde FMRB precedent"],
-    "retour de prélèvement impayé": ["retour de prelevement impaye"],
-    "indemnité de retard": ["indemnite de retard"],
-    "remise à jour de vos impayés": ["remise a jour de vos impayes"],
-    "transfert sur votre carte AURORE": [],
-    "transfert différé/crédit": ["transfert differe/credit"],
-    "régul d'agios": ["regul d'agios"],
-    "remise à jour de vos intérêts": ["remise a jour de vos interets"],
-    "votre utilisation": [],
-    "arrêté de compte": ["%"],
-    "trans. différé precedent/credit": [
-        "trans. differe precedent/credit",
-        "trans . differe precedent/credit"
-    ]
-}
-
-MOTS_CREDIT_CLASSIQUE_BASE = {
-    "prélèvement banque": ["prelevement banque"],
-    "prélèvement mso": ["prelevement mso"],
-    "annulation de retard": [],
-    "versement cb": [],
-    "annulation ird": [],
-    "cheque": [],
-    "annulation indemnités retard": ["annulation indemnites retard"]
-}
-
-MOTS_DEBIT_CLASSIQUE_BASE = {
-    "échéance": ["echeance"],
-    "indemnités de retard": ["indemnites de retard"],
-    "prélèvement impayé": ["prelevement impaye"],
-    "indemnité report": ["indemnite report"],
-    "déchéance du terme": ["decheance du terme"],
-    "indemnité de transmission": ["indemnite de transmission"]
-}
-
-# Création des dictionnaires complets avec variantes
-MOTS_CREDIT_RENOUVELABLE = creer_dictionnaire_mots(MOTS_CREDIT_BASE)
-MOTS_DEBIT_RENOUVELABLE = creer_dictionnaire_mots(MOTS_DEBIT_BASE)
-MOTS_CREDIT_CLASSIQUE = creer_dictionnaire_mots(MOTS_CREDIT_CLASSIQUE_BASE)
-MOTS_DEBIT_CLASSIQUE = creer_dictionnaire_mots(MOTS_DEBIT_CLASSIQUE_BASE)
-
-# === FONCTIONS OCR ===
-def pdf_to_images(pdf_bytes):
-    return convert_from_bytes(pdf_bytes)
-
-def group_words_by_lines(words, y_tolerance=10):
-    """Regroupe les mots en lignes basées sur leur position Y"""
-    lines = []
-    words_sorted = sorted(words, key=lambda w: w['bbox'][1])
-
-    for w in words_sorted:
-        x_min, y_min, x_max, y_max = w['bbox']
-        mid_y = (y_min + y_max) / 2
-        placed = False
-        for line in lines:
-            line_y = line['y_mean']
-            if abs(mid_y - line_y) <= y_tolerance:
-                line['words'].append(w)
-                ys = [(ww['bbox'][1] + ww['bbox'][3]) / 2 for ww in line['words']]
-                line['y_mean'] = sum(ys) / len(ys)
-                placed = True
-                break
-        if not placed:
-            lines.append({'y_mean': mid_y, 'words': [w]})
-
-    for line in lines:
-        line['words'] = sorted(line['words'], key=lambda w: w['bbox'][0])
-
-    return lines
-
-def vision_ocr_detect_text(image_pil):
-    img_byte_arr = io.BytesIO()
-    image_pil.save(img_byte_arr, format='PNG')
-    content = img_byte_arr.getvalue()
-    image = vision.Image(content=content)
-    response = client.text_detection(image=image)
-    
-    if response.error.message:
-        raise Exception(f"Google Vision API error: {response.error.message}")
-
-    if not response.text_annotations:
-        return []
-
-    words = []
-    for ann in response.text_annotations[1:]:  # Skip the first element (full text)
-        vertices = ann.bounding_poly.vertices
-        x_coords = [v.x for v in vertices]
-        y_coords = [v.y for v in vertices]
-        bbox = (min(x_coords), min(y_coords), max(x_coords), max(y_coords))
-        words.append({"text": ann.description, "bbox": bbox})
-
-    return words
-
-def detecter_type_document(images):
-    """Détecte si c'est un prêt classique ou crédit renouvelable"""
-    for pil_img in images:
-        words = vision_ocr_detect_text(pil_img.convert("RGB"))
-        if not words:
-            continue
-            
-        lines = group_words_by_lines(words)
-        for line in lines:
-            line_text = " ".join([w['text'] for w in line['words']])
-            if "affaire" in line_text.lower():
-                return "Crédit renouvelable"
-    return "Prêt classique"
+# === CLIENT GOOGLE VISION ET CACHE OCR : créés une fois (cache_streamlit, Streamlit Secrets) ===
+DPI = 200  # Résolution de rendu des pages (fait partie de la clé du cache, voir rendu_pdf pour mode et taille max)
 
 # === FONCTIONS D'EXTRACTION ===
-def extraire_montant_apres_mot(ligne_text, mot_principal, mots_reference):
-    # Cas spécial pour l'arrêté de compte
-    if mot_principal == "arrêté de compte":
-        pattern = re.compile(r"%[\s-]*(\d+[\.,]\d{2})\b")
-        match = pattern.search(ligne_text)
-        if match:
-            montant_str = match.group(1).replace(',', '.')
-            try:
-                return float(montant_str), "%"
-            except ValueError:
-                return None, None
-    
-    # Récupère toutes les variantes du mot
-    variantes = [mot_principal] + mots_reference.get(mot_principal, [])
-    
-    for variante in variantes:
-        pattern = re.compile(
-            r"(" + re.escape(variante) + r")[\s-]*(\d+[\.,]\d{2})\b",
-            re.IGNORECASE
-        )
-        match = pattern.search(ligne_text)
-        if match:
-            montant_str = match.group(2).replace(',', '.')
-            try:
-                return float(montant_str), match.group(1)
-            except ValueError:
-                continue
-    return None, None
-
-def surligner_texte(ligne_text, mot_trouve, montant):
+def surligner_texte(ligne_text, position_mot, position_montant):
+    """Surligne le mot-clé et le montant à partir de leurs positions (début, fin) dans la ligne"""
     style_mot = "background-color: #FFF59D; padding: 2px; border-radius: 3px;"
     style_montant = "background-color: #C8E6C9; padding: 2px; border-radius: 3px;"
-    
-    if mot_trouve == "%":
-        texte_surligne = ligne_text.replace("%", f"<span style='{style_mot}'>%</span>")
-    else:
-        texte_surligne = ligne_text.replace(mot_trouve, f"<span style='{style_mot}'>{mot_trouve}</span>")
-    
-    montant_str = f"{montant:.2f}".replace('.', '[\.,]')
-    pattern_montant = re.compile(r"(\d+[\.,]\d{2})")
-    montant_trouve = pattern_montant.search(ligne_text)
-    
-    if montant_trouve:
-        texte_surligne = texte_surligne.replace(
-            montant_trouve.group(1),
-            f"<span style='{style_montant}'>{montant_trouve.group(1)}</span>"
-        )
-    
-    return texte_surligne
+
+    morceaux = []
+    position = 0
+    for (debut, fin), style in sorted([(position_mot, style_mot), (position_montant, style_montant)]):
+        morceaux.append(ligne_text[position:debut])
+        morceaux.append(f"<span style='{style}'>{ligne_text[debut:fin]}</span>")
+        position = fin
+    morceaux.append(ligne_text[position:])
+    return "".join(morceaux)
 
 # === INTERFACE STREAMLIT ===
 st.set_page_config(page_title="Analyse de documents bancaires", layout="wide")
+repere = METRIQUES.repere()  # Le panneau de débogage ne montre que les mesures de cette relance
 
 # === AFFICHAGE DU LOGO ===
-if os.path.exists("logo.png"):
-    logo_img = Image.open("logo.png")
+logo_png = logo()  # Réduit une fois par processus (cache_streamlit) : plus de réencodage à chaque relance
+if logo_png is not None:
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        st.image(logo_img)
+        st.image(logo_png)
 else:
     st.warning("Logo non trouvé. Assure-toi que 'logo.png' est présent dans le même dossier que ce script.")
 
@@ -259,13 +45,20 @@ st.title("🏦 Analyse de documents bancaires")
 uploaded_file = st.file_uploader("Déposez votre document PDF", type=["pdf"])
 
 if uploaded_file:
-    pdf_bytes = uploaded_file.read()
     try:
-        images = pdf_to_images(pdf_bytes)
-        
+        # OCR unique de toutes les pages : sert à la détection du type ET à l'extraction.
+        # Gardé par hash du PDF : cocher une case ne relance que la recherche des mots-clés.
+        sha256, pdf_bytes = document_depose(uploaded_file)
+        with st.spinner("Analyse OCR du document..."):
+            pages = pages_analysees(sha256, pdf_bytes, DPI)
+        erreurs = pages_en_erreur(pages)
+        if erreurs:
+            pages_analysees.clear(sha256, pdf_bytes, DPI)  # Résultat partiel : pas gardé, la prochaine relance retente ces pages
+            st.warning(f"OCR impossible pour la/les page(s) {', '.join(map(str, erreurs))} malgré les reprises : "
+                       "totaux partiels, calculés sur les autres pages.")
+
         # Détection du type de document
-        with st.spinner("Analyse du type de document..."):
-            type_doc = detecter_type_document(images)
+        type_doc = detecter_type_document(pages)
         
         # Affichage clair du type de document dans un cadre visible
         st.markdown(f"""
@@ -275,12 +68,7 @@ if uploaded_file:
         """, unsafe_allow_html=True)
         
         # Sélection des mots-clés appropriés
-        if type_doc == "Crédit renouvelable":
-            mots_credit = MOTS_CREDIT_RENOUVELABLE
-            mots_debit = MOTS_DEBIT_RENOUVELABLE
-        else:
-            mots_credit = MOTS_CREDIT_CLASSIQUE
-            mots_debit = MOTS_DEBIT_CLASSIQUE
+        mots_debit, mots_credit = mots_du_type(type_doc)
         
         # Sélection des mots-clés
         st.subheader("🔍 Sélectionnez les mots-clés à rechercher")
@@ -305,64 +93,33 @@ if uploaded_file:
             st.warning("Veuillez sélectionner au moins un mot-clé à rechercher")
             st.stop()
         
-        # Analyse du document
-        line_counter = 0
-        total_debit = 0.0
-        total_credit = 0.0
-        
-        for i, pil_img in enumerate(images):
-            pil_img = pil_img.convert("RGB")
-            with st.spinner(f"Analyse OCR de la page {i+1}..."):
-                words = vision_ocr_detect_text(pil_img)
-
-            if not words:
-                continue
-
-            lines = group_words_by_lines(words, y_tolerance=10)
-
-            st.markdown(f"**Page {i+1} - Texte reconnu :**")
-            for idx, line in enumerate(lines):
-                line_text = " ".join([w['text'] for w in line['words']])
-                ligne_num = line_counter + idx + 1
-                
-                montant_trouve = None
-                mot_trouve = None
-                type_montant = None
-                
-                # D'abord les débits
-                for mot in debits_selectionnes:
-                    montant, mot_var = extraire_montant_apres_mot(line_text, mot, mots_debit)
-                    if montant:
-                        montant_trouve = montant
-                        mot_trouve = mot_var
-                        type_montant = "DÉBIT"
-                        total_debit += montant
-                        break
-                
-                # Puis les crédits si pas trouvé en débit
-                if not montant_trouve:
-                    for mot in credits_selectionnes:
-                        montant, mot_var = extraire_montant_apres_mot(line_text, mot, mots_credit)
-                        if montant:
-                            montant_trouve = montant
-                            mot_trouve = mot_var
-                            type_montant = "CRÉDIT"
-                            total_credit += montant
-                            break
-                
-                # Affichage avec surlignage
-                if montant_trouve:
-                    texte_surligne = surligner_texte(line_text, mot_trouve, montant_trouve)
-                    st.markdown(
-                        f"L{ligne_num} ({type_montant}): {texte_surligne} → "
-                        f"<span style='color: {"red" if type_montant == "DÉBIT" else "green"};'>"
-                        f"{montant_trouve:.2f} €</span>",
-                        unsafe_allow_html=True
-                    )
-                else:
-                    st.write(f"L{ligne_num}: {line_text}")
-
-            line_counter += len(lines)
+        # Analyse du document : tous les mots-clés sélectionnés sont compilés une seule fois
+        moteur = MoteurMotsCles(debits_selectionnes, mots_debit, credits_selectionnes, mots_credit)
+        # D'abord les débits, puis les crédits, colonnes de montants repérées une fois par page (même
+        # logique que batch_cli) ; totaux exacts au centime
+        lignes, totaux = extraire_montants(pages, moteur)
+        total_debit, total_credit = totaux["DÉBIT"], totaux["CRÉDIT"]
+
+        lignes_par_page = {}
+        for ligne in lignes:
+            lignes_par_page.setdefault(ligne["page"], []).append(ligne)
+
+        for page in pages:
+            with METRIQUES.mesurer("affichage", page=page["numero"], lignes=len(page["lines"])):
+                st.markdown(f"**Page {page['numero']} - Texte reconnu :**")
+                for ligne in lignes_par_page.get(page["numero"], []):
+                    # Affichage avec surlignage
+                    if ligne["trouve"]:
+                        montant_trouve, _, position_mot, position_montant, type_montant = ligne["trouve"]
+                        texte_surligne = surligner_texte(ligne["texte"], position_mot, position_montant)
+                        st.markdown(
+                            f"L{ligne['ligne']} ({type_montant}): {texte_surligne} → "
+                            f"<span style='color: {'red' if type_montant == 'DÉBIT' else 'green'};'>"
+                            f"{montant_trouve:.2f} €</span>",
+                            unsafe_allow_html=True
+                        )
+                    else:
+                        st.write(f"L{ligne['ligne']}: {ligne['texte']}")
 
         # Affichage des totaux
         solde_final = total_credit - total_debit
@@ -394,13 +151,20 @@ if uploaded_file:
             </div>
             """, unsafe_allow_html=True)
 
+        st.caption(resumer_cache(pages, lecteur_pdf(DPI).moteur.libelle))  # Ce document seulement : le cache OCR est commun au processus
+        with st.expander("⏱️ Lecture par page (texte natif ou OCR)"):
+            for page in pages:
+                st.write(f"Page {page['numero']} : {page['lecture']}")
+        afficher_mesures(repere)
+
     except Exception as e:
         st.error(f"Erreur: {e}")
-from fpdf import FPDF
-import tempfile
-
 # Ajout du bouton pour générer le PDF
 if st.button("📄 Générer un rapport PDF"):
+    import tempfile
+
+    from fpdf import FPDF  # Chargé seulement quand un rapport est demandé
+
     class PDF(FPDF):
         def header(self):
             if os.path.exists("logo.png"):
@@ -0,0 +1,85 @@
+# === REGROUPEMENT DES MOTS EN LIGNES (partagé par les trois applis) ===
+from bisect import bisect_left, bisect_right, insort
+
+import numpy as np
+
+from mots_page import LignesPage, MotsPage
+
+
+def group_words_by_lines(words, y_tolerance=10):
+    """Regroupe les mots en lignes basées sur leur position Y
+
+    Même résultat que l'algorithme d'origine (chaque mot rejoint la première ligne créée
+    dont la moyenne Y est à moins de y_tolerance), mais les lignes candidates sont trouvées
+    par recherche dichotomique dans les moyennes triées, et chaque moyenne est tenue à jour
+    par somme courante au lieu d'être recalculée sur tous les mots de la ligne.
+    Quand le moteur OCR donne ses lignes (mots.lignes, Google Vision), ce sont elles qui sont
+    regroupées, d'un bloc : une ligne Vision n'est jamais coupée, et le libellé et le montant
+    d'une même rangée (souvent deux blocs Vision distincts) se retrouvent sur la même ligne.
+    words : MotsPage (ou liste de mots {"text", "bbox"}) ; renvoie une LignesPage (mots_page.py).
+    """
+    mots = MotsPage.depuis_dicts(words)
+    if not len(mots):
+        return LignesPage.vide()
+
+    bboxes = mots.bboxes.astype(np.float64)
+    milieux = (bboxes[:, 1] + bboxes[:, 3]) / 2  # Centres verticaux des mots
+    ordre = np.argsort(bboxes[:, 1], kind="stable")  # Du haut vers le bas (tri stable, comme sorted())
+    if mots.lignes is None:
+        # Chaque mot est regroupé seul, dans l'ordre de parcours
+        parcours = milieux[ordre].tolist()  # Centre de chaque unité, dans l'ordre de parcours
+        sommes_unites = parcours
+        effectifs_unites = [1] * len(parcours)
+    else:
+        # Chaque ligne du moteur est regroupée d'un bloc, de la plus haute à la plus basse
+        _, unite = np.unique(mots.lignes, return_inverse=True)
+        hauts = np.full(unite.max() + 1, np.inf)
+        np.minimum.at(hauts, unite, bboxes[:, 1])
+        ordre_unites = np.argsort(hauts, kind="stable")
+        sommes_unites = np.bincount(unite, weights=milieux)[ordre_unites]
+        effectifs_unites = np.bincount(unite)[ordre_unites]
+        parcours = (sommes_unites / effectifs_unites).tolist()
+        sommes_unites, effectifs_unites = sommes_unites.tolist(), effectifs_unites.tolist()
+        rang_unite = np.empty_like(ordre_unites)
+        rang_unite[ordre_unites] = np.arange(len(ordre_unites))
+        unite = rang_unite[unite][ordre]  # Rang de parcours de l'unité de chaque mot, mots du haut vers le bas
+
+    y_means = []  # Moyenne Y de chaque ligne
+    sommes = []  # Somme des centres Y de chaque ligne (même ordre d'addition que sum())
+    effectifs = []  # Nombre de mots de chaque ligne
+    moyennes = []  # (y_mean, index de la ligne), triés par y_mean
+    ligne_unite = []  # Ligne de chaque unité, dans l'ordre de parcours
+
+    for mid_y, somme, effectif in zip(parcours, sommes_unites, effectifs_unites):
+        # Lignes dont la moyenne est dans [mid_y - tol, mid_y + tol] ; la marge couvre les arrondis,
+        # le test exact abs(...) <= tol est refait ci-dessous
+        debut = bisect_left(moyennes, (mid_y - y_tolerance - 1e-9,))
+        fin = bisect_right(moyennes, (mid_y + y_tolerance + 1e-9, float("inf")))
+        index = min(
+            (idx for y, idx in moyennes[debut:fin] if abs(mid_y - y) <= y_tolerance),
+            default=None,
+        )
+
+        if index is None:  # Nouvelle ligne
+            index = len(y_means)
+            y_means.append(mid_y)
+            sommes.append(somme)
+            effectifs.append(effectif)
+        else:
+            del moyennes[bisect_left(moyennes, (y_means[index], index))]
+            sommes[index] += somme
+            effectifs[index] += effectif
+            y_means[index] = sommes[index] / effectifs[index]  # Moyenne Y de la ligne, mise à jour
+        insort(moyennes, (y_means[index], index))
+        ligne_unite.append(index)
+
+    # Ligne de chaque mot (mots du haut vers le bas)
+    if mots.lignes is None:
+        ligne_de = np.array(ligne_unite, dtype=np.int64)
+    else:
+        ligne_de = np.array(ligne_unite, dtype=np.int64)[unite]
+
+    # Mots rangés ligne par ligne, de gauche à droite : tri stable par (ligne, x0), comme sorted() sur chaque ligne
+    rang = np.lexsort((bboxes[ordre, 0], ligne_de))
+    debuts = np.concatenate(([0], np.cumsum(np.bincount(ligne_de, minlength=len(y_means))))).astype(np.int64)
+    return LignesPage(mots, ordre[rang].astype(np.int64), debuts, np.array(y_means))
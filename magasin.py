@@ -0,0 +1,170 @@
+# === MAGASIN SQLITE DES DOCUMENTS ANALYSÉS (lignes regroupées, par hash du PDF) ===
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+
+from mots_page import LignesPage
+from normalisation import TexteNormalise, motif_recherche, plier
+
+CHEMIN_MAGASIN = os.environ.get("OCR_MAGASIN", "documents.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    dpi INTEGER NOT NULL,
+    nom TEXT,
+    nb_pages INTEGER NOT NULL,
+    ajoute_le REAL NOT NULL,
+    UNIQUE (sha256, dpi)
+);
+CREATE TABLE IF NOT EXISTS lignes (
+    id INTEGER PRIMARY KEY,
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    page INTEGER NOT NULL,
+    ligne INTEGER NOT NULL,
+    texte TEXT NOT NULL,
+    plie TEXT NOT NULL,
+    x0 REAL, y0 REAL, x1 REAL, y1 REAL,
+    mots TEXT NOT NULL,
+    UNIQUE (document_id, ligne)
+);
+
+-- Index inversé sur les mots pliés de chaque ligne, tenu à jour par déclencheurs
+CREATE VIRTUAL TABLE IF NOT EXISTS lignes_fts USING fts5(
+    plie, content='lignes', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS lignes_fts_ajout AFTER INSERT ON lignes BEGIN
+    INSERT INTO lignes_fts (rowid, plie) VALUES (new.id, new.plie);
+END;
+CREATE TRIGGER IF NOT EXISTS lignes_fts_suppression AFTER DELETE ON lignes BEGIN
+    INSERT INTO lignes_fts (lignes_fts, rowid, plie) VALUES ('delete', old.id, old.plie);
+END;
+"""
+
+
+def empreinte(pdf_bytes):
+    """Hash SHA-256 du PDF : identifie le document quel que soit son nom"""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+class MagasinDocuments:
+    """Lignes regroupées de chaque document (texte, forme pliée, boîte, page, numéro de ligne)
+
+    Une fois un PDF analysé, les recherches suivantes (autre mot, autre document) sont de
+    simples requêtes SQL : plus de rendu ni d'OCR.
+    """
+
+    def __init__(self, chemin=CHEMIN_MAGASIN):
+        self.chemin = chemin
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        with closing(self._connexion()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")  # Lectures pendant les écritures (batch_cli en parallèle)
+            conn.executescript(_SCHEMA)
+
+    def _connexion(self):
+        # Une connexion par opération : Streamlit et batch_cli appellent depuis plusieurs threads / processus
+        conn = sqlite3.connect(self.chemin, timeout=30)
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _document_id(self, conn, sha256, dpi):
+        row = conn.execute("SELECT id FROM documents WHERE sha256 = ? AND dpi = ?", (sha256, dpi)).fetchone()
+        return row[0] if row else None
+
+    def contient(self, sha256, dpi):
+        with closing(self._connexion()) as conn:
+            return self._document_id(conn, sha256, dpi) is not None
+
+    def enregistrer(self, sha256, dpi, pages, nom=None, nb_pages=None):
+        """Remplace les lignes du document par celles de pages (format de analyse.analyser_pages)"""
+        rows = []
+        numero_ligne = 0
+        for page in pages:
+            lines = page["lines"]
+            # Cadres des lignes et mots de chaque ligne, tirés en bloc des tableaux de la page
+            for texte, norme, cadre, textes, boites in zip(lines.textes, lines.normes, lines.cadres().tolist(),
+                                                           lines.textes_mots(), lines.boites_mots()):
+                numero_ligne += 1  # Numérotation globale, comme dans famille.py
+                rows.append((
+                    page["numero"], numero_ligne, texte, norme.plie, *cadre,
+                    json.dumps([[t, *b] for t, b in zip(textes, boites)], ensure_ascii=False),
+                ))
+
+        with closing(self._connexion()) as conn, conn:  # Une seule transaction par document
+            conn.execute("DELETE FROM documents WHERE sha256 = ? AND dpi = ?", (sha256, dpi))
+            document_id = conn.execute(
+                "INSERT INTO documents (sha256, dpi, nom, nb_pages, ajoute_le) VALUES (?, ?, ?, ?, ?)",
+                (sha256, dpi, nom, nb_pages if nb_pages is not None else len(pages), time.time()),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO lignes (document_id, page, ligne, texte, plie, x0, y0, x1, y1, mots) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(document_id, *row) for row in rows],
+            )
+
+    def charger_pages(self, sha256, dpi):
+        """Pages au format de analyse.analyser_pages (sans "lecture"), ou None si le document est inconnu"""
+        with closing(self._connexion()) as conn:
+            document_id = self._document_id(conn, sha256, dpi)
+            if document_id is None:
+                return None
+            rows = conn.execute(
+                "SELECT page, texte, mots FROM lignes WHERE document_id = ? ORDER BY ligne", (document_id,)
+            ).fetchall()
+
+        lignes_par_page = {}  # Numéro de page → (mots de chaque ligne, textes), dans l'ordre des lignes
+        for numero, texte, mots in rows:
+            mots_lignes, textes = lignes_par_page.setdefault(numero, ([], []))
+            mots_lignes.append(json.loads(mots))
+            textes.append(texte)
+        return [
+            {"numero": numero, "lines": LignesPage.depuis_lignes(
+                mots_lignes, textes, normes=[TexteNormalise(texte) for texte in textes])}
+            for numero, (mots_lignes, textes) in lignes_par_page.items()
+        ]
+
+    def rechercher(self, mot, sha256=None, dpi=None):
+        """Lignes contenant le mot (sans tenir compte des accents), dans un document ou dans tous
+
+        Les lignes candidates viennent de l'index plein texte, puis normalisation.motif_recherche
+        les confirme : le mot (ou l'expression) doit commencer en début de mot dans la ligne
+        ("echeance" trouve "echeances", pas "cheance"), comme dans analyse.rechercher_mot.
+        Renvoie des tuples (nom, sha256, page, ligne, texte, texte plié), dans l'ordre des documents.
+        """
+        mot_plie = plier(mot)
+        if re.search(r"\w", mot_plie):
+            # Expression entre guillemets, dernier mot en préfixe ; instr() confirme la sous-chaîne exacte
+            requete = (
+                "SELECT d.nom, d.sha256, l.page, l.ligne, l.texte, l.plie "
+                "FROM lignes_fts JOIN lignes l ON l.id = lignes_fts.rowid JOIN documents d ON d.id = l.document_id "
+                "WHERE lignes_fts MATCH ? AND instr(l.plie, ?) > 0"
+            )
+            parametres = ['"' + mot_plie.replace('"', '""') + '"*', mot_plie]
+        else:
+            # Ponctuation seule (ex. "%") : rien à indexer, parcours de toutes les lignes
+            requete = (
+                "SELECT d.nom, d.sha256, l.page, l.ligne, l.texte, l.plie "
+                "FROM lignes l JOIN documents d ON d.id = l.document_id WHERE instr(l.plie, ?) > 0"
+            )
+            parametres = [mot_plie]
+        if sha256 is not None:
+            requete += " AND d.sha256 = ?"
+            parametres.append(sha256)
+        if dpi is not None:
+            requete += " AND d.dpi = ?"
+            parametres.append(dpi)
+        requete += " ORDER BY d.id, l.ligne"
+        motif = motif_recherche(mot_plie)
+        with closing(self._connexion()) as conn:
+            return [row for row in conn.execute(requete, parametres) if motif.search(row[5])]
+
+    def nb_documents(self):
+        with closing(self._connexion()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
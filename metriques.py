@@ -0,0 +1,126 @@
+# === MESURES PAR ÉTAPE ET PAR PAGE (rendu, encodage, appel OCR, regroupement, mots-clés, affichage) ===
+#
+# Chaque étape instrumentée enregistre un événement : étape, page, durée et quelques valeurs
+# (octets envoyés, mots, lignes, cache...). Les événements récents sont gardés en mémoire pour le
+# panneau de débogage des applis ; les totaux par étape s'exportent en JSON ou au format texte Prometheus.
+# OCR_METRIQUES=0 désactive l'enregistrement.
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+ACTIVES = os.environ.get("OCR_METRIQUES", "1") != "0"
+TAILLE_HISTORIQUE = 20_000  # Événements gardés en mémoire (les plus anciens sont oubliés)
+
+
+def _ajouter(resume, etape, duree, valeurs):
+    totaux = resume.setdefault(etape, {"nb": 0, "duree_totale": 0.0, "duree_max": 0.0, "valeurs": {}})
+    totaux["nb"] += 1
+    if duree is not None:
+        totaux["duree_totale"] += duree
+        totaux["duree_max"] = max(totaux["duree_max"], duree)
+    for nom, valeur in valeurs.items():
+        if isinstance(valeur, (int, float)):
+            totaux["valeurs"][nom] = totaux["valeurs"].get(nom, 0) + valeur
+
+
+class Metriques:
+    """Collecteur d'événements partagé par les threads d'un processus"""
+
+    def __init__(self, actives=ACTIVES, taille_historique=TAILLE_HISTORIQUE):
+        self.actives = actives
+        self._evenements = deque(maxlen=taille_historique)
+        self._cumul = {}  # Totaux depuis le démarrage du processus (jamais oubliés)
+        self._sequence = 0
+        self._verrou = threading.Lock()
+
+    def enregistrer(self, etape, duree=None, page=None, **valeurs):
+        if not self.actives:
+            return
+        with self._verrou:
+            self._sequence += 1
+            self._evenements.append({"seq": self._sequence, "etape": etape, "page": page, "duree": duree, **valeurs})
+            _ajouter(self._cumul, etape, duree, valeurs)
+
+    @contextmanager
+    def mesurer(self, etape, page=None, **valeurs):
+        """Chronomètre le bloc ; le dict renvoyé reçoit les valeurs connues à la fin (mots, lignes...)"""
+        debut = time.perf_counter()
+        try:
+            yield valeurs
+        finally:
+            self.enregistrer(etape, time.perf_counter() - debut, page, **valeurs)
+
+    def repere(self):
+        """Numéro du dernier événement : evenements(depuis=repere) ne rend que les suivants"""
+        with self._verrou:
+            return self._sequence
+
+    def evenements(self, depuis=0):
+        with self._verrou:
+            return [e for e in self._evenements if e["seq"] > depuis]
+
+    def resume(self, depuis=None):
+        """Totaux par étape : depuis un repère, ou depuis le démarrage du processus"""
+        if depuis is None:
+            with self._verrou:
+                return json.loads(json.dumps(self._cumul))  # Copie profonde
+        resume = {}
+        for e in self.evenements(depuis):
+            valeurs = {k: v for k, v in e.items() if k not in ("seq", "etape", "page", "duree")}
+            _ajouter(resume, e["etape"], e["duree"], valeurs)
+        return resume
+
+
+def fusionner_resumes(resumes):
+    """Additionne des résumés (un par document ou par processus) en un seul"""
+    total = {}
+    for resume in resumes:
+        for etape, totaux in resume.items():
+            cible = total.setdefault(etape, {"nb": 0, "duree_totale": 0.0, "duree_max": 0.0, "valeurs": {}})
+            cible["nb"] += totaux["nb"]
+            cible["duree_totale"] += totaux["duree_totale"]
+            cible["duree_max"] = max(cible["duree_max"], totaux["duree_max"])
+            for nom, valeur in totaux["valeurs"].items():
+                cible["valeurs"][nom] = cible["valeurs"].get(nom, 0) + valeur
+    return total
+
+
+def exporter_json(resume, evenements=None):
+    data = {"etapes": resume}
+    if evenements is not None:
+        data["evenements"] = evenements
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def exporter_prometheus(resume, prefixe="ocr"):
+    """Format texte d'exposition Prometheus (compteurs cumulés par étape)"""
+    lignes = [
+        f"# HELP {prefixe}_etape_total Nombre d'exécutions de chaque étape",
+        f"# TYPE {prefixe}_etape_total counter",
+    ]
+    lignes += [f'{prefixe}_etape_total{{etape="{etape}"}} {t["nb"]}' for etape, t in sorted(resume.items())]
+    lignes += [
+        f"# HELP {prefixe}_etape_secondes_total Durée cumulée de chaque étape",
+        f"# TYPE {prefixe}_etape_secondes_total counter",
+    ]
+    lignes += [f'{prefixe}_etape_secondes_total{{etape="{etape}"}} {t["duree_totale"]:.6f}'
+               for etape, t in sorted(resume.items())]
+    lignes += [
+        f"# HELP {prefixe}_etape_secondes_max Durée maximale d'une exécution de chaque étape",
+        f"# TYPE {prefixe}_etape_secondes_max gauge",
+    ]
+    lignes += [f'{prefixe}_etape_secondes_max{{etape="{etape}"}} {t["duree_max"]:.6f}'
+               for etape, t in sorted(resume.items())]
+    lignes += [
+        f"# HELP {prefixe}_valeur_total Valeurs cumulées par étape (octets envoyés, mots, lignes, cache...)",
+        f"# TYPE {prefixe}_valeur_total counter",
+    ]
+    lignes += [f'{prefixe}_valeur_total{{etape="{etape}",nom="{nom}"}} {valeur}'
+               for etape, t in sorted(resume.items()) for nom, valeur in sorted(t["valeurs"].items())]
+    return "\n".join(lignes) + "\n"
+
+
+METRIQUES = Metriques()  # Collecteur du processus (applis Streamlit, chaque processus de batch_cli)
@@ -0,0 +1,79 @@
+# === MONTANTS AU FORMAT FRANÇAIS : REPÉRÉS EN UN PASSAGE PAR PAGE, VALEURS DÉCIMALES EXACTES ===
+#
+# Un seul analyseur pour les mots-clés (mots_cles.py), la recherche d'un mot (analyse.py) et les
+# colonnes (colonnes.py) : "1 234,56", "1.234,56", "1234,56", "12.50", "-12,50". Les valeurs sont des
+# Decimal : les totaux d'un long relevé tombent juste au centime, sans dérive des flottants.
+import re
+from decimal import Decimal
+
+import numpy as np
+
+# Signe collé au nombre et précédé d'une espace ("échéance-12,50" : tiret séparateur, montant positif) ;
+# pas de départ ni de fin au milieu d'un nombre ou d'une date ("05/03 123,45" ≠ 3 123,45, "12.03.2024"
+# n'est pas 12,03). Le (?=[-\d]) de tête écarte d'emblée les positions qui ne sont ni un chiffre ni un
+# tiret : recherche deux fois plus rapide.
+MOTIF_MONTANT = re.compile(
+    r"(?=[-\d])(?<![\d/.,])(?:(?<!\S)(?P<signe>-))?"
+    r"(?P<nombre>\d{1,3}(?:[ \u00a0\u202f.]\d{3})+,\d{2}|\d+[.,]\d{2})\b(?![.,/]\d)"
+)
+SEPARATEURS_MILLIERS = str.maketrans("", "", " \u00a0\u202f")  # Espace, insécable, fine insécable
+
+
+def _decimal(signe, nombre):
+    nombre = nombre.translate(SEPARATEURS_MILLIERS)
+    if "," in nombre:
+        nombre = nombre.replace(".", "").replace(",", ".")  # "1.234,56" → "1234.56"
+    return Decimal(signe + nombre) if signe else Decimal(nombre)
+
+
+def valeur(texte):
+    """Valeur (Decimal) d'un texte qui n'est qu'un montant, sinon None"""
+    match = MOTIF_MONTANT.fullmatch(texte)
+    return _decimal(match["signe"], match["nombre"]) if match else None
+
+
+def montants_de_texte(texte):
+    """Montants d'un texte : [(valeur, début, fin)], positions des chiffres (sans le signe)"""
+    return [(_decimal(m["signe"], m["nombre"]), m.start("nombre"), m.end("nombre"))
+            for m in MOTIF_MONTANT.finditer(texte)]
+
+
+def montants_par_ligne(textes):
+    """Montants de chaque texte (les lignes d'une page), en un seul passage de regex sur toute la page
+
+    Même résultat que montants_de_texte appliqué à chaque ligne ; positions relatives à chaque ligne.
+    """
+    resultat = [[] for _ in textes]
+    if not textes:
+        return resultat
+    departs = np.cumsum([0] + [len(t) + 1 for t in textes[:-1]])
+    trouves = list(MOTIF_MONTANT.finditer("\n".join(textes)))  # \d et les séparateurs ne franchissent pas "\n"
+    lignes = np.searchsorted(departs, [m.start("nombre") for m in trouves], side="right") - 1
+    for m, ligne in zip(trouves, lignes.tolist()):
+        depart = int(departs[ligne])
+        resultat[ligne].append((_decimal(m["signe"], m["nombre"]), m.start("nombre") - depart,
+                                m.end("nombre") - depart))
+    return resultat
+
+
+def montant_accole(texte, position, montants):
+    """Montant commençant à position, après d'éventuels espaces ou tirets ("échéance - 12,50"), sinon None"""
+    while position < len(texte) and (texte[position].isspace() or texte[position] == "-"):
+        position += 1
+    for montant in montants:
+        if montant[1] == position:
+            return montant
+    return None
+
+
+def montant_suivant(montants, position):
+    """Premier montant dont les chiffres commencent à position ou après, sinon None"""
+    for montant in montants:
+        if montant[1] >= position:
+            return montant
+    return None
+
+
+def total(valeurs):
+    """Somme exacte (Decimal) de montants"""
+    return sum(valeurs, Decimal(0))
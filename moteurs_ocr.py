@@ -0,0 +1,181 @@
+# === MOTEURS OCR INTERCHANGEABLES (Google Vision, Tesseract, OCR de PyMuPDF, enregistrements) ===
+#
+# Un moteur est appelé comme l'ancien vision_ocr_detect_text : moteur(image_pil, infos=None) → mots
+# de la page (mots_page.MotsPage, lisible comme une liste de {"text", "bbox": (x0, y0, x1, y1)}) en
+# pixels de l'image. Son attribut "feature" entre
+# dans la clé du cache OCR : deux moteurs ne partagent jamais leurs résultats.
+#
+# Choix du moteur : variable OCR_MOTEUR ("vision" par défaut, "tesseract", "pymupdf", "enregistre").
+# Tesseract et l'OCR de PyMuPDF demandent le programme tesseract-ocr (et pytesseract pour le premier).
+# Chaque bibliothèque (google-cloud-vision, pytesseract, PyMuPDF) n'est importée qu'au premier usage du moteur.
+import hashlib
+import json
+import os
+
+from encodage import encoder_image, remettre_a_l_echelle
+from mots_page import MotsPage
+from rendu_pdf import VERROU_MUPDF
+from reprises import DELAI_REQUETE, REPRISES
+from vision_batch import FEATURE_CACHE, mots_depuis_reponse
+
+MOTEUR_OCR = os.environ.get("OCR_MOTEUR", "vision")
+LANGUE_TESSERACT = os.environ.get("OCR_LANGUE", "fra")
+DOSSIER_ENREGISTREMENTS = os.environ.get("OCR_ENREGISTREMENTS", "enregistrements_ocr")
+
+MOTEURS = ("vision", "tesseract", "pymupdf", "enregistre")
+
+
+class MoteurVision:
+    """Google Vision TEXT_DETECTION, une page par appel (l'implémentation historique)"""
+
+    nom = "vision"
+    libelle = "Google Vision"  # Pour les légendes (ocr_parallele.resumer_cache)
+    feature = FEATURE_CACHE  # "TEXT_DETECTION" (clé d'avant les moteurs), suivi des réglages d'encodage modifiés
+
+    def __init__(self, client, reprises=REPRISES, delai=DELAI_REQUETE):
+        self.client = client
+        self.reprises = reprises  # Débit limité et reprises des erreurs transitoires (reprises.py)
+        self.delai = delai  # Délai maximal de chaque appel (secondes)
+
+    def __call__(self, image_pil, infos=None):
+        from google.cloud import vision
+
+        content, echelle = encoder_image(image_pil, infos=infos)  # Encodage configurable (PNG, JPEG, WebP, gris, taille max)
+        image = vision.Image(content=content)
+
+        def envoyer():
+            # retry=None : les reprises sont gérées par self.reprises, pas par la bibliothèque
+            response = self.client.text_detection(image=image, timeout=self.delai, retry=None)
+            return mots_depuis_reponse(response)
+
+        return remettre_a_l_echelle(self.reprises.appeler(envoyer, infos=infos), echelle)
+
+
+class MoteurTesseract:
+    """Tesseract en local via pytesseract : pas de réseau ni de quota"""
+
+    nom = "tesseract"
+    libelle = "Tesseract"
+
+    def __init__(self, langue=LANGUE_TESSERACT, config="", confiance_min=0):
+        try:
+            import pytesseract
+        except ImportError as e:
+            raise ImportError("Le moteur tesseract demande pytesseract (pip install pytesseract) "
+                              "et le programme tesseract-ocr") from e
+        self._pytesseract = pytesseract
+        self.langue = langue
+        self.config = config
+        self.confiance_min = confiance_min
+        self.feature = f"TESSERACT|{langue}|{config}"
+
+    def __call__(self, image_pil, infos=None):
+        data = self._pytesseract.image_to_data(
+            image_pil, lang=self.langue, config=self.config, output_type=self._pytesseract.Output.DICT
+        )
+        textes, bboxes = [], []
+        for text, x, y, w, h, conf in zip(data["text"], data["left"], data["top"],
+                                          data["width"], data["height"], data["conf"]):
+            if not text.strip() or float(conf) < self.confiance_min:
+                continue  # Blocs, paragraphes et lignes ont un texte vide : seuls les mots sont gardés
+            textes.append(text)
+            bboxes.append((x, y, x + w, y + h))
+        if infos is not None:
+            infos["moteur"] = self.nom
+        return MotsPage.construire(textes, bboxes)
+
+
+class MoteurPyMuPDF:
+    """OCR intégré à PyMuPDF (Tesseract appelé par MuPDF, sans pytesseract)"""
+
+    nom = "pymupdf"
+    libelle = "l'OCR de PyMuPDF"
+
+    def __init__(self, langue=LANGUE_TESSERACT, tessdata=None):
+        self.langue = langue
+        self.tessdata = tessdata  # Dossier tessdata (sinon TESSDATA_PREFIX)
+        self.feature = f"PYMUPDF_OCR|{langue}"
+
+    def __call__(self, image_pil, infos=None):
+        import fitz  # PyMuPDF
+
+        if image_pil.mode not in ("RGB", "L"):
+            image_pil = image_pil.convert("RGB")
+        with VERROU_MUPDF, fitz.open() as doc:  # Pas d'appel concurrent à MuPDF (rendu des pages suivantes)
+            # Page de la taille de l'image, 1 point par pixel : les boîtes sortent directement en pixels
+            page = doc.new_page(width=image_pil.width, height=image_pil.height)
+            colorspace = fitz.csRGB if image_pil.mode == "RGB" else fitz.csGRAY
+            pixmap = fitz.Pixmap(colorspace, image_pil.width, image_pil.height, image_pil.tobytes(), False)
+            page.insert_image(page.rect, pixmap=pixmap)
+            textpage = page.get_textpage_ocr(language=self.langue, dpi=72, full=True, tessdata=self.tessdata)
+            mots = [m for m in page.get_text("words", textpage=textpage) if m[4].strip()]
+        if infos is not None:
+            infos["moteur"] = self.nom
+        return MotsPage.construire([m[4] for m in mots],
+                                   [(round(x0), round(y0), round(x1), round(y1)) for x0, y0, x1, y1, *_ in mots])
+
+
+class MoteurEnregistre:
+    """Rejoue des résultats enregistrés (un JSON par image) : tests et benchmarks sans réseau
+
+    Avec un moteur source, les images absentes sont lues par ce moteur puis enregistrées ;
+    sans moteur source, une image absente lève KeyError.
+    """
+
+    nom = "enregistre"
+    libelle = "les enregistrements"
+
+    def __init__(self, dossier=DOSSIER_ENREGISTREMENTS, source=None, feature="ENREGISTRE"):
+        self.dossier = dossier
+        self.source = source
+        # Clé de cache propre aux enregistrements rejoués : ils ne remplacent jamais un résultat de Google Vision.
+        # Avec un moteur source, même clé que lui : les images absentes sont lues par ce moteur
+        self.feature = source.feature if source is not None else feature
+        os.makedirs(self.dossier, exist_ok=True)
+
+    @staticmethod
+    def cle(image_pil):
+        h = hashlib.sha256()
+        h.update(f"{image_pil.mode}|{image_pil.size}|".encode("utf-8"))
+        h.update(image_pil.tobytes())
+        return h.hexdigest()
+
+    def _chemin(self, image_pil):
+        return os.path.join(self.dossier, self.cle(image_pil) + ".json")
+
+    def __call__(self, image_pil, infos=None):
+        chemin = self._chemin(image_pil)
+        try:
+            with open(chemin, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            if self.source is None:
+                raise KeyError(f"Aucun enregistrement OCR pour cette image ({os.path.basename(chemin)})")
+            words = self.source(image_pil, infos=infos)
+            self.enregistrer(image_pil, words)
+            return words
+        if infos is not None:
+            infos["moteur"] = self.nom
+        return MotsPage.depuis_dicts(data)
+
+    def enregistrer(self, image_pil, words):
+        chemin = self._chemin(image_pil)
+        tmp = f"{chemin}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(MotsPage.depuis_dicts(words).en_json(), f, ensure_ascii=False)
+        os.replace(tmp, chemin)
+
+
+def creer_moteur(nom=MOTEUR_OCR, client=None, reprises=REPRISES):
+    """Moteur OCR à partir de son nom ; client (Google Vision) et reprises ne servent qu'à "vision" """
+    if nom == "vision":
+        if client is None:
+            raise ValueError("Le moteur vision demande un client Google Vision")
+        return MoteurVision(client, reprises=reprises)
+    if nom == "tesseract":
+        return MoteurTesseract()
+    if nom == "pymupdf":
+        return MoteurPyMuPDF()
+    if nom == "enregistre":
+        return MoteurEnregistre()
+    raise ValueError(f"Moteur OCR inconnu : {nom} (attendu : {', '.join(MOTEURS)})")
@@ -0,0 +1,105 @@
+# === MOTEUR DE MOTS-CLÉS : UNE SEULE EXPRESSION COMPILÉE PAR FAMILLE ===
+import re
+from functools import lru_cache
+
+from montants import montant_accole, montants_de_texte
+from normalisation import TexteNormalise, plier
+
+
+@lru_cache(maxsize=64)
+def _compiler(alternatives):
+    """Compile l'alternance de tous les mots-clés pliés (gardée en cache d'un rerun à l'autre)
+
+    Les montants ne font pas partie de la regex : ils sont repérés une fois par ligne (montants.py).
+    """
+    # Les plus longs d'abord : à position égale, "indemnites de retard" passe avant "indemnite"
+    ordonnees = sorted(alternatives, key=len, reverse=True)
+    motif = "(?P<mot>" + "|".join(re.escape(v) for v in ordonnees) + ")"
+    return re.compile(motif)  # Pas de IGNORECASE : le texte et les mots-clés sont déjà pliés
+
+
+class FamilleMotsCles:
+    """Mots-clés sélectionnés d'une famille (DÉBIT ou CRÉDIT), compilés en une seule regex"""
+
+    def __init__(self, nom, selection, mots_reference):
+        self.nom = nom
+        self.principal = {}  # Forme pliée → mot-clé principal
+        self.rang = {mot: i for i, mot in enumerate(selection)}  # Ordre de sélection = priorité
+        for mot in selection:
+            for variante in [mot] + list(mots_reference.get(mot, [])):
+                self.principal.setdefault(plier(variante), mot)  # À égalité, l'ordre de sélection gagne
+        self.regex = _compiler(tuple(sorted(self.principal))) if self.principal else None
+
+    def chercher(self, texte, montants=None):
+        """Mot-clé suivi d'un montant non nul dans un TexteNormalise, ou None
+
+        Renvoie (montant, mot principal, position du mot, position du montant), les positions
+        étant des intervalles (début, fin) dans le texte d'origine. Si plusieurs mots-clés de la
+        famille sont présents, le premier dans l'ordre de sélection l'emporte.
+        montants : montants de la ligne déjà repérés (montants.montants_par_ligne), sinon repérés ici.
+        """
+        if self.regex is None:
+            return None
+        if montants is None:
+            montants = montants_de_texte(texte.plie)
+        meilleur = None
+        for match in self.regex.finditer(texte.plie):
+            montant = montant_accole(texte.plie, match.end(), montants)
+            if montant is None or not montant[0]:
+                continue
+            mot = self.principal[match.group("mot")]
+            if meilleur is None or self.rang[mot] < self.rang[meilleur[1]]:
+                meilleur = (
+                    abs(montant[0]),  # Le mot-clé dit débit ou crédit : "échéance -12,50" reste un débit de 12,50
+                    mot,
+                    texte.vers_original(*match.span("mot")),
+                    texte.vers_original(montant[1], montant[2]),
+                )
+        return meilleur
+
+    def chercher_mot(self, texte):
+        """Mot-clé seul (sans montant accolé) : (mot principal, position du mot, fin du mot dans le texte plié), ou None"""
+        if self.regex is None:
+            return None
+        meilleur = None
+        for match in self.regex.finditer(texte.plie):
+            mot = self.principal[match.group("mot")]
+            if meilleur is None or self.rang[mot] < self.rang[meilleur[0]]:
+                meilleur = (mot, texte.vers_original(*match.span("mot")), match.end("mot"))
+        return meilleur
+
+
+class MoteurMotsCles:
+    """Recherche des mots-clés DÉBIT puis CRÉDIT en un seul passage par famille et par ligne"""
+
+    def __init__(self, debits_selectionnes, mots_debit, credits_selectionnes, mots_credit):
+        # L'ordre des familles fixe la priorité : un débit l'emporte sur un crédit
+        self.familles = [
+            FamilleMotsCles("DÉBIT", debits_selectionnes, mots_debit),
+            FamilleMotsCles("CRÉDIT", credits_selectionnes, mots_credit),
+        ]
+
+    def chercher(self, texte, montant_colonne=None, montants=None):
+        """Renvoie (montant, mot principal, position du mot, position du montant, famille) ou None
+
+        texte est un TexteNormalise (plié une fois par ligne) ou une chaîne.
+        montant_colonne(famille, fin_mot) → (montant, position) ou None : montant de la ligne pour ce mot-clé
+        d'après la mise en page (colonnes.MiseEnPage), utilisé quand aucun montant ne suit directement le mot-clé.
+        montants : montants de la ligne déjà repérés pour toute la page (montants.montants_par_ligne).
+        """
+        if isinstance(texte, str):
+            texte = TexteNormalise(texte)
+        if montants is None:
+            montants = montants_de_texte(texte.plie)  # Repérés une fois pour les deux familles
+        for famille in self.familles:
+            trouve = famille.chercher(texte, montants)
+            if trouve:
+                return trouve + (famille.nom,)
+        if montant_colonne is not None:
+            for famille in self.familles:
+                mot = famille.chercher_mot(texte)
+                if mot:
+                    colonne = montant_colonne(famille.nom, mot[2])
+                    if colonne and colonne[0]:
+                        return colonne[0], mot[0], mot[1], colonne[1], famille.nom
+        return None
@@ -0,0 +1,173 @@
+# === MOTS ET LIGNES D'UNE PAGE EN TABLEAUX NUMPY (au lieu d'un dict par mot) ===
+#
+# Une page OCR compte jusqu'à plusieurs milliers de mots : un dict {"text", "bbox"} et un tuple par mot,
+# c'est plusieurs centaines d'octets et autant d'allocations par mot, relues à chaque passage. Ici, les
+# boîtes de toute la page tiennent dans un tableau (n, 4) d'entiers, les textes dans une table de textes
+# uniques indexée par mot, et une ligne n'est qu'un intervalle dans l'ordre des mots. Le regroupement
+# (lignes.py), le dessin (tab.py), les colonnes (colonnes.py) et le magasin travaillent sur ces tableaux ;
+# les adaptateurs gardent l'ancienne interface (w["text"], w["bbox"], line["words"], line["text"]...).
+import numpy as np
+
+
+class MotsPage:
+    """Mots d'une page : boîtes (n, 4) en int32 et textes en indices dans une table de textes uniques
+
+    Se lit comme l'ancienne liste de dicts : len(), itération et mots[i] donnent {"text", "bbox"}.
+    """
+
+    __slots__ = ("table", "codes", "bboxes", "lignes")
+
+    def __init__(self, table, codes, bboxes, lignes=None):
+        self.table = table  # Textes uniques de la page ("12,50" présent 40 fois n'est stocké qu'une fois)
+        self.codes = codes  # Indice dans table du texte de chaque mot (int32)
+        self.bboxes = bboxes  # (x0, y0, x1, y1) de chaque mot, en pixels (int32)
+        self.lignes = lignes  # Ligne de chaque mot donnée par le moteur OCR (int32), ou None
+
+    @classmethod
+    def construire(cls, textes, bboxes, lignes=None):
+        """Mots à partir de leurs textes et de leurs boîtes (pixels entiers), dans le même ordre
+
+        lignes : numéro de ligne de chaque mot quand le moteur OCR les fournit (Google Vision).
+        """
+        index = {}
+        codes = np.fromiter((index.setdefault(t, len(index)) for t in textes), dtype=np.int32, count=len(textes))
+        if lignes is not None:
+            lignes = np.array(lignes, dtype=np.int32)
+        return cls(list(index), codes, np.array(bboxes, dtype=np.int32).reshape(len(textes), 4), lignes)
+
+    @classmethod
+    def depuis_dicts(cls, words):
+        """Mots d'une liste de {"text", "bbox"} (autre moteur, JSON du cache) ; rendu tel quel si déjà compact
+
+        Les lignes du moteur OCR sont reprises si les mots ont une clé "ligne".
+        """
+        if isinstance(words, MotsPage):
+            return words
+        lignes = [w["ligne"] for w in words] if words and "ligne" in words[0] else None
+        return cls.construire([w["text"] for w in words], [w["bbox"] for w in words], lignes)
+
+    def textes(self):
+        """Texte de chaque mot, dans l'ordre"""
+        table = self.table
+        return [table[c] for c in self.codes.tolist()]
+
+    def en_json(self):
+        """Liste de {"text", "bbox": [x0, y0, x1, y1]} (et "ligne") : format du cache OCR et des enregistrements"""
+        if self.lignes is None:
+            return [{"text": t, "bbox": b} for t, b in zip(self.textes(), self.bboxes.tolist())]
+        return [{"text": t, "bbox": b, "ligne": l}
+                for t, b, l in zip(self.textes(), self.bboxes.tolist(), self.lignes.tolist())]
+
+    def remis_a_l_echelle(self, echelle):
+        """Mêmes mots, boîtes divisées par echelle et arrondies (image OCR réduite → page d'origine)"""
+        return MotsPage(self.table, self.codes, np.rint(self.bboxes / echelle).astype(np.int32), self.lignes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return {"text": self.table[self.codes[i]], "bbox": tuple(self.bboxes[i].tolist())}
+
+    def __iter__(self):
+        for texte, bbox in zip(self.textes(), self.bboxes.tolist()):
+            yield {"text": texte, "bbox": tuple(bbox)}
+
+
+class LignesPage:
+    """Lignes d'une page : la ligne k est l'intervalle debuts[k]:debuts[k + 1] de ordre (indices des mots)
+
+    Les mots de chaque ligne sont rangés de gauche à droite. textes : texte de chaque ligne (mots joints
+    par une espace) ; normes : sa forme pliée (TexteNormalise), remplie par analyse.lignes_de_page.
+    Itérer donne des Ligne, lisibles comme les anciens dicts de ligne.
+    """
+
+    __slots__ = ("mots", "ordre", "debuts", "y_mean", "textes", "normes")
+
+    def __init__(self, mots, ordre, debuts, y_mean, textes=None, normes=None):
+        self.mots = mots
+        self.ordre = ordre
+        self.debuts = debuts
+        self.y_mean = y_mean  # Moyenne des centres verticaux des mots de chaque ligne
+        self.textes = textes if textes is not None else [" ".join(t) for t in self.textes_mots()]
+        self.normes = normes
+
+    @classmethod
+    def vide(cls):
+        """Page sans aucune ligne (vide, ou OCR en échec)"""
+        mots = MotsPage([], np.zeros(0, dtype=np.int32), np.zeros((0, 4), dtype=np.int32))
+        return cls(mots, np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64), np.zeros(0), [], [])
+
+    @classmethod
+    def depuis_lignes(cls, lignes, textes=None, normes=None):
+        """Lignes déjà formées (magasin) : pour chacune, ses mots [texte, x0, y0, x1, y1] de gauche à droite"""
+        if not lignes:
+            return cls.vide()
+        mots = MotsPage.construire([m[0] for l in lignes for m in l], [m[1:] for l in lignes for m in l])
+        debuts = np.concatenate(([0], np.cumsum([len(l) for l in lignes]))).astype(np.int64)
+        milieux = (mots.bboxes[:, 1] + mots.bboxes[:, 3]) / 2
+        y_mean = np.add.reduceat(milieux, debuts[:-1]) / np.diff(debuts)
+        return cls(mots, np.arange(len(mots), dtype=np.int64), debuts, y_mean, textes, normes)
+
+    def __len__(self):
+        return len(self.debuts) - 1
+
+    def __getitem__(self, k):
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError(k)
+        return Ligne(self, k)
+
+    def __iter__(self):
+        return (Ligne(self, k) for k in range(len(self)))
+
+    def indices(self, k):
+        """Indices (dans self.mots) des mots de la ligne k, de gauche à droite"""
+        return self.ordre[self.debuts[k]:self.debuts[k + 1]]
+
+    def textes_mots(self):
+        """Textes des mots de chaque ligne : une liste par ligne"""
+        table = self.mots.table
+        textes = [table[c] for c in self.mots.codes[self.ordre].tolist()]
+        bornes = self.debuts.tolist()
+        return [textes[d:f] for d, f in zip(bornes, bornes[1:])]
+
+    def boites_mots(self):
+        """Boîtes [x0, y0, x1, y1] des mots de chaque ligne : une liste par ligne"""
+        boites = self.mots.bboxes[self.ordre].tolist()
+        bornes = self.debuts.tolist()
+        return [boites[d:f] for d, f in zip(bornes, bornes[1:])]
+
+    def cadres(self):
+        """Cadre (x0, y0, x1, y1) de chaque ligne, calculé d'un bloc : tableau (nb_lignes, 4)"""
+        if not len(self):
+            return np.zeros((0, 4), dtype=np.int32)
+        boites = self.mots.bboxes[self.ordre]
+        debuts = self.debuts[:-1]  # Chaque ligne a au moins un mot : reduceat s'applique directement
+        return np.column_stack([
+            np.minimum.reduceat(boites[:, 0], debuts), np.minimum.reduceat(boites[:, 1], debuts),
+            np.maximum.reduceat(boites[:, 2], debuts), np.maximum.reduceat(boites[:, 3], debuts),
+        ])
+
+
+class Ligne:
+    """Une ligne de LignesPage, lue comme l'ancien dict : line["words"], line["text"], line["norm"], line["y_mean"]"""
+
+    __slots__ = ("lignes", "k")
+
+    def __init__(self, lignes, k):
+        self.lignes = lignes
+        self.k = k
+
+    def __getitem__(self, cle):
+        lignes, k = self.lignes, self.k
+        if cle == "words":
+            mots = lignes.mots
+            return [mots[i] for i in lignes.indices(k).tolist()]
+        if cle == "text":
+            return lignes.textes[k]
+        if cle == "norm":
+            return lignes.normes[k]
+        if cle == "y_mean":
+            return float(lignes.y_mean[k])
+        raise KeyError(cle)
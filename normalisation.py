@@ -0,0 +1,59 @@
+# === NORMALISATION DU TEXTE : SANS ACCENTS, EN MINUSCULES, AVEC RETOUR AU TEXTE D'ORIGINE ===
+import re
+from functools import lru_cache
+
+from unidecode import unidecode
+
+_PLIAGE = {}  # Caractère → forme pliée (mémoïsée : les lignes OCR réutilisent peu de caractères différents)
+
+
+def _plier_caractere(c):
+    plie = _PLIAGE.get(c)
+    if plie is None:
+        plie = c.lower() if c.isascii() else unidecode(c).lower()  # "é" → "e", "œ" → "oe", accent isolé → ""
+        _PLIAGE[c] = plie
+    return plie
+
+
+class TexteNormalise:
+    """Texte plié une seule fois, avec la correspondance vers les positions du texte d'origine"""
+
+    __slots__ = ("original", "plie", "_positions")
+
+    def __init__(self, original):
+        self.original = original
+        if original.isascii():
+            self.plie = original.lower()  # Cas le plus courant : positions identiques
+            self._positions = None
+            return
+
+        morceaux = []
+        positions = []  # positions[i] = index dans l'original du i-ème caractère plié
+        for i, c in enumerate(original):
+            plie = _plier_caractere(c)
+            morceaux.append(plie)
+            positions.extend([i] * len(plie))
+        self.plie = "".join(morceaux)
+        self._positions = positions
+
+    def vers_original(self, debut, fin):
+        """Convertit l'intervalle [debut, fin) du texte plié en intervalle du texte d'origine"""
+        if self._positions is None or debut >= fin:
+            return debut, fin
+        return self._positions[debut], self._positions[fin - 1] + 1
+
+
+def plier(texte):
+    """Forme pliée d'un texte (mot-clé, mot recherché) : sans accents et en minuscules"""
+    return TexteNormalise(texte).plie
+
+
+@lru_cache(maxsize=256)
+def motif_recherche(mot_plie):
+    """Règle de recherche d'un mot (déjà plié) dans une ligne pliée, commune au magasin et aux pages en mémoire
+
+    Le mot doit commencer en début de mot, comme avec l'index plein texte du magasin (unicode61 :
+    lettres et chiffres forment les mots) : "echeance" trouve "echeances", pas "cheance".
+    """
+    debut = r"(?<![^\W_])" if re.match(r"[^\W_]", mot_plie) else ""  # Ponctuation en tête : simple sous-chaîne
+    return re.compile(debut + re.escape(mot_plie))
@@ -0,0 +1,88 @@
+# === OCR CONCURRENT DES PAGES (pool de threads borné, résultats dans l'ordre) ===
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Nombre maximal d'appels OCR simultanés (réglable sans toucher au code)
+MAX_WORKERS = int(os.environ.get("OCR_MAX_WORKERS", 4))
+
+
+def traiter_en_flux(elements, traitement, max_workers=MAX_WORKERS, fenetre=None):
+    """Applique traitement à chaque élément en parallèle, au fil de l'eau ; résultats dans l'ordre
+
+    Au plus `fenetre` éléments sont en cours à la fois (2 × max_workers par défaut) :
+    la mémoire reste bornée quel que soit le nombre d'éléments, et chaque résultat
+    est rendu dès que lui et ses prédécesseurs sont prêts.
+    """
+    max_workers = max(1, max_workers)
+    fenetre = max(1, fenetre or 2 * max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        en_cours = deque()
+        for element in elements:  # Les éléments (pages rendues) sont produits ici, un par un
+            en_cours.append(pool.submit(traitement, element))
+            while en_cours and (len(en_cours) >= fenetre or en_cours[0].done()):
+                yield en_cours.popleft().result()
+        while en_cours:
+            yield en_cours.popleft().result()
+
+
+def _ocr_chronometre(fonction_ocr, numero, image_pil):
+    infos = {}  # Mesures remplies par fonction_ocr : cache, format, octets envoyés, durée d'encodage
+    debut = time.perf_counter()
+    try:
+        words = fonction_ocr(image_pil, infos=infos)
+    except Exception as e:
+        # Page en échec malgré les reprises : signalée, sans interrompre les autres pages du document
+        words = []
+        infos["erreur"] = f"{type(e).__name__}: {e}"
+    resultat = {"page": numero, "words": words, "duree": time.perf_counter() - debut, "image": image_pil}
+    resultat.update(infos)
+    return resultat
+
+
+def ocr_pages(pages, fonction_ocr, max_workers=MAX_WORKERS, fenetre=None):
+    """OCR en parallèle de pages (numéro, image) produites à la demande ; résultats dans l'ordre
+
+    fonction_ocr(image, infos=dict) renvoie les mots et peut remplir infos avec ses mesures.
+    Chaque résultat contient le numéro de page, les mots, la durée en secondes, ces mesures
+    et l'image (à libérer par l'appelant dès qu'elle n'est plus utile). Une page en échec
+    a une liste de mots vide et le message dans "erreur".
+    """
+    # L'ordre d'entrée est conservé : la numérotation des lignes reste déterministe
+    return traiter_en_flux(
+        pages,
+        lambda page: _ocr_chronometre(fonction_ocr, page[0], page[1]),
+        max_workers=max_workers,
+        fenetre=fenetre,
+    )
+
+
+def decrire_lecture(resultat):
+    """Résumé lisible du traitement d'une page : chemin, durée, cache et octets envoyés"""
+    if resultat.get("source") == "natif":
+        return f"texte natif en {resultat['duree']:.2f} s"
+    if resultat.get("erreur"):
+        return f"échec de l'OCR après {resultat.get('tentatives', 1)} tentative(s) : {resultat['erreur']}"
+    texte = f"OCR en {resultat['duree']:.2f} s"
+    if resultat.get("moteur"):
+        texte = f"OCR {resultat['moteur']} en {resultat['duree']:.2f} s"  # Moteur autre que Google Vision
+    if resultat.get("cache"):
+        texte += " (cache)"
+    if resultat.get("tentatives", 1) > 1:
+        texte += f", {resultat['tentatives']} tentatives"
+    if "octets" in resultat:
+        texte += (f", {resultat['octets'] / 1024:.0f} Ko envoyés en {resultat['format']}"
+                  f" (encodage {1000 * resultat['duree_encodage']:.0f} ms)")
+    return texte
+
+
+def resumer_cache(resultats, libelle="Google Vision"):
+    """Pages du document lues dans le cache OCR et pages envoyées à l'OCR, d'après le drapeau "cache" de chaque page
+
+    libelle : nom du moteur OCR pour la légende (attribut libelle des moteurs de moteurs_ocr).
+    Les pages en texte natif (sans drapeau) ne comptent ni d'un côté ni de l'autre.
+    """
+    drapeaux = [resultat.get("cache") for resultat in resultats]
+    return (f"Cache OCR : {drapeaux.count(True)} page(s) en cache, "
+            f"{drapeaux.count(False)} page(s) lue(s) par {libelle}")
@@ -0,0 +1,61 @@
+# === PANNEAU DE DÉBOGAGE STREAMLIT : OÙ PASSE LE TEMPS (metriques.py) ===
+#
+# Affiché en bas des applis si OCR_DEBUG=1 ou si l'URL se termine par ?debug=1.
+# Les mesures sont celles enregistrées depuis le début de la relance en cours ; avec plusieurs
+# sessions simultanées, les pages des autres utilisateurs peuvent s'y mêler.
+import os
+
+import streamlit as st
+
+from metriques import METRIQUES, exporter_json, exporter_prometheus
+
+DEBUG = os.environ.get("OCR_DEBUG", "0") == "1"
+
+
+def debogage_actif():
+    return DEBUG or st.query_params.get("debug") == "1"
+
+
+def afficher_mesures(repere):
+    """Tableaux des mesures enregistrées depuis repere (METRIQUES.repere()), par étape et par page"""
+    if not debogage_actif():
+        return
+    evenements = METRIQUES.evenements(depuis=repere)
+    resume = METRIQUES.resume(depuis=repere)
+    with st.expander("🛠️ Mesures par étape (débogage)"):
+        if not evenements:
+            st.caption("Aucune mesure pendant cette relance (résultats déjà en mémoire).")
+            return
+        st.dataframe(
+            [
+                {
+                    "Étape": etape,
+                    "Exécutions": t["nb"],
+                    "Total (ms)": round(1000 * t["duree_totale"], 1),
+                    "Moyenne (ms)": round(1000 * t["duree_totale"] / t["nb"], 1),
+                    "Max (ms)": round(1000 * t["duree_max"], 1),
+                    **t["valeurs"],
+                }
+                for etape, t in sorted(resume.items(), key=lambda e: -e[1]["duree_totale"])
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+
+        # Une ligne par page, une colonne par étape (ms)
+        par_page = {}
+        for e in evenements:
+            if e["page"] is not None and e["duree"] is not None:
+                ligne = par_page.setdefault(e["page"], {"Page": e["page"]})
+                ligne[e["etape"]] = round(ligne.get(e["etape"], 0) + 1000 * e["duree"], 1)
+        if par_page:
+            st.dataframe([par_page[p] for p in sorted(par_page)], hide_index=True, use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Mesures (JSON)", exporter_json(resume, evenements),
+                               file_name="mesures.json", mime="application/json")
+        with col2:
+            # Totaux depuis le démarrage du serveur, au format attendu par Prometheus
+            st.download_button("Cumul du processus (Prometheus)", exporter_prometheus(METRIQUES.resume()),
+                               file_name="mesures.prom", mime="text/plain")
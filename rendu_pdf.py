@@ -0,0 +1,97 @@
+# === RENDU DES PAGES PDF EN IMAGES (PyMuPDF, partagé par les trois applis) ===
+#
+# PyMuPDF n'est importé qu'au premier PDF traité : les applis s'affichent sans l'attendre.
+# PyMuPDF n'est pas sûr entre threads : le rendu (thread principal) et l'OCR de PyMuPDF (threads de
+# ocr_parallele) passent par VERROU_MUPDF.
+import os
+import threading
+
+from PIL import Image
+
+from metriques import METRIQUES
+
+# Réglages par défaut, modifiables sans toucher au code
+MODE_RENDU = os.environ.get("OCR_RENDU_MODE", "RGB")  # "RGB", "L" (niveaux de gris) ou "1" (noir et blanc)
+COTE_MAX = int(os.environ.get("OCR_COTE_MAX", 0)) or None  # Plus grand côté en pixels (None = pas de réduction)
+SEUIL_NOIR_BLANC = 160  # Seuil de binarisation pour le mode "1"
+
+MODES = ("RGB", "L", "1")
+
+VERROU_MUPDF = threading.RLock()  # Un seul appel à MuPDF à la fois dans le processus
+
+
+def dpi_effectif_dimensions(largeur_points, hauteur_points, dpi, cote_max=COTE_MAX):
+    """DPI réellement utilisé : réduit si la page dépasserait cote_max pixels"""
+    if not cote_max:
+        return dpi
+    return min(dpi, cote_max * 72 / max(largeur_points, hauteur_points))
+
+
+def dpi_effectif(page, dpi, cote_max=COTE_MAX):
+    return dpi_effectif_dimensions(page.rect.width, page.rect.height, dpi, cote_max)
+
+
+def rendre_page(page, dpi, mode=MODE_RENDU, cote_max=COTE_MAX):
+    """Rend une page PyMuPDF directement dans le mode voulu, sans conversion PIL superflue
+
+    Le cache de ressources de MuPDF n'est pas vidé ici : voir vider_cache_mupdf, une fois par document.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Mode de rendu inconnu : {mode} (attendu : {', '.join(MODES)})")
+
+    import fitz  # PyMuPDF
+
+    zoom = dpi_effectif(page, dpi, cote_max) / 72
+    matrice = fitz.Matrix(zoom, zoom)
+    if mode == "RGB":
+        with VERROU_MUPDF:
+            pix = page.get_pixmap(matrix=matrice, alpha=False)
+            image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        return image
+
+    # Niveaux de gris produits par MuPDF : 3 fois moins d'octets qu'en RGB
+    with VERROU_MUPDF:
+        pix = page.get_pixmap(matrix=matrice, colorspace=fitz.csGRAY, alpha=False)
+        image = Image.frombytes("L", [pix.width, pix.height], pix.samples)
+    if mode == "1":
+        image = image.point(lambda v: 255 if v > SEUIL_NOIR_BLANC else 0, mode="1")
+    return image
+
+
+def vider_cache_mupdf():
+    """Vide le cache de ressources de MuPDF (images décodées des pages scannées)
+
+    À appeler une fois le document rendu : sinon le cache grossit d'un document à l'autre, et le pic de
+    mémoire avec lui. Le vider à chaque page ferait redécoder les ressources partagées entre pages.
+    """
+    import fitz  # PyMuPDF
+
+    with VERROU_MUPDF:
+        fitz.TOOLS.store_shrink(100)
+
+
+def ouvrir_pdf(pdf_bytes):
+    """Document PyMuPDF (à utiliser avec with) ; PyMuPDF n'est importé qu'ici, au premier PDF"""
+    import fitz  # PyMuPDF
+
+    return fitz.open(stream=pdf_bytes, filetype="pdf")
+
+
+def nb_pages(pdf_bytes):
+    with ouvrir_pdf(pdf_bytes) as doc:
+        return doc.page_count
+
+
+def iter_pages(pdf_bytes, dpi, numeros=None, mode=MODE_RENDU, cote_max=COTE_MAX):
+    """Rend les pages demandées (numéros à partir de 1, toutes par défaut) une par une"""
+    try:
+        with ouvrir_pdf(pdf_bytes) as doc:
+            if numeros is None:
+                numeros = range(1, doc.page_count + 1)
+            for numero in numeros:
+                with METRIQUES.mesurer("rendu", page=numero) as mesures, VERROU_MUPDF:
+                    image = rendre_page(doc[numero - 1], dpi, mode=mode, cote_max=cote_max)
+                    mesures["pixels"] = image.width * image.height
+                yield numero, image
+    finally:
+        vider_cache_mupdf()  # Aussi si le lecteur abandonne le document en cours de route
@@ -0,0 +1,166 @@
+# === APPELS OCR FIABLES : DÉBIT LIMITÉ, REPRISES AVEC ATTENTE EXPONENTIELLE, DÉLAIS ===
+#
+# Tous les appels à Google Vision d'un processus passent par le même seau de jetons : le débit
+# reste sous le quota quel que soit le nombre de threads. Une erreur transitoire (quota dépassé,
+# service indisponible, délai dépassé...) est retentée après une attente exponentielle avec
+# tirage aléatoire ; un dépassement de quota réduit aussi le débit, qui remonte ensuite peu à peu.
+import os
+import random
+import threading
+import time
+from functools import cache
+
+# Réglages par défaut, modifiables sans toucher au code
+DEBIT_MAX = float(os.environ.get("OCR_DEBIT_MAX", 25))  # Images envoyées par seconde (quota Vision : 1 800 / minute)
+RAFALE = int(os.environ.get("OCR_RAFALE", 16))  # Jetons accumulables : un lot complet peut partir d'un coup
+TENTATIVES = int(os.environ.get("OCR_TENTATIVES", 5))  # Essais par requête, premier compris
+ATTENTE_BASE = 0.5  # Secondes, doublées à chaque échec
+ATTENTE_MAX = 30.0
+DELAI_REQUETE = float(os.environ.get("OCR_DELAI", 60))  # Délai maximal d'un appel à l'API (secondes)
+DELAI_TOTAL = float(os.environ.get("OCR_DELAI_TOTAL", 300))  # Échéance d'une requête, reprises comprises
+
+DEBIT_MIN = 0.5  # Le débit n'est jamais réduit en dessous (images par seconde)
+
+# Codes d'erreur gRPC renvoyés dans response.error qui justifient une nouvelle tentative
+CODES_TRANSITOIRES = {4, 8, 10, 13, 14}  # DEADLINE_EXCEEDED, RESOURCE_EXHAUSTED, ABORTED, INTERNAL, UNAVAILABLE
+CODE_QUOTA = 8
+
+
+@cache
+def exceptions_transitoires():
+    """Exceptions qui justifient une nouvelle tentative (google-api-core n'est importé qu'à la première erreur)"""
+    from google.api_core import exceptions as erreurs_google
+
+    return (
+        erreurs_google.ResourceExhausted,  # 429 / quota
+        erreurs_google.ServiceUnavailable,
+        erreurs_google.DeadlineExceeded,
+        erreurs_google.InternalServerError,
+        erreurs_google.Aborted,
+        erreurs_google.BadGateway,
+        erreurs_google.GatewayTimeout,
+        ConnectionError,
+        TimeoutError,
+    )
+
+
+class ErreurOCR(Exception):
+    """Erreur renvoyée dans la réponse de l'API (response.error), avec son code gRPC"""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def est_transitoire(erreur):
+    if isinstance(erreur, ErreurOCR):
+        return erreur.code in CODES_TRANSITOIRES
+    return isinstance(erreur, exceptions_transitoires())
+
+
+def est_quota(erreur):
+    if isinstance(erreur, ErreurOCR):
+        return erreur.code == CODE_QUOTA
+    return isinstance(erreur, exceptions_transitoires()[0])  # ResourceExhausted
+
+
+# === SEAU DE JETONS (DÉBIT MOYEN + RAFALE), PARTAGÉ ENTRE THREADS ===
+class SeauJetons:
+    def __init__(self, debit=DEBIT_MAX, capacite=RAFALE):
+        self.debit_max = debit
+        self.debit = debit
+        self.capacite = max(1, capacite)
+        self._jetons = float(self.capacite)
+        self._instant = time.monotonic()
+        self._verrou = threading.Lock()
+
+    def _remplir(self, maintenant):
+        self._jetons = min(self.capacite, self._jetons + (maintenant - self._instant) * self.debit)
+        self._instant = maintenant
+
+    def prendre(self, n=1, echeance=None):
+        """Attend que n jetons soient disponibles (n = nombre d'images de la requête)
+
+        Lève TimeoutError si l'attente dépasserait l'échéance (time.monotonic()).
+        """
+        n = min(n, self.capacite)  # Un lot plus grand que la rafale part dès que le seau est plein
+        while True:
+            with self._verrou:
+                maintenant = time.monotonic()
+                self._remplir(maintenant)
+                if self._jetons >= n:
+                    self._jetons -= n
+                    return
+                attente = (n - self._jetons) / self.debit
+            if echeance is not None and maintenant + attente > echeance:
+                raise TimeoutError("Échéance dépassée en attendant le quota d'appels OCR")
+            time.sleep(attente)
+
+    def reduire(self):
+        """Quota dépassé : débit divisé par deux"""
+        with self._verrou:
+            self._remplir(time.monotonic())
+            self.debit = max(DEBIT_MIN, self.debit / 2)
+
+    def retablir(self):
+        """Appel réussi : le débit remonte de 10 % vers son maximum"""
+        if self.debit < self.debit_max:
+            with self._verrou:
+                self._remplir(time.monotonic())
+                self.debit = min(self.debit_max, self.debit * 1.1)
+
+
+# === REPRISES AVEC ATTENTE EXPONENTIELLE ET TIRAGE ALÉATOIRE ===
+class Reprises:
+    def __init__(self, seau=None, tentatives=TENTATIVES, attente_base=ATTENTE_BASE, attente_max=ATTENTE_MAX,
+                 delai_total=DELAI_TOTAL):
+        self.seau = seau if seau is not None else SeauJetons()
+        self.tentatives = max(1, tentatives)
+        self.attente_base = attente_base
+        self.attente_max = attente_max
+        self.delai_total = delai_total
+
+    def appeler(self, fonction, cout=1, infos=None):
+        """Appelle fonction() en respectant le débit ; retente les erreurs transitoires
+
+        cout : nombre d'images de la requête (jetons consommés), ou fonction qui le donne à chaque
+        tentative (une reprise peut ne renvoyer qu'une partie des images). Si infos est un dict,
+        il reçoit "tentatives" (nombre d'appels effectués), "duree_appel" (durée cumulée des
+        appels à l'API) et "attente_quota" (attente des jetons et entre les reprises).
+        """
+        echeance = time.monotonic() + self.delai_total
+        duree_appel = attente = 0.0
+        appels = 0
+        try:
+            for tentative in range(1, self.tentatives + 1):
+                debut = time.perf_counter()
+                try:
+                    self.seau.prendre(cout() if callable(cout) else cout, echeance)
+                finally:  # Échéance dépassée avant tout appel : l'attente du quota est quand même mesurée
+                    attente += time.perf_counter() - debut
+                appels = tentative
+                appel = time.perf_counter()
+                try:
+                    resultat = fonction()
+                except Exception as e:
+                    duree_appel += time.perf_counter() - appel
+                    if not est_transitoire(e) or tentative == self.tentatives:
+                        raise
+                    if est_quota(e):
+                        self.seau.reduire()
+                    # Attente tirée entre 0 et base × 2^(essai - 1) : les threads ne repartent pas ensemble
+                    pause = random.uniform(0, min(self.attente_max, self.attente_base * 2 ** (tentative - 1)))
+                    if time.monotonic() + pause > echeance:
+                        raise
+                    time.sleep(pause)
+                    attente += pause
+                    continue
+                duree_appel += time.perf_counter() - appel
+                self.seau.retablir()
+                return resultat
+        finally:  # infos est rempli même en cas d'échec : les appelants y lisent toujours ces mesures
+            if infos is not None:
+                infos.update(tentatives=appels, duree_appel=duree_appel, attente_quota=attente)
+
+
+REPRISES = Reprises()  # Partagé par tous les appels Google Vision du processus
@@ -5,122 +5,94 @@
 
 # === IMPORTS ===
 import streamlit as st  # Pour créer une interface web interactive
-import fitz  # PyMuPDF
-from PIL import Image
-from google.oauth2 import service_account  # Pour utiliser une clé API Google Vision de façon sécurisée
-from google.cloud import vision  # Bibliothèque Google Cloud Vision pour faire de l'OCR
-import io  # Pour manipuler des fichiers en mémoire
-from PIL import Image, ImageDraw, ImageFont  # Pour afficher et dessiner sur les images
+from PIL import ImageDraw, ImageFont  # Pour dessiner sur les images
 import os
+from ocr_parallele import decrire_lecture, resumer_cache  # Résumé de la lecture de chaque page et du cache
+from texte_natif import extraire_couche_texte, pages_a_ocr  # Couche texte des PDF numériques
+from rendu_pdf import VERROU_MUPDF, ouvrir_pdf, rendre_page, dpi_effectif, vider_cache_mupdf  # Rendu des pages PDF en images (PyMuPDF)
+from lignes import group_words_by_lines  # Regroupement des mots en lignes
+from cache_streamlit import document_depose, lecteur_pdf, logo  # Objets créés une fois par processus
+from metriques import METRIQUES  # Durées par étape et par page
+from panneau_metriques import afficher_mesures  # Panneau de débogage (OCR_DEBUG=1 ou ?debug=1)
 
 # === INITIALISATION DU CLIENT GOOGLE VISION ===
-import json
-from google.oauth2 import service_account
-from google.cloud import vision
-import streamlit as st
-
-# Chargement des credentials à partir du secret JSON
-service_account_info = json.loads(st.secrets["GOOGLE_SERVICE_ACCOUNT_JSON"])
-credentials = service_account.Credentials.from_service_account_info(service_account_info)
-
-# Création du client Google Vision
-client = vision.ImageAnnotatorClient(credentials=credentials)
-
-
-# === CONVERSION DU PDF EN IMAGES ===
-def pdf_to_images(pdf_bytes):
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    images = []
-    for page in doc:
-        pix = page.get_pixmap(dpi=300)
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        images.append(img)
-    return images
-
-
-# === APPEL À L'OCR DE GOOGLE VISION POUR UNE IMAGE ===
-def vision_ocr_detect_text(image_pil):
-    img_byte_arr = io.BytesIO()  # Création d'un tampon mémoire pour l’image
-    image_pil.save(img_byte_arr, format='PNG')  # Sauvegarde de l'image dans ce tampon
-    content = img_byte_arr.getvalue()  # Récupération des données binaires
-
-    image = vision.Image(content=content)  # Préparation de l'image pour Google Vision
-    response = client.text_detection(image=image)  # Appel à l’OCR
-
-    if response.error.message:
-        raise Exception(f"Google Vision API error: {response.error.message}")  # Gestion des erreurs éventuelles
-
-    annotations = response.text_annotations  # Résultats de l’OCR
-    if not annotations:
-        return []  # Aucun texte détecté
-
-    words = []
-    for ann in annotations[1:]:  # On saute le 1er élément (texte global)
-        vertices = ann.bounding_poly.vertices  # Coins de la boîte entourant le mot
-        x_coords = [v.x for v in vertices]
-        y_coords = [v.y for v in vertices]
-        bbox = (min(x_coords), min(y_coords), max(x_coords), max(y_coords))  # Boîte englobante
-        words.append({"text": ann.description, "bbox": bbox})  # On stocke le mot et sa position
-
-    return words  # Liste des mots détectés avec position
-
-
-# === REGROUPER LES MOTS EN LIGNES BASÉ SUR LEUR POSITION Y ===
-def group_words_by_lines(words, y_tolerance=10):
-    lines = []
-    words_sorted = sorted(words, key=lambda w: w['bbox'][1])  # Trie les mots du haut vers le bas
-
-    for w in words_sorted:
-        x_min, y_min, x_max, y_max = w['bbox']
-        mid_y = (y_min + y_max) / 2  # Centre vertical du mot
-        placed = False
-        for line in lines:
-            line_y = line['y_mean']
-            if abs(mid_y - line_y) <= y_tolerance:  # Si le mot est proche verticalement
-                line['words'].append(w)
-                ys = [ (ww['bbox'][1] + ww['bbox'][3]) / 2 for ww in line['words'] ]
-                line['y_mean'] = sum(ys) / len(ys)  # Recalcule la moyenne Y de la ligne
-                placed = True
-                break
-        if not placed:
-            lines.append({'y_mean': mid_y, 'words': [w]})  # Nouvelle ligne
-
-    for line in lines:
-        line['words'] = sorted(line['words'], key=lambda w: w['bbox'][0])  # Trie gauche → droite
-
-    return lines
+# Cache OCR et lecteur : créés au premier lancement, réutilisés ensuite ; le client (credentials du secret JSON)
+# n'est créé qu'au premier appel à Google Vision. Une page déjà lue ne repasse pas par Google Vision
+DPI = 300  # Résolution de rendu des pages (fait partie de la clé du cache, voir rendu_pdf pour mode et taille max)
+lecteur = lecteur_pdf(DPI)  # Couche native, sinon OCR selon OCR_MODE ("page", "lot" ou "fichier")
+LARGEUR_MINIATURE = int(os.environ.get("OCR_LARGEUR_MINIATURE", 1000))  # Largeur des aperçus envoyés au navigateur (pixels)
 
 
 # === DESSINER LES LIGNES ET LEUR NUMÉRO SUR L'IMAGE ===
-def draw_lines_on_image(image_pil, lines, line_number_offset=0):
+def draw_lines_on_image(image_pil, lines, line_number_offset=0, echelle=1.0):
     draw = ImageDraw.Draw(image_pil)  # Préparation pour dessiner
     font = ImageFont.load_default()  # Police basique
 
-    for idx, line in enumerate(lines):  # On parcourt chaque ligne détectée, avec son index (idx)
-        words = line['words'] # On récupère la liste des mots appartenant à cette ligne
-        
-        # On cherche les coordonnées extrêmes de tous les mots pour délimiter la ligne entière :
-        x_min = min(w['bbox'][0] for w in words)   # Le X le plus à gauche (bord gauche de la ligne)
-        y_min = min(w['bbox'][1] for w in words)   # Le Y le plus haut (bord haut de la ligne)
-        x_max = max(w['bbox'][2] for w in words)   # Le X le plus à droite (bord droit de la ligne)
-        y_max = max(w['bbox'][3] for w in words)   # Le Y le plus bas (bord bas de la ligne) 
+    # Coordonnées extrêmes des mots de chaque ligne (cadre de la ligne entière), calculées en bloc
+    # pour toute la page (echelle < 1 : dessin sur un aperçu réduit, les boîtes sont dans le repère
+    # de la page pleine résolution)
+    cadres = (lines.cadres() * echelle).tolist()
 
+    for idx, (x_min, y_min, x_max, y_max) in enumerate(cadres):  # On parcourt chaque ligne détectée, avec son index (idx)
         draw.rectangle([x_min, y_min, x_max, y_max], outline="red", width=2)  # Encadrement de la ligne
         draw.text((x_min, y_min - 10), f"L{line_number_offset + idx + 1}", fill="red", font=font)  # Numéro ligne
 
     return image_pil #ça retourne le cadre délimité avec les caractères à l
 
 
+# === APERÇU D'UNE PAGE (MINIATURE OU PLEINE RÉSOLUTION) ===
+def apercu_page(page_pdf, image_pil=None, pleine_resolution=False):
+    """Image de la page à afficher et échelle par rapport au repère des mots (DPI de l'OCR)
+
+    Par défaut, un aperçu de LARGEUR_MINIATURE pixels : les pages lues sans OCR sont rendues
+    directement à basse résolution, les images déjà rendues pour l'OCR sont réduites.
+    """
+    largeur_pleine = page_pdf.rect.width * dpi_effectif(page_pdf, DPI) / 72  # Largeur dans le repère des mots
+    echelle = 1.0 if pleine_resolution else min(1.0, LARGEUR_MINIATURE / largeur_pleine)
+    if image_pil is None:
+        image_pil = rendre_page(page_pdf, dpi_effectif(page_pdf, DPI) * echelle, mode="RGB")
+    elif echelle < 1.0:
+        image_pil = image_pil.resize((round(image_pil.width * echelle), round(image_pil.height * echelle)))
+    if image_pil.mode != "RGB":
+        image_pil = image_pil.convert("RGB")  # Rendu en gris / noir et blanc : couleurs pour l'annotation
+    return image_pil, image_pil.width / largeur_pleine
+
+
+def afficher_page(emplacement, page_pdf, resultat, line_number_offset, pleine_resolution=False):
+    """Remplit l'emplacement réservé à la page : aperçu annoté et tableau des lignes, en quelques éléments"""
+    with emplacement.container():
+        st.caption(f"Page {resultat['page']} : {resultat['lecture']}")  # Chemin pris, temps et octets envoyés
+        lines = resultat["lines"]
+        if not lines:
+            return  # Page vide → rien d'autre à afficher
+
+        image_pil, echelle = apercu_page(page_pdf, resultat.get("image"), pleine_resolution)
+        annotated_img = draw_lines_on_image(image_pil, lines, line_number_offset=line_number_offset, echelle=echelle)
+        legende = "Lignes regroupées et numérotées" + ("" if pleine_resolution else " (aperçu réduit)")
+        st.image(annotated_img, caption=legende, use_container_width=True)  # Affichage
+
+        # Tout le texte de la page en un seul tableau (au lieu d'un st.write par ligne)
+        st.dataframe(
+            {
+                "Ligne": [f"L{line_number_offset + idx + 1}" for idx in range(len(lines))],
+                "Texte": lines.textes,
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
+
+
 # === INTERFACE STREAMLIT ===
 st.set_page_config(page_title="OCR PDF multi-pages", layout="wide")  # Mise en page large
+repere = METRIQUES.repere()  # Le panneau de débogage ne montre que les mesures de cette relance
 
 
 # === AFFICHAGE DU LOGO ===
-if os.path.exists("logo.png"):
-    logo_img = Image.open("logo.png")
+logo_png = logo()  # Réduit une fois par processus (cache_streamlit) : plus de réencodage à chaque relance
+if logo_png is not None:
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        st.image(logo_img)
+        st.image(logo_png)
 else:
     st.warning("Logo non trouvé. Assure-toi que 'logo.png' est présent dans le même dossier que ce script.")
     
@@ -130,38 +102,78 @@ st.title("📄 OCR et regroupement des lignes sur toutes les pages PDF")  # Titr
 uploaded_file = st.file_uploader("Dépose ton fichier PDF scanné ici", type=["pdf"])  # Dépose de PDF"
 
 if uploaded_file:
-    pdf_bytes = uploaded_file.read()  # Lit le fichier
+    sha256, pdf_bytes = document_depose(uploaded_file)  # Lit le fichier
     try:
-        images = pdf_to_images(pdf_bytes)  # Conversion PDF → images
-        st.success(f"✅ {len(images)} page(s) PDF convertie(s) en image(s).")  # Message utilisateur
+        natifs = extraire_couche_texte(pdf_bytes, DPI)  # PDF numérique : texte lu directement, sans OCR
+        numeros_ocr = [i + 1 for i in pages_a_ocr(natifs)]  # Pages scannées uniquement
+        st.success(f"✅ {len(natifs)} page(s) PDF, dont {len(numeros_ocr)} à passer à l'OCR.")  # Message utilisateur
+
+        # Pleine résolution à la demande, pour une seule page : les autres restent en aperçu
+        page_pleine = st.selectbox(
+            "Afficher en pleine résolution", ["Aucune"] + list(range(1, len(natifs) + 1)),
+            format_func=lambda p: p if p == "Aucune" else f"Page {p}",
+        )
+
+        progression = st.progress(0.0, text="Lecture des pages...")
+        emplacements = []  # Un emplacement par page, rempli dès que la page est prête
+        for numero in range(1, len(natifs) + 1):
+            emplacements.append(st.empty())
+            emplacements[-1].caption(f"Page {numero} : en attente...")
+
+        # Lignes déjà calculées pour ce document (relance après un choix dans la liste) : ni OCR ni regroupement
+        cle_resultats = f"tab_{sha256}_{DPI}"
+        resultats = st.session_state.get(cle_resultats)
+        if resultats is None:
+            resultats = lecteur.lire(pdf_bytes, natifs)  # Les pages arrivent au fil de l'eau, dans l'ordre
 
         line_counter = 0  # Numérotation globale des lignes
-
-        for i, pil_img in enumerate(images):  # Pour chaque page
-            pil_img = pil_img.convert("RGB")  # Format RGB
-            with st.spinner(f"Analyse OCR Google Vision de la page {i+1}..."):
-                words = vision_ocr_detect_text(pil_img)  # OCR Google Vision
-
-            if not words:
-                continue  # Page vide → on passe
-
-            lines = group_words_by_lines(words, y_tolerance=10)  # Regroupement en lignes
-            annotated_img = draw_lines_on_image(pil_img.copy(), lines, line_number_offset=line_counter)  # Dessin
-
-            st.image(annotated_img, caption="Lignes regroupées et numérotées", use_container_width=True)  # Affichage
-
-            st.markdown("**Texte reconnu par ligne :**")  # Sous-titre
-            for idx, line in enumerate(lines):
-                line_text = " ".join([w['text'] for w in line['words']])  # Texte complet de la ligne
-                st.write(f"L{line_counter + idx + 1}: {line_text}")  # Affichage texte ligne
-
-            line_counter += len(lines)  # Mise à jour compteur global
+        memorises = []
+        erreurs = []  # Pages dont l'OCR a échoué malgré les reprises
+        with ouvrir_pdf(pdf_bytes) as doc:  # Pour rendre les aperçus, fermé après la dernière page
+            for i, resultat in enumerate(resultats):  # Pour chaque page, dans l'ordre
+                if "lines" not in resultat:
+                    lines = []
+                    if resultat["words"]:
+                        with METRIQUES.mesurer("regroupement", page=resultat["page"], mots=len(resultat["words"])) as mesures:
+                            lines = group_words_by_lines(resultat["words"], y_tolerance=10)  # Regroupement en lignes
+                            mesures["lignes"] = len(lines)
+                    resultat = {
+                        "page": resultat["page"],
+                        "lecture": decrire_lecture(resultat),
+                        "lines": lines,
+                        "image": resultat.get("image"),  # Image rendue pour l'OCR, réduite pour l'aperçu
+                        "erreur": resultat.get("erreur"),
+                        "cache": resultat.get("cache"),  # Page lue dans le cache OCR (None : texte natif)
+                    }
+                if resultat["erreur"]:
+                    erreurs.append(resultat["page"])
+                numero = resultat["page"]
+                with VERROU_MUPDF:  # Les threads OCR peuvent appeler MuPDF en même temps (moteur pymupdf)
+                    page_pdf = doc[numero - 1]
+                with METRIQUES.mesurer("affichage", page=numero):  # Aperçu, annotation et tableau envoyés au navigateur
+                    afficher_page(emplacements[numero - 1], page_pdf, resultat, line_counter,
+                                  pleine_resolution=(numero == page_pleine))
+                resultat.pop("image", None)  # Seules les lignes sont gardées en mémoire
+                memorises.append(resultat)
+                line_counter += len(resultat["lines"])  # Mise à jour compteur global
+                progression.progress((i + 1) / len(natifs), text=f"{i + 1}/{len(natifs)} page(s) lue(s)")
+        vider_cache_mupdf()  # Aperçus rendus : cache de MuPDF vidé une fois pour tout le document
+
+        if erreurs:
+            st.warning(f"OCR impossible pour la/les page(s) {', '.join(map(str, erreurs))} malgré les reprises : "
+                       "elles seront retentées à la prochaine relance.")
+        else:
+            # Document complet : gardé pour les relances, à la place des lignes des documents déposés avant
+            for cle in [cle for cle in st.session_state if cle.startswith("tab_") and cle != cle_resultats]:
+                del st.session_state[cle]
+            st.session_state[cle_resultats] = memorises
+        progression.empty()
 
         if line_counter == 0:
             st.warning("Aucune page contenant du texte détectée dans ce PDF.")  # Si rien trouvé
 
+        st.caption(resumer_cache(memorises, lecteur.moteur.libelle))  # Ce document seulement : le cache OCR est commun au processus
+        afficher_mesures(repere)
+
     except Exception as e:
         st.error(f"Erreur: {e}")  # Gestion d’erreur
-
-
-
@@ -0,0 +1,98 @@
+# === TESTS DES MONTANTS LUS DANS LA MISE EN PAGE (COLONNES, MOTS VOISINS) ===
+#
+# Usage :
+#   python -m pytest tests
+#
+# Les pages sont construites mot par mot (texte et boîte en pixels), comme les rend l'OCR.
+import os
+import sys
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyse import analyser_famille, extraire_montants, lignes_de_page  # noqa: E402
+from colonnes import MiseEnPage  # noqa: E402
+from mots_cles import MoteurMotsCles  # noqa: E402
+
+ENTETE = [("Date", 10), ("Libellé", 150), ("Débit", 600), ("Crédit", 700), ("Solde", 850)]
+MOTEUR = MoteurMotsCles(["échéance"], {"échéance": []}, ["versement"], {"versement": []})
+
+
+def _page(rangs, numero=1):
+    """Page dont chaque rang est une liste de (texte, x) : une ligne tous les 40 pixels"""
+    words = []
+    for k, cellules in enumerate(rangs):
+        y = 50 + 40 * k
+        words += [{"text": texte, "bbox": (x, y, x + 10 * len(texte), y + 20)} for texte, x in cellules]
+    return {"numero": numero, "lines": lignes_de_page(words)}
+
+
+def _releve(entete=True):
+    """Relevé en tableau : 4 échéances au débit, 3 versements au crédit, solde coupé en deux mots par l'OCR
+
+    Un libellé sépare chaque mot-clé de son montant : celui-ci est lu dans la mise en page.
+    """
+    rangs = [ENTETE] if entete else []
+    solde = 80000
+    for i in range(1, 8):
+        debit = i <= 4
+        solde += -150 if debit else 500
+        rangs.append([(f"0{i}/01/2024", 10), ("Échéance" if debit else "Versement", 150),
+                      ("prêt" if debit else "salaire", 260), ("150,00" if debit else "500,00", 600 if debit else 700),
+                      (str(solde // 1000), 850), (f"{solde % 1000:03d},00", 875)])
+    return rangs
+
+
+def test_colonnes_nommees_par_les_entetes():
+    mise_en_page = MiseEnPage(_page(_releve())["lines"])
+    assert len(mise_en_page.colonnes) == 3
+    assert mise_en_page.familles == {0: "DÉBIT", 1: "CRÉDIT"}  # Le solde (colonne 2) n'a pas de nom
+    assert not mise_en_page.candidates[0]  # Ligne d'en-têtes : aucun montant
+
+
+def test_montants_des_colonnes_nommees():
+    lignes, totaux = extraire_montants([_page(_releve())], MOTEUR)
+    assert totaux == {"DÉBIT": Decimal("600.00"), "CRÉDIT": Decimal("1500.00")}
+    assert all(ligne["trouve"][0] in (Decimal("150.00"), Decimal("500.00")) for ligne in lignes[1:])
+
+
+def test_solde_jamais_pris_pour_un_mot_cle():
+    # Échéance sans montant au débit : la colonne Crédit n'est pas la sienne, et le solde n'a pas de nom
+    rangs = _releve() + [[("08/01/2024", 10), ("Échéance", 150), ("reportée", 260), ("90,00", 700),
+                          ("81", 850), ("090,00", 875)]]
+    lignes, totaux = extraire_montants([_page(rangs)], MOTEUR)
+    assert lignes[-1]["trouve"] is None
+    assert totaux["DÉBIT"] == Decimal("600.00")
+
+
+def test_sans_entete_premier_montant_apres_le_mot_cle():
+    lignes, totaux = extraire_montants([_page(_releve(entete=False))], MOTEUR)
+    assert totaux == {"DÉBIT": Decimal("600.00"), "CRÉDIT": Decimal("1500.00")}  # Pas le solde, lu plus loin
+    assert lignes[0]["texte"] == "01/01/2024 Échéance prêt 150,00 79 850,00"
+    assert lignes[0]["trouve"][3] == (25, 31)  # Position de "150,00" dans le texte de la ligne
+
+
+def test_pas_de_milliers_entre_deux_colonnes():
+    # "3" et "12" sont loin de "150,00" : pas de 3 150,00 ni de 12 150,00
+    page = _page([
+        [("Échéance", 10), ("n°", 100), ("3", 130), ("150,00", 600)],
+        [("Échéance", 10), ("12", 100), ("150,00", 600)],
+    ])
+    _, lignes, totaux = analyser_famille([page])
+    assert [ligne["trouve"][0] for ligne in lignes] == [Decimal("150.00"), Decimal("150.00")]
+    assert totaux["DÉBIT"] == Decimal("300.00")
+
+
+def test_milliers_entre_deux_mots_voisins():
+    page = _page([[("Échéance", 10), ("1", 100), ("200,00", 112)]])  # OCR coupé : "1" "200,00"
+    _, lignes, _ = analyser_famille([page])
+    assert lignes[0]["trouve"][0] == Decimal("1200.00")
+
+
+def test_numero_puis_montant():
+    page = _page([
+        [("Échéance", 10), ("n°", 100), ("12", 130), ("500,00", 600)],  # Numéro, puis montant une colonne plus loin
+        [("Échéance", 10), ("12", 100), ("500,00", 124)],  # Mots voisins : 12 500,00 coupé par l'OCR
+    ])
+    _, lignes, _ = analyser_famille([page])
+    assert [ligne["trouve"][0] for ligne in lignes] == [Decimal("500.00"), Decimal("12500.00")]
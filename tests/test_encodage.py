@@ -0,0 +1,41 @@
+# === TESTS DE L'ENCODAGE DES PAGES AVANT ENVOI (RÉGLAGES, CLÉ DU CACHE, TAILLE MAXIMALE) ===
+#
+# Usage :
+#   python -m pytest tests
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_ocr import CacheOCR  # noqa: E402
+from encodage import TAILLE_MAX_DEFAUT, encoder_image, signature_encodage  # noqa: E402
+
+
+def test_signature_vide_avec_les_reglages_par_defaut():
+    assert signature_encodage("PNG", 85, False, TAILLE_MAX_DEFAUT) == ""
+    assert signature_encodage("PNG", 40, False, TAILLE_MAX_DEFAUT) == ""  # La qualité ne compte pas en PNG
+
+
+def test_chaque_reglage_change_la_cle_du_cache(tmp_path):
+    cache, image = CacheOCR(str(tmp_path)), Image.new("RGB", (20, 10), "white")
+    signatures = [signature_encodage(*reglages) for reglages in [
+        ("PNG", 85, False, TAILLE_MAX_DEFAUT), ("JPEG", 85, False, TAILLE_MAX_DEFAUT),
+        ("JPEG", 60, False, TAILLE_MAX_DEFAUT), ("WEBP", 85, False, TAILLE_MAX_DEFAUT),
+        ("PNG", 85, True, TAILLE_MAX_DEFAUT), ("PNG", 85, False, 1024 * 1024),
+    ]]
+    cles = {cache.cle(image, 200, "TEXT_DETECTION" + signature) for signature in signatures}
+    assert len(cles) == len(signatures)
+
+
+def test_reduction_jusqu_a_la_taille_max():
+    image = Image.effect_noise((400, 300), 100).convert("RGB")  # Bruit : se compresse mal
+    content, echelle = encoder_image(image, "PNG", 85, False, 20_000)
+    assert len(content) <= 20_000 and echelle < 1
+
+
+def test_taille_max_impossible_a_atteindre():
+    with pytest.raises(ValueError):
+        encoder_image(Image.new("RGB", (50, 50), "white"), "PNG", 85, False, 10)  # Moins qu'un PNG de 1 × 1
@@ -0,0 +1,36 @@
+# === TESTS DU REGROUPEMENT DES MOTS EN LIGNES (COMPARÉ À L'ALGORITHME D'ORIGINE) ===
+#
+# Usage :
+#   python -m pytest tests
+#
+# L'algorithme d'origine et les pages synthétiques sont ceux du micro-benchmark (benchmarks/bench_lignes.py).
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_lignes import _signature, group_words_by_lines_ancien, page_synthetique  # noqa: E402
+from lignes import group_words_by_lines  # noqa: E402
+from mots_page import MotsPage  # noqa: E402
+
+
+@pytest.mark.parametrize("nb_mots", [0, 1, 12, 500, 3000])
+def test_memes_lignes_que_l_algorithme_d_origine(nb_mots):
+    words = page_synthetique(nb_mots, graine=nb_mots)
+    assert _signature(group_words_by_lines(words)) == _signature(group_words_by_lines_ancien(words))
+
+
+@pytest.mark.parametrize("y_tolerance", [0, 5, 30])
+def test_tolerance(y_tolerance):
+    words = page_synthetique(300, graine=1)
+    assert (_signature(group_words_by_lines(words, y_tolerance=y_tolerance))
+            == _signature(group_words_by_lines_ancien(words, y_tolerance=y_tolerance)))
+
+
+def test_lignes_du_moteur_jamais_coupees():
+    # Ligne penchée : par position seule, chaque mot ferait sa ligne
+    boites = [(0, 90, 10, 110), (20, 102, 30, 122), (40, 114, 50, 134), (0, 150, 10, 170)]
+    assert group_words_by_lines(MotsPage.construire(["a", "b", "c", "d"], boites)).textes == ["a", "b", "c", "d"]
+    assert group_words_by_lines(MotsPage.construire(["a", "b", "c", "d"], boites, [0, 0, 0, 1])).textes == ["a b c", "d"]
@@ -0,0 +1,77 @@
+# === TESTS DU MAGASIN SQLITE (ENREGISTREMENT, RELECTURE, RECHERCHE PLEIN TEXTE) ===
+#
+# Usage :
+#   python -m pytest tests
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyse import extraire_montants, lignes_de_page, rechercher_dans_magasin, rechercher_mot  # noqa: E402
+from magasin import MagasinDocuments  # noqa: E402
+from mots_cles import MoteurMotsCles  # noqa: E402
+
+TEXTES = ["Échéance du prêt 120,50", "Prochaines échéances 30,00", "déchéance 99,00", "Total TTC 12,00",
+          "sous-total 5,00", "TVA 20 % 4,00", "total_ht 7,00", "Échéance dupont 1 200,00"]
+
+
+def _pages(textes=TEXTES):
+    """Une page, une ligne par texte ; mots espacés de 150 pixels sauf les morceaux d'un montant"""
+    words = []
+    for k, texte in enumerate(textes):
+        x = 10
+        for mot in texte.split():
+            words.append({"text": mot, "bbox": (x, 50 + 40 * k, x + 10 * len(mot), 70 + 40 * k)})
+            x += 10 * len(mot) + (5 if mot.isdigit() else 150)
+    return [{"numero": 1, "lines": lignes_de_page(words)}]
+
+
+@pytest.fixture
+def magasin(tmp_path):
+    magasin = MagasinDocuments(str(tmp_path / "documents.sqlite"))
+    magasin.enregistrer("abc", 200, _pages(), nom="releve.pdf")
+    return magasin
+
+
+def test_relecture_identique(magasin):
+    pages, relues = _pages(), magasin.charger_pages("abc", 200)
+    assert relues[0]["lines"].textes == pages[0]["lines"].textes
+    assert relues[0]["lines"].boites_mots() == pages[0]["lines"].boites_mots()
+    moteur = MoteurMotsCles(["échéance"], {"échéance": []}, [], {})
+    assert extraire_montants(relues, moteur) == extraire_montants(pages, moteur)
+    assert magasin.charger_pages("abc", 300) is None  # Autre DPI : autre document
+    assert magasin.contient("abc", 200) and not magasin.contient("abd", 200)
+
+
+def test_enregistrer_remplace(magasin):
+    magasin.enregistrer("abc", 200, _pages(["Total 3,00"]), nom="releve.pdf")
+    assert magasin.nb_documents() == 1
+    assert magasin.charger_pages("abc", 200)[0]["lines"].textes == ["Total 3,00"]
+
+
+@pytest.mark.parametrize("mot, attendu", [
+    ("echeance", ["Échéance du prêt 120,50", "Prochaines échéances 30,00", "Échéance dupont 1 200,00"]),
+    ("Échéance du", ["Échéance du prêt 120,50", "Échéance dupont 1 200,00"]),
+    ("cheance", []),
+    ("total", ["Total TTC 12,00", "sous-total 5,00", "total_ht 7,00"]),
+    ("ht", ["total_ht 7,00"]),
+    ("%", ["TVA 20 % 4,00"]),
+])
+def test_recherche_meme_regle_que_les_pages_en_memoire(magasin, mot, attendu):
+    lignes, total = rechercher_dans_magasin(magasin, mot, sha256="abc", dpi=200)
+    assert [texte for _, _, _, texte, _ in lignes] == attendu
+    en_memoire, total_memoire = rechercher_mot(_pages(), mot)
+    assert [texte for _, texte, _ in en_memoire] == attendu
+    assert total == total_memoire
+
+
+def test_recherche_filtres(magasin):
+    magasin.enregistrer("def", 200, _pages(["Échéance 10,00"]), nom="autre.pdf")
+    lignes, total = rechercher_dans_magasin(magasin, "echeance")  # Tous les documents
+    assert [nom for nom, *_ in lignes] == ["releve.pdf"] * 3 + ["autre.pdf"]
+    assert total == Decimal("1360.50")
+    lignes, _ = rechercher_dans_magasin(magasin, "echeance", montant_min=Decimal("100"), montant_max=Decimal("1000"))
+    assert [montant for *_, montant in lignes] == [Decimal("120.50")]
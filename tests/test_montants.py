@@ -0,0 +1,78 @@
+# === TESTS DE L'ANALYSEUR DE MONTANTS (FORMAT FRANÇAIS, VALEURS DÉCIMALES) ===
+#
+# Usage :
+#   python -m pytest tests
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from montants import montant_accole, montant_suivant, montants_de_texte, montants_par_ligne, total, valeur  # noqa: E402
+
+
+def _valeurs(texte):
+    return [montant for montant, _, _ in montants_de_texte(texte)]
+
+
+@pytest.mark.parametrize("texte, attendu", [
+    ("1 234,56", "1234.56"),
+    ("1 234,56", "1234.56"),  # Espace insécable
+    ("1 234,56", "1234.56"),  # Espace fine insécable
+    ("1.234,56", "1234.56"),
+    ("1234,56", "1234.56"),
+    ("12.50", "12.50"),
+    ("1 234 567,89", "1234567.89"),
+    ("-12,50", "-12.50"),
+])
+def test_valeur(texte, attendu):
+    assert valeur(texte) == Decimal(attendu)
+
+
+@pytest.mark.parametrize("texte", ["12", "12,5", "3,14159", "abc", "12.03.2024", "05/03/2024"])
+def test_pas_un_montant(texte):
+    assert valeur(texte) is None
+
+
+def test_milliers_et_position():
+    assert montants_de_texte("total 1 234,56 eur") == [(Decimal("1234.56"), 6, 14)]
+    assert _valeurs("ref 1234 56,00") == [Decimal("56.00")]  # 4 chiffres : pas un groupe de milliers
+
+
+def test_signes():
+    assert montants_de_texte("solde -12,50") == [(Decimal("-12.50"), 7, 12)]  # Position des chiffres, sans le signe
+    assert _valeurs("echeance-12,50") == [Decimal("12.50")]  # Tiret collé au mot : séparateur, pas un signe
+
+
+def test_dates():
+    assert _valeurs("le 12.03.2024") == []
+    assert _valeurs("le 05/03/2024") == []
+    assert _valeurs("05/03 123,45") == [Decimal("123.45")]  # Pas 3 123,45
+
+
+def test_numero_puis_montant():
+    # Le texte seul ne distingue pas "n° 12" suivi de "500,00" de 12 500,00 : c'est la mise en page
+    # (colonnes.MiseEnPage, mots voisins ou non) qui tranche, voir test_colonnes.py
+    assert _valeurs("echeance n° 12 500,00") == [Decimal("12500.00")]
+
+
+def test_montants_par_ligne_comme_ligne_par_ligne():
+    textes = ["echeance 120,50", "", "05/03 1 234,56 et -7,00", "le 12.03.2024", "12.50"]
+    assert montants_par_ligne(textes) == [montants_de_texte(texte) for texte in textes]
+
+
+def test_montant_accole_et_suivant():
+    texte = "echeance - 12,50 puis 3,00"
+    montants = montants_de_texte(texte)
+    assert montant_accole(texte, len("echeance"), montants)[0] == Decimal("12.50")
+    assert montant_accole(texte, len("echeance - 12,50 puis"), montants)[0] == Decimal("3.00")
+    assert montant_accole("echeance du 12,50", len("echeance"), montants_de_texte("echeance du 12,50")) is None
+    assert montant_suivant(montants, 17)[0] == Decimal("3.00")
+    assert montant_suivant(montants, len(texte)) is None
+
+
+def test_total_exact():
+    assert total([Decimal("0.10")] * 3) == Decimal("0.30")
+    assert total([]) == Decimal(0)
@@ -0,0 +1,50 @@
+# === TESTS DU MOTEUR DE MOTS-CLÉS (PRIORITÉS DÉBIT / CRÉDIT, MONTANT ACCOLÉ) ===
+#
+# Usage :
+#   python -m pytest tests
+import os
+import sys
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mots_cles import MoteurMotsCles  # noqa: E402
+
+MOTEUR = MoteurMotsCles(
+    ["échéance", "frais"], {"échéance": ["echeances"], "frais": ["frais de dossier"]},
+    ["remboursement"], {"remboursement": []},
+)
+
+
+def test_debit_avant_credit():
+    # Le crédit vient en premier dans la ligne, mais un débit l'emporte toujours
+    assert MOTEUR.chercher("Remboursement 50,00 échéance 120,00") == (
+        Decimal("120.00"), "échéance", (20, 28), (29, 35), "DÉBIT")
+    assert MOTEUR.chercher("Remboursement 40,00")[4] == "CRÉDIT"
+
+
+def test_ordre_de_selection_dans_une_famille():
+    assert MOTEUR.chercher("frais 10,00 échéance 120,00")[1] == "échéance"  # Sélectionné en premier
+
+
+def test_variantes_accents_et_plus_longue_forme():
+    assert MOTEUR.chercher("Échéances 12,50")[:2] == (Decimal("12.50"), "échéance")
+    assert MOTEUR.chercher("Frais de dossier 15,00")[2] == (0, 16)  # "frais de dossier" plutôt que "frais"
+
+
+def test_montant_sans_signe_et_non_nul():
+    assert MOTEUR.chercher("Échéance -12,50")[0] == Decimal("12.50")  # Le mot-clé dit débit
+    assert MOTEUR.chercher("échéance 0,00 frais 3,00")[:2] == (Decimal("3.00"), "frais")
+    assert MOTEUR.chercher("rien 12,00") is None
+
+
+def test_montant_de_la_mise_en_page():
+    demandes = []
+
+    def montant_colonne(famille, fin_mot):
+        demandes.append((famille, fin_mot))
+        return (Decimal("7.00"), (17, 21)) if famille == "DÉBIT" else None
+
+    assert MOTEUR.chercher("échéance du mois 7,00x", montant_colonne) == (
+        Decimal("7.00"), "échéance", (0, 8), (17, 21), "DÉBIT")
+    assert demandes == [("DÉBIT", 8)]  # Fin du mot-clé dans le texte plié
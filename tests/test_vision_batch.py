@@ -0,0 +1,160 @@
+# === TESTS DES MODES "LOT" ET "FICHIER" CONTRE UN FAUX CLIENT GOOGLE VISION (SANS RÉSEAU) ===
+#
+# Usage :
+#   python -m pytest tests
+#
+# Le faux client répond comme l'API (messages google-cloud-vision) : une réponse par image ou par page,
+# avec, pour les positions demandées, une erreur à la place des mots.
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.cloud import vision  # noqa: E402
+
+from cache_ocr import CacheOCR  # noqa: E402
+from reprises import ErreurOCR, Reprises, SeauJetons  # noqa: E402
+from vision_batch import OCRVisionLot, ocr_pages_fichier, ocr_pages_par_lots  # noqa: E402
+
+CODE_PERMANENT = 3   # INVALID_ARGUMENT : pas de reprise
+CODE_TRANSITOIRE = 14  # UNAVAILABLE : reprise
+
+CADRE = [{"x": 1, "y": 2}, {"x": 5, "y": 2}, {"x": 5, "y": 8}, {"x": 1, "y": 8}]
+CADRE_NORMALISE = [{"x": .1, "y": .1}, {"x": .2, "y": .1}, {"x": .2, "y": .12}, {"x": .1, "y": .12}]
+
+
+class FauxClient:
+    """batch_annotate_images / batch_annotate_files ; erreurs[n] : {position dans la requête: code} du n-ième appel"""
+
+    def __init__(self, erreurs=()):
+        self.erreurs = list(erreurs)
+        self.envois = []  # Images (nombre) ou pages (numéros) de chaque appel
+
+    def _erreur(self, position):
+        appel = len(self.envois) - 1
+        return self.erreurs[appel].get(position) if appel < len(self.erreurs) else None
+
+    def _reponse(self, position, mots):
+        code = self._erreur(position)
+        if code:
+            return vision.AnnotateImageResponse(error={"code": code, "message": f"code {code}"})
+        return vision.AnnotateImageResponse(**mots)
+
+    def batch_annotate_images(self, requests, **kwargs):
+        self.envois.append(len(requests))
+        mots = {"text_annotations": [{"description": "total"}, {"description": "total", "bounding_poly": {"vertices": CADRE}}]}
+        return vision.BatchAnnotateImagesResponse(responses=[self._reponse(k, mots) for k in range(len(requests))])
+
+    def batch_annotate_files(self, requests, **kwargs):
+        numeros = list(requests[0].pages)
+        self.envois.append(numeros)
+        reponses = []
+        for k, numero in enumerate(numeros):
+            mot = {"symbols": [{"text": "p"}, {"text": str(numero)}], "bounding_box": {"normalized_vertices": CADRE_NORMALISE}}
+            page = {"width": 612, "height": 792, "blocks": [{"paragraphs": [{"words": [mot]}]}]}
+            reponses.append(self._reponse(k, {"full_text_annotation": {"pages": [page]}}))
+        return vision.BatchAnnotateFilesResponse(responses=[{"responses": reponses}])
+
+
+@pytest.fixture
+def reprises():
+    return Reprises(SeauJetons(1000, 100), attente_base=0.001)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheOCR(str(tmp_path / "cache"))
+
+
+def _pages(nb):
+    return [(numero, Image.new("RGB", (50 + numero, 50), "white")) for numero in range(1, nb + 1)]
+
+
+def _textes(resultat):
+    return [mot["text"] for mot in resultat["words"]]
+
+
+# === MODE "LOT" (batch_annotate_images) ===
+def test_lot_toutes_les_pages_puis_cache(reprises, cache):
+    client = FauxClient()
+    resultats = list(ocr_pages_par_lots(_pages(3), OCRVisionLot(client, reprises=reprises), cache, 200))
+    assert client.envois == [3]  # Un seul appel pour les trois images
+    assert [r["page"] for r in resultats] == [1, 2, 3]
+    assert all(_textes(r) == ["total"] and not r["cache"] and "erreur" not in r for r in resultats)
+
+    resultats = list(ocr_pages_par_lots(_pages(3), OCRVisionLot(client, reprises=reprises), cache, 200))
+    assert client.envois == [3]  # Relecture : tout vient du cache
+    assert all(r["cache"] for r in resultats)
+
+
+def test_lot_image_en_erreur(reprises, cache):
+    client = FauxClient([{1: CODE_PERMANENT}])
+    resultats = list(ocr_pages_par_lots(_pages(3), OCRVisionLot(client, reprises=reprises), cache, 200))
+    assert client.envois == [3]  # Erreur permanente : pas de reprise
+    assert [_textes(r) for r in resultats] == [["total"], [], ["total"]]  # Les autres images sont gardées
+    assert "code 3" in resultats[1]["erreur"]
+    assert "erreur" not in resultats[0] and "erreur" not in resultats[2]
+
+    resultats = list(ocr_pages_par_lots(_pages(3), OCRVisionLot(client, reprises=reprises), cache, 200))
+    assert client.envois == [3, 1]  # Seule la page en échec repart, les autres sont en cache
+    assert [r["cache"] for r in resultats] == [True, False, True]
+
+
+def test_lot_reprise_de_la_seule_image_transitoire(reprises, cache):
+    client = FauxClient([{1: CODE_TRANSITOIRE}])
+    resultats = list(ocr_pages_par_lots(_pages(3), OCRVisionLot(client, reprises=reprises), cache, 200))
+    assert client.envois == [3, 1]
+    assert [_textes(r) for r in resultats] == [["total"]] * 3
+    assert not any("erreur" in r for r in resultats)
+
+
+def test_lot_echeance_du_quota_avant_tout_appel(cache):
+    seau = SeauJetons(0.01, 1)
+    seau.prendre()  # Seau vide : le prochain jeton arrive bien après l'échéance
+    client = FauxClient()
+    lot = OCRVisionLot(client, reprises=Reprises(seau, delai_total=0.1))
+    resultats = list(ocr_pages_par_lots(_pages(2), lot, cache, 200))
+    assert client.envois == []
+    assert all(r["erreur"].startswith("TimeoutError") and r["tentatives"] == 0 for r in resultats)
+
+
+def test_lot_image_seule_leve_l_erreur(reprises):
+    lot = OCRVisionLot(FauxClient([{0: CODE_PERMANENT}]), reprises=reprises)
+    with pytest.raises(ErreurOCR, match="code 3"):
+        lot(Image.new("RGB", (50, 50)))
+
+
+# === MODE "FICHIER" (batch_annotate_files) ===
+def test_fichier_toutes_les_pages_puis_cache(reprises, cache):
+    client = FauxClient()
+    resultats = ocr_pages_fichier(b"%PDF", [1, 2, 3], OCRVisionLot(client, reprises=reprises), cache, 200)
+    assert client.envois == [[1, 2, 3]]
+    assert [_textes(r) for r in resultats] == [["p1"], ["p2"], ["p3"]]
+    assert not any(r["cache"] for r in resultats)
+
+    resultats = ocr_pages_fichier(b"%PDF", [1, 2, 3], OCRVisionLot(client, reprises=reprises), cache, 200)
+    assert client.envois == [[1, 2, 3]]
+    assert all(r["cache"] for r in resultats)
+
+
+def test_fichier_page_en_erreur(reprises, cache):
+    client = FauxClient([{1: CODE_PERMANENT}])
+    resultats = ocr_pages_fichier(b"%PDF", [1, 2, 3], OCRVisionLot(client, reprises=reprises), cache, 200)
+    assert client.envois == [[1, 2, 3]]
+    assert [_textes(r) for r in resultats] == [["p1"], [], ["p3"]]
+    assert "code 3" in resultats[1]["erreur"]
+
+    # Document incomplet : pas mis en cache, il est renvoyé en entier à la relance
+    ocr_pages_fichier(b"%PDF", [1, 2, 3], OCRVisionLot(client, reprises=reprises), cache, 200)
+    assert client.envois == [[1, 2, 3], [1, 2, 3]]
+
+
+def test_fichier_reprise_de_la_seule_page_transitoire(reprises, cache):
+    client = FauxClient([{1: CODE_TRANSITOIRE}])
+    resultats = ocr_pages_fichier(b"%PDF", [1, 2, 3], OCRVisionLot(client, reprises=reprises), cache, 200)
+    assert client.envois == [[1, 2, 3], [2]]
+    assert [_textes(r) for r in resultats] == [["p1"], ["p2"], ["p3"]]
+    assert not any("erreur" in r for r in resultats)
@@ -0,0 +1,95 @@
+# === COUCHE TEXTE NATIVE DES PDF (évite l'OCR pour les PDF numériques) ===
+import time
+
+from mots_page import MotsPage
+from rendu_pdf import COTE_MAX, dpi_effectif
+
+MIN_MOTS = 5  # En dessous, la page est considérée comme scannée (ou couche texte inutilisable)
+MIN_RATIO_LISIBLE = 0.9  # Part minimale de caractères lisibles (les couches texte cassées donnent des "�")
+# Page scannée avec quelques mots numériques (tampon, pied de page) : les images couvrent au moins
+# MIN_PART_IMAGES de la page et les mots moins de MIN_TEXTE_SUR_IMAGES de l'aire des images → OCR
+MIN_PART_IMAGES = 0.5
+MIN_TEXTE_SUR_IMAGES = 0.05
+
+
+def _couche_utilisable(textes):
+    if len(textes) < MIN_MOTS:
+        return False
+    texte = "".join(textes)
+    lisibles = sum(1 for c in texte if c.isprintable() and c != "�")
+    return lisibles / max(1, len(texte)) >= MIN_RATIO_LISIBLE
+
+
+def _surtout_image(page, aire_texte):
+    """Vrai si la page est surtout une image que la couche texte ne couvre qu'à peine (scan + tampon)"""
+    import fitz  # PyMuPDF
+
+    cadre = page.rect  # Boîtes des images dans le repère affiché (l'aire des mots ne dépend pas du repère)
+    aire_images = 0.0
+    for info in page.get_image_info():
+        boite = fitz.Rect(info["bbox"]).intersect(cadre)
+        if not boite.is_empty:
+            aire_images += boite.width * boite.height
+    aire_images = min(aire_images, cadre.width * cadre.height)  # Images superposées : pas plus que la page
+    return (aire_images >= MIN_PART_IMAGES * cadre.width * cadre.height
+            and aire_texte < MIN_TEXTE_SUR_IMAGES * aire_images)
+
+
+def mots_natifs(page, dpi, cote_max=COTE_MAX):
+    """Mots de la couche texte d'une page, en pixels au DPI de rendu ; None si inutilisable
+
+    Inutilisable : trop peu de mots, caractères illisibles, ou page scannée dont la couche texte
+    ne couvre qu'une petite partie de l'image (_surtout_image).
+    """
+    import fitz  # PyMuPDF, importé au premier PDF traité (voir rendu_pdf)
+
+    echelle = dpi_effectif(page, dpi, cote_max) / 72  # Coordonnées PyMuPDF en points → pixels de l'image rendue
+    matrice = page.rotation_matrix  # Pages tournées : on se place dans le repère affiché
+    textes, bboxes = [], []
+    aire_texte = 0.0
+    for x0, y0, x1, y1, text, *_ in page.get_text("words"):
+        if not text.strip():
+            continue
+        aire_texte += (x1 - x0) * (y1 - y0)
+        rect = fitz.Rect(x0, y0, x1, y1) * matrice
+        textes.append(text)
+        bboxes.append((round(rect.x0 * echelle), round(rect.y0 * echelle), round(rect.x1 * echelle), round(rect.y1 * echelle)))
+    if not _couche_utilisable(textes) or _surtout_image(page, aire_texte):
+        return None
+    return MotsPage.construire(textes, bboxes)
+
+
+def extraire_couche_texte(pdf_bytes, dpi, cote_max=COTE_MAX):
+    """Pour chaque page : {"words", "duree"} si la couche texte suffit, sinon None (→ OCR)"""
+    import fitz  # PyMuPDF
+
+    pages = []
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        for page in doc:
+            debut = time.perf_counter()
+            words = mots_natifs(page, dpi, cote_max)
+            if words is None:
+                pages.append(None)
+            else:
+                pages.append({"words": words, "duree": time.perf_counter() - debut})
+    return pages
+
+
+def pages_a_ocr(natifs):
+    """Indices (à partir de 0) des pages sans couche texte exploitable"""
+    return [i for i, natif in enumerate(natifs) if natif is None]
+
+
+def fusionner(natifs, resultats_ocr):
+    """Toutes les pages dans l'ordre, avec le chemin pris par chacune ("natif" ou "ocr")
+
+    Générateur : les résultats OCR sont consommés au fil de l'eau.
+    """
+    resultats_ocr = iter(resultats_ocr)
+    for i, natif in enumerate(natifs):
+        if natif is None:
+            resultat = dict(next(resultats_ocr), source="ocr")
+        else:
+            resultat = dict(natif, source="natif")
+        resultat["page"] = i + 1
+        yield resultat
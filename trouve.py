@@ -1,105 +1,26 @@
 # === IMPORTS ===
 import streamlit as st
-from pdf2image import convert_from_bytes
-from google.oauth2 import service_account
-from google.cloud import vision
-import io
-from PIL import Image
-import unicodedata
-import re
-import os
-import json
+from ocr_parallele import decrire_lecture, resumer_cache
+from analyse import lignes_de_page, rechercher_dans_magasin, rechercher_mot  # Logique partagée avec batch_cli.py
+from cache_streamlit import document_depose, lecteur_pdf, logo, magasin_documents  # Créés une fois
+from metriques import METRIQUES  # Durées par étape et par page
+from panneau_metriques import afficher_mesures  # Panneau de débogage (OCR_DEBUG=1 ou ?debug=1)
 
-# === INITIALISATION DU CLIENT GOOGLE VISION (Streamlit Secrets) ===
-service_account_info = json.loads(st.secrets["GOOGLE_SERVICE_ACCOUNT_JSON"])
-credentials = service_account.Credentials.from_service_account_info(service_account_info)
-client = vision.ImageAnnotatorClient(credentials=credentials)
-
-# === CONVERSION DU PDF EN IMAGES ===
-def pdf_to_images(pdf_bytes):
-    return convert_from_bytes(pdf_bytes)
-
-# === APPEL À L'OCR DE GOOGLE VISION POUR UNE IMAGE ===
-def vision_ocr_detect_text(image_pil):
-    img_byte_arr = io.BytesIO()
-    image_pil.save(img_byte_arr, format='PNG')
-    content = img_byte_arr.getvalue()
-
-    image = vision.Image(content=content)
-    response = client.text_detection(image=image)
-
-    if response.error.message:
-        raise Exception(f"Google Vision API error: {response.error.message}")
-
-    annotations = response.text_annotations
-    if not annotations:
-        return []
-
-    words = []
-    for ann in annotations[1:]:
-        vertices = ann.bounding_poly.vertices
-        x_coords = [v.x for v in vertices]
-        y_coords = [v.y for v in vertices]
-        bbox = (min(x_coords), min(y_coords), max(x_coords), max(y_coords))
-        words.append({"text": ann.description, "bbox": bbox})
-
-    return words
-
-# === REGROUPER LES MOTS EN LIGNES BASÉ SUR LEUR POSITION Y ===
-def group_words_by_lines(words, y_tolerance=10):
-    lines = []
-    words_sorted = sorted(words, key=lambda w: w['bbox'][1])
-
-    for w in words_sorted:
-        x_min, y_min, x_max, y_max = w['bbox']
-        mid_y = (y_min + y_max) / 2
-        placed = False
-        for line in lines:
-            line_y = line['y_mean']
-            if abs(mid_y - line_y) <= y_tolerance:
-                line['words'].append(w)
-                ys = [ (ww['bbox'][1] + ww['bbox'][3]) / 2 for ww in line['words'] ]
-                line['y_mean'] = sum(ys) / len(ys)
-                placed = True
-                break
-        if not placed:
-            lines.append({'y_mean': mid_y, 'words': [w]})
-
-    for line in lines:
-        line['words'] = sorted(line['words'], key=lambda w: w['bbox'][0])
-
-    return lines
-
-# === SUPPRIMER LES ACCENTS ET MINUSCULES POUR COMPARAISON ===
-def normalize(text):
-    return unicodedata.normalize('NFD', text).encode('ascii', 'ignore').decode('utf-8').lower()
-
-# === EXTRAIRE LE NOMBRE APRÈS UN MOT CLÉ ===
-def extract_amount_after_keyword(line_text, keyword):
-    normalized_text = normalize(line_text)
-    normalized_keyword = normalize(keyword)
-
-    if normalized_keyword in normalized_text:
-        index = normalized_text.find(normalized_keyword) + len(normalized_keyword)
-        substring = normalized_text[index:]
-        match = re.search(r"([\d\s.,]+?)(?:\s|-)", substring)
-        if match:
-            value_str = match.group(1).replace(',', '.').replace(' ', '')
-            try:
-                return float(value_str)
-            except:
-                return None
-    return None
+# === CLIENT GOOGLE VISION, CACHE OCR ET MAGASIN : créés une fois (cache_streamlit, Streamlit Secrets) ===
+DPI = 200  # Résolution de rendu des pages (fait partie de la clé du cache, voir rendu_pdf pour mode et taille max)
+lecteur = lecteur_pdf(DPI)  # Couche native, sinon OCR selon OCR_MODE ("page", "lot" ou "fichier")
+magasin = magasin_documents()  # Lignes des documents déjà analysés : un nouveau mot ne relance pas l'OCR
 
 # === INTERFACE STREAMLIT ===
 st.set_page_config(page_title="OCR PDF – Recherche par mot", layout="centered")
+repere = METRIQUES.repere()  # Le panneau de débogage ne montre que les mesures de cette relance
 
 # === AFFICHAGE DU LOGO ===
-if os.path.exists("logo.png"):
-    logo_img = Image.open("logo.png")
+logo_png = logo()  # Réduit une fois par processus (cache_streamlit) : plus de réencodage à chaque relance
+if logo_png is not None:
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        st.image(logo_img)
+        st.image(logo_png)
 else:
     st.warning("Logo non trouvé. Assure-toi que 'logo.png' est présent dans le même dossier que ce script.")
 
@@ -107,35 +28,51 @@ st.title("🔎 Recherche et extraction de montants après un mot dans un PDF")
 
 uploaded_file = st.file_uploader("Dépose ton fichier PDF scanné ici", type=["pdf"])
 search_word = st.text_input("Entrez le mot à rechercher (ex : échéance)", "").strip()
+tous_documents = st.checkbox(f"Chercher dans tous les documents déjà analysés ({magasin.nb_documents()})")
 
-if uploaded_file and search_word:
-    pdf_bytes = uploaded_file.read()
+if search_word and (uploaded_file or tous_documents):
     try:
-        images = pdf_to_images(pdf_bytes)
-        st.success(f"{len(images)} page(s) analysée(s).")
-
-        matching_lines = []
-        total_amount = 0.0
-
-        for pil_img in images:
-            pil_img = pil_img.convert("RGB")
-            words = vision_ocr_detect_text(pil_img)
-            if not words:
-                continue
-            lines = group_words_by_lines(words)
+        sha256 = None
+        partiel = None  # Pages d'un document dont l'OCR a échoué en partie (non enregistré)
+        lectures = []  # Résumé du traitement de chaque page (les images ne sont pas conservées)
+        drapeaux_cache = []  # Drapeau "cache" de chaque page lue (pour la légende du cache OCR)
+        if uploaded_file:
+            sha256, pdf_bytes = document_depose(uploaded_file)  # Hash calculé une fois par fichier déposé
+            if magasin.contient(sha256, DPI):
+                st.success("Document déjà analysé : recherche directe, sans OCR.")
+            else:
+                # PDF numérique : texte lu directement ; seules les pages scannées passent par l'OCR
+                pages = []
+                erreurs = []
+                for resultat in lecteur.lire(pdf_bytes):  # Pages traitées au fil de l'eau
+                    lectures.append((resultat["page"], decrire_lecture(resultat)))
+                    drapeaux_cache.append({"cache": resultat.get("cache")})
+                    if resultat.get("erreur"):
+                        erreurs.append(resultat["page"])  # Échec malgré les reprises : les autres pages sont gardées
+                    elif resultat["words"]:
+                        pages.append({"numero": resultat["page"], "lines": lignes_de_page(resultat["words"], page=resultat["page"])})
+                st.success(f"{len(lectures)} page(s) analysée(s).")
+                if erreurs:
+                    st.warning(f"OCR impossible pour la/les page(s) {', '.join(map(str, erreurs))} malgré les reprises : "
+                               "résultats partiels, le document sera réanalysé à la prochaine recherche.")
+                    partiel = pages
+                else:
+                    magasin.enregistrer(sha256, DPI, pages, nom=uploaded_file.name, nb_pages=len(lectures))
 
-            for line in lines:
-                line_text = " ".join([w['text'] for w in line['words']])
-                if normalize(search_word) in normalize(line_text):
-                    amount = extract_amount_after_keyword(line_text, search_word)
-                    matching_lines.append((line_text, amount))
-                    if amount is not None:
-                        total_amount += amount
+        # Recherche dans le magasin : quelques millisecondes, même sur de nombreux documents
+        matching_lines, total_amount = rechercher_dans_magasin(
+            magasin, search_word, sha256=None if tous_documents else sha256, dpi=DPI
+        )
+        if partiel is not None:
+            lignes_partielles, total_partiel = rechercher_mot(partiel, search_word)
+            matching_lines += [(uploaded_file.name, page, None, txt, val) for page, txt, val in lignes_partielles]
+            total_amount += total_partiel
 
         if matching_lines:
             st.subheader("📋 Lignes contenant le mot recherché :")
-            for i, (txt, val) in enumerate(matching_lines):
-                st.write(f"• {txt}")
+            for nom, page, ligne, txt, val in matching_lines:
+                position = f"page {page}" + (f", L{ligne}" if ligne else "")
+                st.write(f"• [{nom}, {position}] {txt}" if tous_documents else f"• {txt}")
                 if val is not None:
                     st.write(f"   ➤ Montant détecté : **{val}** €")
                 else:
@@ -152,5 +89,12 @@ if uploaded_file and search_word:
         else:
             st.warning("Aucune ligne contenant ce mot n’a été trouvée.")
 
+        if lectures:  # Document lu à cette relance : légende propre à ce document
+            st.caption(resumer_cache(drapeaux_cache, lecteur.moteur.libelle))
+            with st.expander("⏱️ Lecture par page (texte natif ou OCR)"):
+                for numero, lecture in lectures:
+                    st.write(f"Page {numero} : {lecture}")
+        afficher_mesures(repere)
+
     except Exception as e:
         st.error(f"Erreur : {e}")
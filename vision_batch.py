@@ -0,0 +1,334 @@
+# === OCR GOOGLE VISION PAR LOTS (batch_annotate_images / batch_annotate_files) ===
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from mots_page import MotsPage
+from ocr_parallele import MAX_WORKERS, traiter_en_flux
+from rendu_pdf import COTE_MAX, dpi_effectif_dimensions
+from encodage import encoder_image, remettre_a_l_echelle, signature_encodage
+from reprises import DELAI_REQUETE, REPRISES, ErreurOCR, est_transitoire
+
+# Mode d'OCR utilisé par les applis : "page" (un appel par page), "lot" ou "fichier"
+MODE_OCR = os.environ.get("OCR_MODE", "page")
+
+TAILLE_LOT_IMAGES = 16  # Limite de l'API : 16 images par requête batch_annotate_images
+PAGES_PAR_FICHIER = 5   # Limite de l'API : 5 pages par fichier envoyé en ligne à batch_annotate_files
+
+# Types donnés par leur nom ou leur valeur : google-cloud-vision n'est importé qu'au premier envoi
+FEATURES = [{"type_": "TEXT_DETECTION"}]
+# Clé de cache des pages envoyées en images, partagée avec moteurs_ocr.MoteurVision (réglages d'encodage compris)
+FEATURE_CACHE = "TEXT_DETECTION" + signature_encodage()
+
+
+# === LECTURE DES RÉPONSES : MESSAGES PROTOBUF BRUTS, BOÎTES CALCULÉES EN BLOC ===
+#
+# Les objets proto-plus de la bibliothèque convertissent chaque champ lu : on lit directement le message
+# protobuf sous-jacent, une seule fois par sommet, et les min / max des sommets de tous les mots sont
+# calculés d'un coup avec NumPy. full_text_annotation (blocs → paragraphes → mots) donne en plus les
+# lignes de Vision : un mot finit sa ligne quand son dernier symbole porte une fin de ligne.
+FINS_DE_LIGNE = {3, 4, 5}  # DetectedBreak.BreakType : EOL_SURE_SPACE, HYPHEN, LINE_BREAK
+
+
+def _brut(message):
+    """Message protobuf sous un message proto-plus (lecture des champs sans conversion)"""
+    return type(message).pb(message) if hasattr(type(message), "pb") else message
+
+
+def _boites(coordonnees, nb_sommets):
+    """(x0, y0, x1, y1) de chaque polygone ; coordonnees : x, y de tous les sommets mis bout à bout"""
+    if not nb_sommets:
+        return np.zeros((0, 4))
+    sommets = np.array(coordonnees, dtype=np.float64).reshape(-1, 2)
+    debuts = np.concatenate(([0], np.cumsum(nb_sommets)[:-1]))
+    return np.column_stack([np.minimum.reduceat(sommets, debuts), np.maximum.reduceat(sommets, debuts)])
+
+
+def _mots_vision(pages):
+    """Mots de full_text_annotation (messages bruts), et fin de ligne de chaque mot"""
+    for page in pages:
+        for block in page.blocks:
+            for paragraph in block.paragraphs:
+                mots = paragraph.words
+                for i, word in enumerate(mots):
+                    symboles = word.symbols
+                    fin = i == len(mots) - 1 or (  # Fin de paragraphe : fin de ligne
+                        len(symboles) > 0 and symboles[-1].property.detected_break.type_ in FINS_DE_LIGNE)
+                    yield page, word, symboles, fin
+
+
+def _lignes_vision(pages, descriptions):
+    """Ligne Vision de chaque mot de text_annotations, ou None si les mots des deux listes ne concordent pas"""
+    lignes = []
+    ligne = 0
+    for _, _, symboles, fin in _mots_vision(pages):
+        if len(lignes) == len(descriptions) or len(symboles) != len(descriptions[len(lignes)]):
+            return None  # Découpage différent : les lignes seront retrouvées par position (lignes.py)
+        lignes.append(ligne)
+        ligne += fin
+    return lignes if len(lignes) == len(descriptions) else None
+
+
+# === LECTURE D'UNE RÉPONSE IMAGE (même format que les moteurs de moteurs_ocr) ===
+def mots_depuis_reponse(response):
+    """Mots d'une réponse TEXT_DETECTION, avec les lignes de Vision quand full_text_annotation les donne"""
+    if response.error.message:
+        raise ErreurOCR(f"Google Vision API error: {response.error.message}", code=response.error.code)
+
+    brut = _brut(response)
+    annotations = brut.text_annotations[1:]  # On saute le 1er élément (texte global)
+    descriptions = [ann.description for ann in annotations]
+    lignes = _lignes_vision(brut.full_text_annotation.pages, descriptions)
+
+    textes, coordonnees, nb_sommets, lignes_gardees = [], [], [], []
+    for i, ann in enumerate(annotations):
+        sommets = ann.bounding_poly.vertices
+        if not sommets:
+            continue
+        for v in sommets:
+            coordonnees.append(v.x)
+            coordonnees.append(v.y)
+        textes.append(descriptions[i])
+        nb_sommets.append(len(sommets))
+        if lignes is not None:
+            lignes_gardees.append(lignes[i])
+    # Tableaux de la page, sans dict par mot
+    return MotsPage.construire(textes, _boites(coordonnees, nb_sommets), lignes_gardees if lignes is not None else None)
+
+
+# === LECTURE D'UNE RÉPONSE FICHIER (coordonnées normalisées → pixels au DPI voulu) ===
+def mots_depuis_page_fichier(response, dpi, cote_max=COTE_MAX):
+    if response.error.message:
+        raise ErreurOCR(f"Google Vision API error: {response.error.message}", code=response.error.code)
+
+    textes, coordonnees, nb_sommets, lignes = [], [], [], []
+    page_courante = None
+    ligne = 0
+    for page, word, symboles, fin in _mots_vision(_brut(response).full_text_annotation.pages):
+        if page is not page_courante:
+            # Pour un PDF, largeur et hauteur de page sont données en points (1/72 de pouce) :
+            # on se ramène au repère de l'image que rendrait rendu_pdf pour cette page
+            page_courante = page
+            echelle = dpi_effectif_dimensions(page.width, page.height, dpi, cote_max) / 72
+            largeur, hauteur = page.width * echelle, page.height * echelle
+        sommets = word.bounding_box.normalized_vertices
+        if sommets:
+            for v in sommets:
+                coordonnees.append(v.x * largeur)
+                coordonnees.append(v.y * hauteur)
+            textes.append("".join([symbole.text for symbole in symboles]))
+            nb_sommets.append(len(sommets))
+            lignes.append(ligne)
+        ligne += fin
+    return MotsPage.construire(textes, np.rint(_boites(coordonnees, nb_sommets)), lignes)
+
+
+# === APPEL PAR LOT : CHAQUE IMAGE (OU PAGE) A SON PROPRE RÉSULTAT ===
+def _appeler_par_elements(reprises, envoyer, lire, nb, infos=None):
+    """Appel groupé pour nb éléments, repris pour les seuls éléments en erreur transitoire
+
+    envoyer(indices) → une réponse par indice ; lire(indice, réponse) → mots, ou lève ErreurOCR si la
+    réponse de cet élément porte une erreur. Renvoie, pour chaque élément, ses mots ou l'exception qui
+    l'a fait échouer : une image en erreur ne fait pas perdre les autres, et une reprise ne renvoie
+    que les images encore en attente.
+    """
+    resultats = [None] * nb
+    en_attente = list(range(nb))
+    erreurs = {}  # Dernière erreur transitoire de chaque élément en attente
+
+    def tentative():
+        transitoires = []
+        for i, reponse in zip(list(en_attente), envoyer(list(en_attente))):
+            try:
+                resultats[i] = lire(i, reponse)
+            except ErreurOCR as e:
+                if est_transitoire(e):
+                    transitoires.append(i)
+                    erreurs[i] = e
+                else:
+                    resultats[i] = e
+        en_attente[:] = transitoires
+        if transitoires:
+            derniere = erreurs[transitoires[-1]]
+            raise ErreurOCR(f"{len(transitoires)}/{nb} élément(s) en erreur transitoire : {derniere}", code=derniere.code)
+
+    try:
+        reprises.appeler(tentative, cout=lambda: len(en_attente), infos=infos)
+    except Exception as e:  # Reprises épuisées, ou appel entier en échec (réseau, délai...)
+        for i in en_attente:
+            resultats[i] = erreurs.get(i, e)
+    return resultats
+
+
+class OCRVisionLot:
+    """OCR par lots : plusieurs pages par appel à l'API au lieu d'une par page"""
+
+    def __init__(self, client, taille_lot=TAILLE_LOT_IMAGES, max_workers=MAX_WORKERS, reprises=REPRISES,
+                 delai=DELAI_REQUETE):
+        self.client = client  # Client réel ou faux client local (tests) : seules les méthodes batch_* sont utilisées
+        self.taille_lot = max(1, min(taille_lot, TAILLE_LOT_IMAGES))
+        self.max_workers = max(1, max_workers)
+        self.reprises = reprises  # Débit limité et reprises des erreurs transitoires (reprises.py)
+        self.delai = delai  # Délai maximal de chaque appel (secondes)
+
+    # Même interface que les moteurs de moteurs_ocr : une image → une liste de mots
+    def __call__(self, image_pil, infos=None):
+        words = self.annoter_lot([image_pil], [infos])[0]
+        if isinstance(words, Exception):
+            raise words
+        return words
+
+    def annoter_lot(self, images, infos_par_image=None):
+        """Un appel batch_annotate_images pour au plus taille_lot images (repris pour les images en erreur)
+
+        Renvoie, pour chaque image, ses mots ou l'exception qui l'a fait échouer.
+        """
+        from google.cloud import vision
+
+        infos_par_image = infos_par_image or [None] * len(images)
+        encodages = [encoder_image(img, infos=infos) for img, infos in zip(images, infos_par_image)]
+        requests = [
+            vision.AnnotateImageRequest(image=vision.Image(content=content), features=FEATURES)
+            for content, _ in encodages
+        ]
+
+        def envoyer(indices):
+            # retry=None : les reprises sont gérées par self.reprises, pas par la bibliothèque
+            response = self.client.batch_annotate_images(requests=[requests[i] for i in indices],
+                                                         timeout=self.delai, retry=None)
+            return response.responses
+
+        def lire(i, reponse):
+            return remettre_a_l_echelle(mots_depuis_reponse(reponse), encodages[i][1])
+
+        mesures = {}
+        words_par_image = _appeler_par_elements(self.reprises, envoyer, lire, len(requests), infos=mesures)
+        for nom in ("duree_appel", "attente_quota"):
+            mesures[nom] /= len(requests)  # Part de chaque image : les totaux par page restent justes
+        for infos in infos_par_image:
+            if infos is not None:
+                infos.update(mesures)
+        return words_par_image
+
+    # === MODE FICHIER : LE PDF EST ENVOYÉ TEL QUEL, SANS RASTÉRISATION DE NOTRE CÔTÉ ===
+    def _ocr_pages_fichier(self, pdf_bytes, numeros, dpi):
+        from google.cloud import vision
+
+        input_config = vision.InputConfig(content=pdf_bytes, mime_type="application/pdf")
+
+        def envoyer(indices):
+            request = vision.AnnotateFileRequest(
+                input_config=input_config,
+                features=FEATURES,
+                pages=[numeros[i] for i in indices],  # Numéros de pages à partir de 1
+            )
+            response = self.client.batch_annotate_files(requests=[request], timeout=self.delai, retry=None)
+            fichier = response.responses[0]
+            if fichier.error.message:  # Erreur du fichier entier : toutes les pages envoyées sont reprises
+                raise ErreurOCR(f"Google Vision API error: {fichier.error.message}", code=fichier.error.code)
+            return fichier.responses
+
+        return _appeler_par_elements(self.reprises, envoyer, lambda i, r: mots_depuis_page_fichier(r, dpi),
+                                     len(numeros))
+
+    def ocr_pdf(self, pdf_bytes, numeros, dpi, erreurs=None):
+        """OCR des pages demandées d'un PDF (numéros à partir de 1), 5 pages par requête ; résultats dans l'ordre
+
+        Si erreurs est un dict, une page en échec ne fait pas tout échouer : elle vaut None et
+        erreurs[numéro] reçoit le message ; les autres pages, du même lot ou non, sont gardées.
+        """
+        numeros = list(numeros)
+        lots = [numeros[i:i + PAGES_PAR_FICHIER] for i in range(0, len(numeros), PAGES_PAR_FICHIER)]
+
+        def traiter(lot):
+            pages = self._ocr_pages_fichier(pdf_bytes, lot, dpi)
+            for k, (numero, words) in enumerate(zip(lot, pages)):
+                if isinstance(words, Exception):
+                    if erreurs is None:
+                        raise words
+                    erreurs[numero] = f"{type(words).__name__}: {words}"
+                    pages[k] = None
+            return pages
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            resultats = list(pool.map(traiter, lots))
+        return [words for lot in resultats for words in lot]
+
+
+# === OCR D'UN DOCUMENT AVEC CACHE, AU FORMAT DE ocr_pages() ===
+def _lots(pages, taille):
+    pages = iter(pages)
+    while True:
+        lot = list(islice(pages, taille))
+        if not lot:
+            return
+        yield lot
+
+
+def ocr_pages_par_lots(pages, ocr_lot, cache, dpi):
+    """Comme ocr_pages(), mais seules les pages absentes du cache partent, groupées par lots
+
+    Les pages (numéro, image) sont consommées au fil de l'eau, lot par lot.
+    """
+    def traiter_lot(lot):
+        images = [img for _, img in lot]
+        cles = [cache.cle(img, dpi, FEATURE_CACHE) for img in images]
+        words_par_page = [cache.lire(cle) for cle in cles]
+        manquantes = [i for i, words in enumerate(words_par_page) if words is None]
+        infos_par_page = [{"cache": words is not None} for words in words_par_page]
+
+        debut = time.perf_counter()
+        if manquantes:
+            try:
+                envoyees = ocr_lot.annoter_lot([images[i] for i in manquantes], [infos_par_page[i] for i in manquantes])
+            except Exception as e:
+                envoyees = [e] * len(manquantes)  # Échec avant l'appel (encodage d'une image...) : tout le lot
+            for i, words in zip(manquantes, envoyees):
+                if isinstance(words, Exception):
+                    # Page en échec malgré les reprises : signalée, les autres pages du lot sont gardées
+                    infos_par_page[i]["erreur"] = f"{type(words).__name__}: {words}"
+                    words = []
+                else:
+                    cache.ecrire(cles[i], words)
+                words_par_page[i] = words
+        duree = (time.perf_counter() - debut) / max(1, len(manquantes))  # Durée moyenne par page envoyée
+
+        return [
+            dict(infos, page=numero, words=words, duree=0.0 if infos["cache"] else duree, image=img)
+            for (numero, img), words, infos in zip(lot, words_par_page, infos_par_page)
+        ]
+
+    # Fenêtre comptée en pages, comme en mode page (2 × max_workers) : au plus ce nombre de pages rendues
+    # en attente, plus le lot en cours de constitution
+    fenetre = max(1, 2 * ocr_lot.max_workers // ocr_lot.taille_lot)
+    lots = _lots(pages, ocr_lot.taille_lot)
+    for resultats in traiter_en_flux(lots, traiter_lot, max_workers=ocr_lot.max_workers, fenetre=fenetre):
+        yield from resultats
+
+
+def ocr_pages_fichier(pdf_bytes, numeros, ocr_lot, cache, dpi):
+    """Comme ocr_pages(), mais à partir du PDF brut envoyé à l'API fichiers (pages numérotées à partir de 1)"""
+    numeros = list(numeros)
+    if not numeros:
+        return []
+    cle = cache.cle_octets(pdf_bytes, dpi, feature=f"FILE_TEXT_DETECTION|{COTE_MAX}|{numeros}")
+    pages = cache.lire_document(cle)
+    en_cache = pages is not None
+    duree = 0.0
+    erreurs = {}  # Pages des lots en échec malgré les reprises
+    if pages is None:
+        debut = time.perf_counter()
+        pages = ocr_lot.ocr_pdf(pdf_bytes, numeros, dpi, erreurs=erreurs)
+        duree = (time.perf_counter() - debut) / len(numeros)
+        if not erreurs:
+            cache.ecrire_document(cle, pages)  # Document incomplet : pas mis en cache, il sera retenté
+    resultats = []
+    for numero, words in zip(numeros, pages):
+        resultat = {"page": numero, "words": words or [], "duree": duree, "cache": en_cache}
+        if numero in erreurs:
+            resultat["erreur"] = erreurs[numero]
+        resultats.append(resultat)
+    return resultats